@@ -0,0 +1,894 @@
+"""
+Recording stand-in for the hou module, for benchmarks that run without Houdini
+
+Covers the parts of hou the lookdev modules use: a node tree with parms,
+keyframes, expressions, spare parm templates, inputs and flags, takes, plus
+geometry with real point arrays for the model. Every operation is counted in
+`calls` and appended to `events` as (operation, path, detail), so benchmarks
+can report and assert on the API traffic of a build.
+
+    import fake_hou
+    hou = fake_hou.install()
+    fake_hou.reset()
+    model = fake_hou.create_model("/obj", "asset", points)
+    import lookdev_turntable_rig
+"""
+
+import collections
+import posixpath
+import sys
+import tempfile
+
+import numpy as np
+
+
+# operation counts and the full operation log of the current scene
+calls = collections.Counter()
+events = []
+
+# parm values a freshly created node of these types starts with, everything else is 0.0 or ""
+DEFAULT_PARMS = {
+    "cam": {"focal": 50.0, "aperture": 41.4214, "resx": 1920, "resy": 1080, "aspect": 1.0},
+}
+
+# parms holding strings (anything else defaults to 0.0)
+STRING_PARMS = ("file", "fileName", "env_map", "lookatpath", "camera", "vobject", "forceobject", "alights",
+                "forcelights", "vm_picture", "shop_materialpath1", "basecolor_texture", "loadtype", "loadmode",
+                "xformspace", "soho_outputmode", "soho_diskfile")
+
+# string parms that reference files
+FILE_PARMS = ("file", "fileName", "env_map", "vm_picture", "basecolor_texture", "soho_diskfile")
+
+# component suffixes of parm tuples
+TUPLE_SUFFIXES = {"basecolor": "rgb"}
+
+# names of every spare parm template made through this module, these only exist on nodes that added them
+spare_parm_names = set()
+
+_root = None
+_pref_dir = None
+
+
+### count an operation and add it to the log
+def record(operation, path="", detail=None):
+    calls[operation] += 1
+    events.append((operation, path, detail))
+
+
+class _Namespace(object):
+    def __init__(self, **entries):
+        self.__dict__.update(entries)
+
+
+exprLanguage = _Namespace(Hscript="Hscript", Python="Python")
+scriptLanguage = _Namespace(Hscript="Hscript", Python="Python")
+parmTemplateType = _Namespace(Int="Int", Float="Float", String="String", Toggle="Toggle", Folder="Folder")
+stringParmType = _Namespace(Regular="Regular", FileReference="FileReference", NodeReference="NodeReference")
+folderType = _Namespace(Tabs="Tabs", Simple="Simple", Collapsible="Collapsible")
+paneTabType = _Namespace(NetworkEditor="NetworkEditor")
+updateMode = _Namespace(AutoUpdate="AutoUpdate", OnMouseUp="OnMouseUp", Manual="Manual")
+
+_update_mode = updateMode.AutoUpdate
+
+
+class OperationFailed(Exception):
+    pass
+
+
+class Take(object):
+    #only records what a take includes, parm values stay shared (edits outside the take raise like in Houdini)
+    def __init__(self, name, parent=None):
+        self._name = name
+        self._parent = parent
+        self._children = []
+        self._parm_tuples = set()
+        self._display_flags = set()
+
+    def name(self):
+        return self._name
+
+    def parent(self):
+        return self._parent
+
+    def children(self):
+        return tuple(self._children)
+
+    def addChildTake(self, name=None):
+        take = Take(name or "take%d" % (len(self._children) + 1), self)
+        record("take.addChildTake", "", take._name)
+        self._children.append(take)
+        return take
+
+    def addParmTuple(self, parm_tuple):
+        record("take.addParmTuple", parm_tuple._node.path() + "/" + parm_tuple.name())
+        self._parm_tuples.add((parm_tuple._node.path(), parm_tuple.name()))
+
+    def addNodeDisplayFlag(self, node):
+        record("take.addNodeDisplayFlag", node.path())
+        self._display_flags.add(node.path())
+
+    def hasParm(self, node, name):
+        for suffix in ("", "x", "y", "z", "w", "r", "g", "b"):
+            if name.endswith(suffix) and (node.path(), name[:len(name) - len(suffix)]) in self._parm_tuples:
+                return True
+        return False
+
+    def destroy(self):
+        record("take.destroy", "", self._name)
+        if self._parent is not None:
+            self._parent._children.remove(self)
+
+
+class _Takes(object):
+    def rootTake(self):
+        return _root_take
+
+    def currentTake(self):
+        return _current_take
+
+    def setCurrentTake(self, take):
+        global _current_take
+        record("takes.setCurrentTake", "", take.name())
+        _current_take = take
+
+    def findTake(self, name):
+        pending = [_root_take]
+        while pending:
+            take = pending.pop()
+            if take.name() == name:
+                return take
+            pending.extend(take.children())
+        return None
+
+
+_root_take = Take("Main")
+_current_take = _root_take
+
+
+### raise like Houdini when a parm outside the current take is edited
+def _check_take(node, name, display_flag=False):
+    if _current_take is _root_take:
+        return
+    included = node.path() in _current_take._display_flags if display_flag else _current_take.hasParm(node, name)
+    if not included:
+        raise OperationFailed("%s/%s is not in take %s" % (node.path(), name, _current_take.name()))
+
+
+class Color(object):
+    def __init__(self, rgb=(0, 0, 0)):
+        self.rgb = tuple(rgb)
+
+
+class Ramp(object):
+    def keys(self):
+        return ()
+
+    def values(self):
+        return ()
+
+
+class BoundingBox(object):
+    def __init__(self, low, high):
+        self.low = np.asarray(low, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+
+    def center(self):
+        return tuple((self.low + self.high) / 2.0)
+
+    def sizevec(self):
+        return tuple(self.high - self.low)
+
+
+class Matrix4(object):
+    def __init__(self, values=None):
+        self._matrix = np.identity(4) if values is None else np.array(values, dtype=np.float64).reshape(4, 4)
+
+    def asTuple(self):
+        return tuple(self._matrix.flatten().tolist())
+
+    def asTupleOfTuples(self):
+        return tuple(tuple(row) for row in self._matrix.tolist())
+
+
+class Keyframe(object):
+    def __init__(self, value=0.0, time=None):
+        self._value = value
+        self._frame = 0.0
+
+    def setFrame(self, frame):
+        self._frame = frame
+
+    def setValue(self, value):
+        self._value = value
+
+    def frame(self):
+        return self._frame
+
+    def value(self):
+        return self._value
+
+
+class Geometry(object):
+    def __init__(self, points=None):
+        if points is None:
+            points = np.array([(x, y, z) for x in (-.5, .5) for y in (-.5, .5) for z in (-.5, .5)])
+        self.points_array = np.ascontiguousarray(points, dtype=np.float32).reshape(-1, 3)
+
+    def boundingBox(self):
+        if not len(self.points_array):
+            return BoundingBox((0, 0, 0), (-1, -1, -1))
+        return BoundingBox(self.points_array.min(axis=0), self.points_array.max(axis=0))
+
+    def pointFloatAttribValuesAsString(self, name):
+        return self.points_array.tobytes()
+
+    def countPrimType(self, prim_type):
+        return 0
+
+    #one primitive per point is close enough for the proxy threshold
+    def intrinsicValue(self, name):
+        if name == "primitivecount":
+            return len(self.points_array)
+        raise OperationFailed("Unknown intrinsic %s" % name)
+
+    def saveToFile(self, path):
+        record("saveToFile", path, len(self.points_array))
+        with open(path, "wb") as f:
+            f.write(self.points_array.tobytes())
+
+
+### parm templates (spare parms)
+class ParmTemplate(object):
+    template_type = parmTemplateType.Float
+
+    def __init__(self, name, label, num_components=1, default_value=(), **kwargs):
+        self._name = name
+        self._label = label
+        self._default = tuple(default_value)
+        self._options = kwargs
+        self._hidden = kwargs.get("is_hidden", False)
+        spare_parm_names.add(name)
+
+    def name(self):
+        return self._name
+
+    def label(self):
+        return self._label
+
+    def type(self):
+        return self.template_type
+
+    def defaultValue(self):
+        return self._default
+
+    def isHidden(self):
+        return self._hidden
+
+    def hide(self, on):
+        self._hidden = on
+
+
+class FloatParmTemplate(ParmTemplate):
+    template_type = parmTemplateType.Float
+
+
+class IntParmTemplate(ParmTemplate):
+    template_type = parmTemplateType.Int
+
+
+class StringParmTemplate(ParmTemplate):
+    template_type = parmTemplateType.String
+
+    def __init__(self, name, label, num_components=1, default_value=(), string_type=stringParmType.Regular, **kwargs):
+        ParmTemplate.__init__(self, name, label, num_components, default_value, **kwargs)
+        self._string_type = string_type
+
+    def stringType(self):
+        return self._string_type
+
+
+class FolderParmTemplate(ParmTemplate):
+    template_type = parmTemplateType.Folder
+
+    def __init__(self, name, label, parm_templates=(), folder_type=folderType.Tabs, **kwargs):
+        self._name = name
+        self._label = label
+        self._templates = list(parm_templates)
+        self._folder_type = folder_type
+        self._hidden = False
+
+    def parmTemplates(self):
+        return tuple(self._templates)
+
+    def folderType(self):
+        return self._folder_type
+
+
+### template of a built-in parm, only used to tell string and file parms apart
+class _BuiltinTemplate(object):
+    def __init__(self, name, value):
+        self._name = name
+        self._is_string = isinstance(value, str)
+
+    def name(self):
+        return self._name
+
+    def type(self):
+        return parmTemplateType.String if self._is_string else parmTemplateType.Float
+
+    def stringType(self):
+        return stringParmType.FileReference if self._name in FILE_PARMS else stringParmType.Regular
+
+
+class ParmTemplateGroup(object):
+    def __init__(self, entries=()):
+        self._entries = list(entries)
+        self.hidden = set()
+
+    def entries(self):
+        return tuple(self._entries)
+
+    def _walk(self, entries):
+        for entry in entries:
+            yield entry
+            if isinstance(entry, FolderParmTemplate):
+                for child in self._walk(entry._templates):
+                    yield child
+
+    def find(self, name):
+        for entry in self._walk(self._entries):
+            if entry.name() == name:
+                return entry
+        return None
+
+    def _replace_in(self, entries, name, template):
+        for index, entry in enumerate(entries):
+            if entry.name() == name:
+                if template is None:
+                    del entries[index]
+                else:
+                    entries[index] = template
+                return True
+            if isinstance(entry, FolderParmTemplate) and self._replace_in(entry._templates, name, template):
+                return True
+        return False
+
+    def replace(self, name, template):
+        self._replace_in(self._entries, name, template)
+
+    def remove(self, name):
+        self._replace_in(self._entries, name, None)
+
+    def append(self, template):
+        self._entries.append(template)
+
+    def hide(self, name, on):
+        if on:
+            self.hidden.add(name)
+        else:
+            self.hidden.discard(name)
+
+    def spare_names(self):
+        return set(entry.name() for entry in self._walk(self._entries) if not isinstance(entry, FolderParmTemplate))
+
+    def copy(self):
+        group = ParmTemplateGroup()
+        group._entries = [FolderParmTemplate(entry.name(), entry.label(), entry._templates, entry.folderType())
+                          if isinstance(entry, FolderParmTemplate) else entry for entry in self._entries]
+        group.hidden = set(self.hidden)
+        return group
+
+
+class Parm(object):
+    def __init__(self, node, name, value):
+        self._node = node
+        self._name = name
+        self._value = value
+        self._keyframes = []
+        self._expression = None
+        self._locked = False
+
+    def path(self):
+        return self._node.path() + "/" + self._name
+
+    def name(self):
+        return self._name
+
+    def node(self):
+        return self._node
+
+    def parmTemplate(self):
+        return _BuiltinTemplate(self._name, self._value)
+
+    def set(self, value):
+        _check_take(self._node, self._name)
+        record("parm.set", self.path(), value)
+        if isinstance(value, Parm):
+            value = value.eval()
+        self._value = value
+
+    def eval(self):
+        return self._value
+
+    def evalAsString(self):
+        return str(self._value)
+
+    def unexpandedString(self):
+        return str(self._value)
+
+    def lock(self, on):
+        _check_take(self._node, self._name)
+        record("parm.lock", self.path(), on)
+        self._locked = on
+
+    def isLocked(self):
+        return self._locked
+
+    def setExpression(self, expression, language=None, replace_expression=True):
+        _check_take(self._node, self._name)
+        record("setExpression", self.path(), expression)
+        self._expression = expression
+
+    def expression(self):
+        return self._expression
+
+    def deleteAllKeyframes(self):
+        _check_take(self._node, self._name)
+        record("deleteAllKeyframes", self.path())
+        self._keyframes = []
+        self._expression = None
+
+    def setKeyframe(self, keyframe):
+        _check_take(self._node, self._name)
+        record("setKeyframe", self.path(), keyframe.frame())
+        calls["keyframes"] += 1
+        self._keyframes.append(keyframe)
+
+    def setKeyframes(self, keyframes):
+        keyframes = list(keyframes)
+        _check_take(self._node, self._name)
+        record("setKeyframes", self.path(), len(keyframes))
+        calls["keyframes"] += len(keyframes)
+        self._keyframes.extend(keyframes)
+
+    def keyframes(self):
+        return tuple(self._keyframes)
+
+
+class ParmTuple(object):
+    def __init__(self, node, name):
+        self._node = node
+        self._name = name
+
+    def name(self):
+        return self._name
+
+    def _parms(self, count):
+        suffixes = TUPLE_SUFFIXES.get(self._name, "xyzw")
+        return [self._node.parm(self._name + suffix) for suffix in suffixes[:count]]
+
+    def set(self, values):
+        values = tuple(values)
+        _check_take(self._node, self._name)
+        record("parmTuple.set", self._node.path() + "/" + self._name, values)
+        for parm, value in zip(self._parms(len(values)), values):
+            parm._value = value
+
+    def eval(self):
+        return tuple(parm.eval() for parm in self._parms(3))
+
+    def __iter__(self):
+        return iter(self._parms(3))
+
+
+class NodeType(object):
+    def __init__(self, name):
+        self._name = name
+
+    def name(self):
+        return self._name
+
+
+class NetworkBox(object):
+    def __init__(self, parent):
+        self.parent = parent
+        self.items = []
+
+    def addItem(self, item):
+        record("networkBox.addItem", self.parent.path(), item.name())
+        self.items.append(item)
+
+    def fitAroundContents(self):
+        record("networkBox.fitAroundContents", self.parent.path())
+
+
+class Node(object):
+    def __init__(self, parent, type_name, name):
+        self._parent = parent
+        self._type = NodeType(type_name)
+        self._name = name
+        self._children = collections.OrderedDict()
+        self._parms = {}
+        self._inputs = []
+        self._user_data = {}
+        self._display = False
+        self._render = False
+        self._color = None
+        self._group = ParmTemplateGroup([FolderParmTemplate("stdswitcher", "Transform", [])])
+        self._geometry = None
+        self._needs_to_cook = False
+        self._destroyed = False
+
+    def name(self):
+        return self._name
+
+    def path(self):
+        if self._parent is None:
+            return "/"
+        parent_path = self._parent.path()
+        return (parent_path if parent_path != "/" else "") + "/" + self._name
+
+    def parent(self):
+        return self._parent
+
+    def type(self):
+        return self._type
+
+    #nodes
+    def children(self):
+        return tuple(self._children.values())
+
+    def node(self, path):
+        if not path.startswith("/"):
+            path = posixpath.join(self.path(), path)
+        return _find(posixpath.normpath(path))
+
+    def _unique_name(self, name):
+        if name not in self._children:
+            return name
+        base = name.rstrip("0123456789")
+        index = 1
+        while "%s%d" % (base, index) in self._children:
+            index += 1
+        return "%s%d" % (base, index)
+
+    def _adopt(self, node, name):
+        node._name = self._unique_name(name)
+        node._parent = self
+        self._children[node._name] = node
+        return node
+
+    def createNode(self, type_name, node_name=None, run_init_scripts=True, load_contents=True):
+        node = Node(self, type_name, node_name or type_name + "1")
+        self._adopt(node, node._name)
+        record("createNode", node.path(), type_name)
+        return node
+
+    def destroy(self):
+        record("destroy", self.path())
+        for child in list(self._children.values()):
+            child._destroyed = True
+        if self._parent is not None:
+            self._parent._children.pop(self._name, None)
+        self._destroyed = True
+
+    def moveToGoodPosition(self, relative_to_inputs=True, move_inputs=True, move_outputs=True, move_unconnected=True):
+        record("moveToGoodPosition", self.path())
+
+    def layoutChildren(self, items=(), horizontal_spacing=-1.0, vertical_spacing=-1.0):
+        record("layoutChildren", self.path(), len(items) or len(self._children))
+
+    def createNetworkBox(self, name=None):
+        record("createNetworkBox", self.path())
+        return NetworkBox(self)
+
+    #parms
+    def parm(self, name):
+        parm = self._parms.get(name)
+        if parm is not None:
+            return parm
+        if name in spare_parm_names and name not in self._group.spare_names():
+            return None
+        default = DEFAULT_PARMS.get(self._type.name(), {}).get(name)
+        if default is None:
+            default = "" if name in STRING_PARMS else 0.0
+        parm = self._parms[name] = Parm(self, name, default)
+        return parm
+
+    def parmTuple(self, name):
+        return ParmTuple(self, name)
+
+    def parms(self):
+        return tuple(self._parms.values())
+
+    def evalParm(self, name):
+        record("evalParm", self.path(), name)
+        return self.parm(name).eval()
+
+    def parmTemplateGroup(self):
+        return self._group.copy()
+
+    def setParmTemplateGroup(self, group, rename_conflicting_parms=False):
+        record("setParmTemplateGroup", self.path(), len(group.spare_names()))
+        self._group = group.copy()
+        names = self._group.spare_names()
+        for name in list(self._parms):
+            if name in spare_parm_names and name not in names:
+                del self._parms[name]
+        for name in names:
+            if name not in self._parms:
+                template = self._group.find(name)
+                default = template.defaultValue()
+                self._parms[name] = Parm(self, name, default[0] if default else 0.0)
+
+    #wiring and flags
+    def setInput(self, input_index, node, output_index=0):
+        record("setInput", self.path(), node.path() if node is not None else None)
+        while len(self._inputs) <= input_index:
+            self._inputs.append(None)
+        self._inputs[input_index] = node
+
+    def setFirstInput(self, node, output_index=0):
+        self.setInput(0, node)
+
+    def setNextInput(self, node, output_index=0):
+        self.setInput(len(self._inputs), node)
+
+    def inputs(self):
+        return tuple(node for node in self._inputs if node is not None)
+
+    def inputAncestors(self):
+        ancestors = []
+        pending = list(self.inputs())
+        while pending:
+            node = pending.pop(0)
+            if node not in ancestors:
+                ancestors.append(node)
+                pending.extend(node.inputs())
+        return tuple(ancestors)
+
+    def setDisplayFlag(self, on):
+        _check_take(self, "display", display_flag=True)
+        record("setDisplayFlag", self.path(), on)
+        self._display = on
+        if on and self._parent is not None:
+            for sibling in self._parent._children.values():
+                if sibling is not self:
+                    sibling._display = False
+
+    def setRenderFlag(self, on):
+        record("setRenderFlag", self.path(), on)
+        self._render = on
+        if on and self._parent is not None:
+            for sibling in self._parent._children.values():
+                if sibling is not self:
+                    sibling._render = False
+
+    def isDisplayFlagSet(self):
+        return self._display
+
+    def isRenderFlagSet(self):
+        return self._render
+
+    def displayNode(self):
+        for child in self._children.values():
+            if child._display:
+                return child
+        return None
+
+    def renderNode(self):
+        for child in self._children.values():
+            if child._render:
+                return child
+        return None
+
+    def setColor(self, color):
+        record("setColor", self.path())
+        self._color = color
+
+    def setUserData(self, key, value):
+        record("setUserData", self.path(), key)
+        self._user_data[key] = value
+
+    def userData(self, key):
+        return self._user_data.get(key)
+
+    def destroyUserData(self, key, must_exist=True):
+        self._user_data.pop(key, None)
+
+    #geometry
+    def geometry(self):
+        record("geometry", self.path())
+        if self._geometry is None:
+            self._geometry = Geometry()
+        return self._geometry
+
+    def needsToCook(self, time=None):
+        return self._needs_to_cook
+
+    def cook(self, force=False, frame_range=()):
+        record("cook", self.path())
+
+    def render(self, frame_range=(), **kwargs):
+        record("render", self.path(), tuple(frame_range))
+
+
+### node categories checked with isinstance; every fake node is a plain Node, so references are never followed
+class ObjNode(Node):
+    pass
+
+
+class SopNode(Node):
+    pass
+
+
+### node at an absolute path, None if it does not exist
+def _find(path):
+    node = _root
+    for part in [part for part in path.split("/") if part]:
+        node = node._children.get(part)
+        if node is None:
+            return None
+    return node
+
+
+def node(path):
+    return _find(posixpath.normpath(path)) if path else None
+
+
+def moveNodesTo(nodes, destination):
+    record("moveNodesTo", destination.path(), len(nodes))
+    moved = []
+    for item in nodes:
+        item._parent._children.pop(item._name, None)
+        moved.append(destination._adopt(item, item._name))
+    return tuple(moved)
+
+
+def copyNodesTo(nodes, destination):
+    record("copyNodesTo", destination.path(), len(nodes))
+    copies = []
+    for item in nodes:
+        copy = destination.createNode(item.type().name(), item.name())
+        for name, parm in item._parms.items():
+            copy._parms[name] = Parm(copy, name, parm.eval())
+        copy._geometry = item._geometry
+        copies.append(copy)
+    return tuple(copies)
+
+
+def selectedNodes():
+    return ()
+
+
+def expandString(text):
+    return text.replace("$HOUDINI_USER_PREF_DIR", _pref_dir or tempfile.gettempdir())
+
+
+def fps():
+    return 24.0
+
+
+def frameToTime(frame):
+    return (frame - 1) / fps()
+
+
+def isUIAvailable():
+    return False
+
+
+def applicationVersionString():
+    return "fake"
+
+
+class _Playbar(object):
+    def setFrameRange(self, start, end):
+        record("playbar.setFrameRange", "", (start, end))
+
+    def setPlaybackRange(self, start, end):
+        record("playbar.setPlaybackRange", "", (start, end))
+
+
+class _PerfMonItem(object):
+    def stop(self):
+        pass
+
+    def save(self, path):
+        with open(path, "w") as f:
+            f.write("fake perfMon profile\n")
+
+
+class _PerfMon(object):
+    def startProfile(self, title):
+        return _PerfMonItem()
+
+    def startEvent(self, description):
+        return _PerfMonItem()
+
+
+class _HipFile(object):
+    def clear(self, suppress_save_prompt=False):
+        reset()
+
+    def load(self, path, suppress_save_prompt=False, ignore_load_warnings=False):
+        record("hipFile.load", path)
+
+    def save(self, path=None):
+        record("hipFile.save", path)
+
+
+class _UndoBlock(object):
+    def __init__(self, operation, label=None):
+        self.operation = operation
+        self.label = label
+
+    def __enter__(self):
+        record(self.operation, "", self.label)
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class _Undos(object):
+    def group(self, label):
+        return _UndoBlock("undos.group", label)
+
+    def disabler(self):
+        return _UndoBlock("undos.disabler")
+
+    def performUndo(self):
+        record("undos.performUndo")
+
+
+def updateModeSetting():
+    return _update_mode
+
+
+def setUpdateMode(mode):
+    global _update_mode
+    record("setUpdateMode", "", mode)
+    _update_mode = mode
+
+
+playbar = _Playbar()
+takes = _Takes()
+perfMon = _PerfMon()
+hipFile = _HipFile()
+undos = _Undos()
+
+
+### start an empty scene (/obj, /mat, /out) and clear the recorded operations
+def reset(pref_dir=None):
+    global _root, _pref_dir, _root_take, _current_take
+    _root = Node(None, "root", "")
+    _root_take = Take("Main")
+    _current_take = _root_take
+    for name, type_name in (("obj", "obj"), ("mat", "mat"), ("out", "out")):
+        _root._children[name] = Node(_root, type_name, name)
+    if pref_dir is not None:
+        _pref_dir = pref_dir
+    calls.clear()
+    del events[:]
+    return _root
+
+
+### geo node at parent/name whose display SOP holds the given (N, 3) points, like a loaded asset
+def create_model(parent_path, name, points):
+    geo = node(parent_path).createNode("geo", name)
+    sop = geo.createNode("file", "model")
+    sop._parms["file"] = Parm(sop, "file", "")
+    sop._geometry = Geometry(points)
+    sop.setDisplayFlag(True)
+    sop.setRenderFlag(True)
+    return geo
+
+
+### put this module in sys.modules as hou, with an empty scene
+def install():
+    module = sys.modules[__name__]
+    if sys.modules.get("hou") is not module:
+        sys.modules["hou"] = module
+    if _root is None:
+        reset()
+    return module
@@ -0,0 +1,75 @@
+"""
+Import time of the lookdev modules against a stubbed hou
+
+Imports each module in a fresh interpreter a few times and fails if the median
+import time goes over the budget or if importing pulled in PySide2.
+
+    python benchmarks/import_time.py --repeat 10 --budget 0.5
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules that must import quickly in hython and batch processes
+MODULES = ("lookdev_turntable_rig", "lookdev_batch")
+
+# modules that must only be loaded by the interactive entry point
+FORBIDDEN_MODULES = ("PySide2", "lookdev_rig_ui")
+
+# run in a fresh interpreter so earlier imports are not cached; hou is an empty module
+# (not fake_hou, which would load numpy before the clock starts)
+PROBE = """
+import json, sys, time, types
+sys.path[:0] = [%r]
+sys.modules["hou"] = types.ModuleType("hou")
+start = time.perf_counter()
+import %s
+seconds = time.perf_counter() - start
+print(json.dumps({"seconds": seconds, "loaded": [name for name in %r if name in sys.modules]}))
+"""
+
+
+### import time in seconds of module in a fresh interpreter, and any forbidden modules it loaded
+def measure_import(module):
+    code = PROBE % (ROOT, module, FORBIDDEN_MODULES)
+    output = subprocess.check_output([sys.executable, "-c", code])
+    result = json.loads(output.decode("utf-8").strip().splitlines()[-1])
+    return result["seconds"], result["loaded"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure import time of the lookdev modules against a stubbed hou.")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per module")
+    parser.add_argument("--budget", type=float, default=1.0, help="max median import time per module in seconds")
+    args = parser.parse_args(argv)
+
+    failures = []
+    print("%-24s %8s %8s  %s" % ("module", "min ms", "med ms", "forbidden imports"))
+    for module in MODULES:
+        times = []
+        loaded = set()
+        for _ in range(max(1, args.repeat)):
+            seconds, forbidden = measure_import(module)
+            times.append(seconds)
+            loaded.update(forbidden)
+        times.sort()
+        median = times[len(times) // 2]
+        print("%-24s %8.1f %8.1f  %s" % (module, times[0] * 1000, median * 1000, ", ".join(sorted(loaded)) or "-"))
+        if loaded:
+            failures.append("%s imports %s" % (module, ", ".join(sorted(loaded))))
+        if median > args.budget:
+            failures.append("%s median import %.3fs is over the %.3fs budget" % (module, median, args.budget))
+
+    for failure in failures:
+        print("FAIL: " + failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,465 @@
+"""
+Rig construction benchmark against the recording hou stand-in (no Houdini needed)
+
+Builds a full rig with build_lookdev_rig() for every configuration in a matrix
+(sweep on/off, ref kit on/off, frames per pass, asset point count) and reports
+wall time, Python allocations (tracemalloc) and hou API call counts. A run fails
+when a build breaks an invariant (one setKeyframes call per animated channel,
+orbit keys matching the per-frame reference, ROP frame range, update mode
+restored), when a failed build leaves nodes behind, when a multi-asset build
+does not give every model its own take, when an HDRI wedge does not give
+every map its own light, take and output, when a heavy model is not shown
+through a cached display proxy (with the render flag left on the model), when
+the turntable cache key differs before and after a build, or when a call
+count goes above benchmarks/baseline.json.
+
+    python benchmarks/rig_benchmark.py
+    python benchmarks/rig_benchmark.py --quick --json report.json
+    python benchmarks/rig_benchmark.py --update-baseline
+"""
+
+import argparse
+import itertools
+import json
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, "baseline.json")
+
+sys.path[:0] = [ROOT, BENCHMARK_DIR]
+import fake_hou
+fake_hou.install()
+
+import lookdev_display_proxy
+import lookdev_hdri_wedge
+import lookdev_takes
+import lookdev_turntable_cache
+import lookdev_turntable_rig as rig_module
+from lookdev_orbit import check_orbit_samples, turntable_range
+
+
+# configuration matrix
+SWEEP = (True, False)
+REFKIT = (True, False)
+FRAME_COUNTS = (100, 400)
+ASSET_POINTS = (("small", 10000), ("large", 1000000))
+
+# --quick keeps one value per axis except the toggles
+QUICK_FRAME_COUNTS = (100,)
+QUICK_ASSET_POINTS = (("small", 10000),)
+
+# calls compared against the baseline (operations that scale with the work a build does)
+TRACKED_CALLS = ("createNode", "parm.set", "parmTuple.set", "parm.lock", "setKeyframe", "setKeyframes", "keyframes",
+                 "setExpression", "setInput", "setParmTemplateGroup", "layoutChildren", "geometry", "saveToFile",
+                 "setUpdateMode")
+
+# slower than baseline * this fails when --time-tolerance is not given
+DEFAULT_TIME_TOLERANCE = 3.0
+
+
+### deterministic point cloud for an asset: a box-ish blob 2 x 1 x 1.5 units above the origin
+def make_points(count, seed=0):
+    random = np.random.RandomState(seed)
+    points = random.standard_normal((count, 3)).astype(np.float32)
+    points /= np.maximum(np.abs(points).max(axis=0), 1e-6)
+    return points * np.float32((1.0, 0.5, 0.75)) + np.float32((0.0, 0.5, 0.0))
+
+
+### minimal valid scanline EXR (half RGB, no compression) for the envlight
+def write_exr(path, width=64, height=32):
+    def attribute(name, type_name, value):
+        return name.encode() + b"\0" + type_name.encode() + b"\0" + struct.pack("<i", len(value)) + value
+    channels = b"".join(name + b"\0" + struct.pack("<iB3xii", 1, 0, 1, 1) for name in (b"B", b"G", b"R")) + b"\0"
+    header = (b"\x76\x2f\x31\x01" + struct.pack("<i", 2)
+              + attribute("channels", "chlist", channels)
+              + attribute("compression", "compression", struct.pack("<B", 0))
+              + attribute("dataWindow", "box2i", struct.pack("<iiii", 0, 0, width - 1, height - 1))
+              + attribute("displayWindow", "box2i", struct.pack("<iiii", 0, 0, width - 1, height - 1))
+              + b"\0")
+    line = struct.pack("<ii", 0, width * 6) + b"\0" * (width * 6)
+    first_chunk = len(header) + 8 * height
+    offsets = struct.pack("<%dQ" % height, *[first_chunk + y * len(line) for y in range(height)])
+    with open(path, "wb") as f:
+        f.write(header + offsets + line * height)
+
+
+def config_name(config):
+    return "sweep%d_refkit%d_f%d_%s" % (config["sweep_enabled"], config["add_refkit"], config["frame_count"],
+                                        config["asset"])
+
+
+def config_matrix(quick=False):
+    frame_counts = QUICK_FRAME_COUNTS if quick else FRAME_COUNTS
+    asset_points = QUICK_ASSET_POINTS if quick else ASSET_POINTS
+    configs = []
+    for sweep, refkit, frame_count, (asset, points) in itertools.product(SWEEP, REFKIT, frame_counts, asset_points):
+        configs.append({"sweep_enabled": sweep, "add_refkit": refkit, "frame_count": frame_count,
+                        "asset": asset, "points": points})
+    return configs
+
+
+### settings for a configuration
+def config_settings(config, hdri_path):
+    settings = dict(rig_module.DEFAULT_SETTINGS)
+    settings.update({
+        "hdri_path": hdri_path,
+        "sweep_enabled": config["sweep_enabled"],
+        "add_refkit": config["add_refkit"],
+        "frame_count": config["frame_count"],
+    })
+    return settings
+
+
+### one build in a fresh scene and cache, returns (seconds, subnet, model)
+def build_once(settings, points, cache_dir):
+    if os.path.isdir(cache_dir):
+        shutil.rmtree(cache_dir)
+    os.environ["LOOKDEV_CACHE_DIR"] = cache_dir
+    fake_hou.reset()
+    model = fake_hou.create_model("/obj", "asset", points)
+    fake_hou.calls.clear()
+    del fake_hou.events[:]
+    start = time.perf_counter()
+    subnet = rig_module.build_lookdev_rig(settings, model)
+    return time.perf_counter() - start, subnet, model
+
+
+### check the built scene, returns a list of failure messages
+def check_invariants(settings, subnet):
+    failures = []
+    calls = fake_hou.calls
+    frame_count = settings["frame_count"]
+    if calls["setKeyframe"]:
+        failures.append("%d single setKeyframe calls, channels should be written with setKeyframes" % calls["setKeyframe"])
+    if calls["setKeyframes"] != 7:
+        failures.append("%d setKeyframes calls, expected 7 (camera and sweep tx/ty/tz, envlight ry)" % calls["setKeyframes"])
+
+    cam = subnet.node("lookdev_cam")
+    framing = json.loads(subnet.userData("lookdev_framing"))
+    samples = np.column_stack([[key.value() for key in cam.parm(name).keyframes()] for name in ("tx", "ty", "tz")])
+    try:
+        check_orbit_samples(samples, framing["center"], framing["cam_distance"], settings["rotation_offset"],
+                            settings["start_frame"], frame_count=frame_count)
+    except ValueError as error:
+        failures.append("camera orbit: %s" % error)
+
+    if fake_hou.updateModeSetting() != fake_hou.updateMode.AutoUpdate or calls["setUpdateMode"] != 2:
+        failures.append("update mode %s after %d setUpdateMode calls, expected one switch to manual and back"
+                        % (fake_hou.updateModeSetting(), calls["setUpdateMode"]))
+
+    mantra = fake_hou.node("/obj/lookdev_ropnet/lookdev_mantra")
+    expected_range = turntable_range(settings["start_frame"], frame_count)
+    if (mantra.parm("f1").eval(), mantra.parm("f2").eval()) != expected_range:
+        failures.append("ROP range %s, expected %s" % ((mantra.parm("f1").eval(), mantra.parm("f2").eval()), expected_range))
+    if mantra.parm("vm_picture").unexpandedString() != rig_module.get_asset_output("asset"):
+        failures.append("ROP writes %s, expected the asset's output folder" % mantra.parm("vm_picture").unexpandedString())
+    sweep = subnet.node("lookdev_sweep")
+    if bool(sweep.children()) != settings["sweep_enabled"]:
+        failures.append("sweep geo %s, sweep_enabled is %s" % ("built" if sweep.children() else "empty", settings["sweep_enabled"]))
+    refs = subnet.node("lookdev_refs")
+    if bool(refs.children()) != settings["add_refkit"]:
+        failures.append("ref kit geo %s, add_refkit is %s" % ("built" if refs.children() else "empty", settings["add_refkit"]))
+    return failures
+
+
+### make a build fail halfway and check it leaves the scene as it was, returns a list of failure messages
+def check_rollback(settings, points, cache_dir):
+    failures = []
+    #early (before the ref kit) and late (layout, after the display proxy went into the model)
+    for function_name in ("create_lookdev_reference_kit", "group_in_network_box"):
+        original = getattr(rig_module, function_name)
+        def failing(*args, **kwargs):
+            raise RuntimeError("benchmark: simulated failure")
+        setattr(rig_module, function_name, failing)
+        try:
+            build_once(settings, points, cache_dir)
+            failures.append("build did not fail in %s" % function_name)
+            continue
+        except RuntimeError:
+            pass
+        finally:
+            setattr(rig_module, function_name, original)
+
+        leftovers = [child.path() for path in ("/obj", "/mat") for child in fake_hou.node(path).children()
+                     if child.path() != "/obj/asset"]
+        model = fake_hou.node("/obj/asset")
+        leftovers.extend(child.path() for child in model.children() if child.name() != "model")
+        if leftovers:
+            failures.append("build failed in %s left %s behind" % (function_name, ", ".join(leftovers)))
+        if model.displayNode() is None or model.renderNode() is None:
+            failures.append("build failed in %s left the model without display or render flag" % function_name)
+        if fake_hou.updateModeSetting() != fake_hou.updateMode.AutoUpdate:
+            failures.append("failed build left the update mode on %s" % fake_hou.updateModeSetting())
+    return failures
+
+
+### build a rig shared by three models of different sizes (twice, the second run replaces the takes),
+### returns a list of failure messages
+def check_takes(settings, cache_dir):
+    fake_hou.reset()
+    models = [fake_hou.create_model("/obj", "asset_%d" % index, make_points(1000, index) * scale)
+              for index, scale in enumerate((1.0, 3.0, 0.5))]
+    failures = []
+    for _ in range(2):
+        try:
+            subnet = lookdev_takes.build_multi_asset_rig(settings, models)
+        except Exception as error:
+            return ["multi-asset build failed: %s: %s" % (type(error).__name__, error)]
+
+    assets = lookdev_takes.get_rig_assets(subnet)
+    takes = fake_hou.takes.rootTake().children()
+    if sorted(take.name() for take in takes) != ["lookdev_asset_0", "lookdev_asset_1", "lookdev_asset_2"]:
+        failures.append("takes %s, expected one per model" % [take.name() for take in takes])
+    if [asset["model"] for asset in assets] != [model.path() for model in models]:
+        failures.append("rig assets %s do not match the models" % [asset["model"] for asset in assets])
+    if fake_hou.takes.currentTake() is not fake_hou.takes.rootTake():
+        failures.append("multi-asset build left take %s current" % fake_hou.takes.currentTake().name())
+    if subnet.userData("lookdev_model") != models[1].path():
+        failures.append("root take frames %s, expected the largest model" % subnet.userData("lookdev_model"))
+    outputs = set(asset["output"] for asset in assets)
+    if len(outputs) != len(models):
+        failures.append("asset takes share output paths %s" % sorted(outputs))
+    return failures
+
+
+### build rigs around a heavy and a light model, rebuild and switch the proxy off, returns a list of failure messages
+def check_display_proxy(settings, cache_dir):
+    if os.path.isdir(cache_dir):
+        shutil.rmtree(cache_dir)
+    failures = []
+    for name, count in (("heavy", lookdev_display_proxy.DISPLAY_PROXY_MIN_PRIMS), ("light", 1000)):
+        fake_hou.reset()
+        model = fake_hou.create_model("/obj", name + "_asset", make_points(count))
+        model_sop = model.renderNode()
+        rig_module.build_lookdev_rig(settings, model)
+        proxy = model.node(lookdev_display_proxy.DISPLAY_PROXY_NAME)
+        if (proxy is not None) != (name == "heavy"):
+            failures.append("%s model %s display proxy" % (name, "got a" if proxy is not None else "has no"))
+        if model.renderNode() is not model_sop:
+            failures.append("%s model renders %s instead of its own SOP" % (name, model.renderNode().path()))
+        if model.displayNode() is not (proxy or model_sop):
+            failures.append("%s model displays %s" % (name, model.displayNode().path()))
+
+        #unchanged model: the proxy comes from the cache
+        fake_hou.calls.clear()
+        rig_module.update_lookdev_rig(fake_hou.node("/obj/lookdev_rig"), settings, model)
+        if fake_hou.calls["saveToFile"]:
+            failures.append("%s model rebuild saved %d files, expected cache hits" % (name, fake_hou.calls["saveToFile"]))
+
+        rig_module.update_lookdev_rig(fake_hou.node("/obj/lookdev_rig"), dict(settings, display_proxy="off"), model)
+        if model.node(lookdev_display_proxy.DISPLAY_PROXY_NAME) is not None or model.displayNode() is not model_sop:
+            failures.append("%s model kept its display proxy with display_proxy off" % name)
+    return failures
+
+
+### the turntable key solved before a build must match the one the built rig stores, change with the settings,
+### and find frames stored in the cache, returns a list of failure messages
+def check_turntable_cache(settings, subnet, model, work_dir):
+    failures = []
+    settings = rig_module.resolve_settings(settings)
+    key = lookdev_turntable_cache.get_turntable_key(settings, model, rig_module.compute_framing(model, settings))
+    if key != subnet.userData("lookdev_turntable_key"):
+        failures.append("turntable key solved before the build does not match the rig's")
+    moved = dict(settings, hdri_rotation_offset=settings["hdri_rotation_offset"] + 10)
+    if lookdev_turntable_cache.get_turntable_key(moved, model, rig_module.compute_framing(model, moved)) == key:
+        failures.append("turntable key ignores the HDRI rotation offset")
+
+    render_dir = os.path.join(work_dir, "turntable_render")
+    restored_dir = os.path.join(work_dir, "turntable_restored")
+    for directory in (os.path.join(render_dir, "preview"), restored_dir):
+        os.makedirs(directory)
+    for path in ("asset.1001.exr", "asset.1002.exr", os.path.join("preview", "asset_contact_sheet.png")):
+        with open(os.path.join(render_dir, path), "wb") as f:
+            f.write(path.encode())
+    cache_root = os.path.join(work_dir, "turntable_cache")
+    if lookdev_turntable_cache.restore_turntable(cache_root, key, restored_dir) is not None:
+        failures.append("empty turntable cache reported a hit")
+    lookdev_turntable_cache.store_turntable(cache_root, key, render_dir)
+    count = lookdev_turntable_cache.restore_turntable(cache_root, key, restored_dir)
+    if count != 3 or not os.path.isfile(os.path.join(restored_dir, "preview", "asset_contact_sheet.png")):
+        failures.append("turntable cache restored %s files, expected the 3 stored" % count)
+    #renders overwrite frames in place, neither the stored nor the restored copy may write through to the cache
+    for directory in (render_dir, restored_dir):
+        with open(os.path.join(directory, "asset.1001.exr"), "wb") as f:
+            f.write(b"rendered again")
+    shutil.rmtree(restored_dir)
+    lookdev_turntable_cache.restore_turntable(cache_root, key, restored_dir)
+    with open(os.path.join(restored_dir, "asset.1001.exr"), "rb") as f:
+        if f.read() != b"asset.1001.exr":
+            failures.append("rendering into a render folder changed the cached frames")
+    for directory in (render_dir, restored_dir, cache_root):
+        shutil.rmtree(directory, ignore_errors=True)
+    return failures
+
+
+### add a three map HDRI wedge to a single asset rig and to a two asset rig, returns a list of failure messages
+def check_wedge(settings, wedge_paths):
+    settings = dict(settings, hdri_wedge=wedge_paths)
+    failures = []
+    for model_count in (1, 2):
+        fake_hou.reset()
+        models = [fake_hou.create_model("/obj", "asset_%d" % index, make_points(1000, index)) for index in range(model_count)]
+        try:
+            if model_count == 1:
+                rig_module.build_lookdev_rig(settings, models[0])
+            else:
+                lookdev_takes.build_multi_asset_rig(settings, models)
+            lookdev_hdri_wedge.apply_hdri_wedge(settings)
+            groups = lookdev_hdri_wedge.get_variant_takes(fake_hou.node("/obj/lookdev_rig"))
+        except Exception as error:
+            failures.append("%d asset HDRI wedge failed: %s: %s" % (model_count, type(error).__name__, error))
+            continue
+
+        lights = [node.name() for node in fake_hou.node("/obj/lookdev_rig").children() if node.type().name() == "envlight"]
+        if len(lights) != 1 + len(wedge_paths):
+            failures.append("%d asset HDRI wedge made lights %s" % (model_count, lights))
+        if len(groups) != model_count or any(len(variant_takes) != 1 + len(wedge_paths) for _, variant_takes in groups):
+            failures.append("%d asset HDRI wedge made takes %s" % (model_count, [(parent, [take.name() for _, take in takes])
+                                                                                 for parent, takes in groups]))
+        if fake_hou.takes.currentTake() is not fake_hou.takes.rootTake():
+            failures.append("HDRI wedge left take %s current" % fake_hou.takes.currentTake().name())
+    return failures
+
+
+### time, allocations and call counts of one configuration
+def run_config(config, repeat, work_dir, hdri_path, wedge_paths):
+    settings = config_settings(config, hdri_path)
+    points = make_points(config["points"])
+    cache_dir = os.path.join(work_dir, "cache")
+
+    times = []
+    for _ in range(max(1, repeat)):
+        seconds, subnet, model = build_once(settings, points, cache_dir)
+        times.append(seconds)
+    calls = dict((name, fake_hou.calls[name]) for name in sorted(fake_hou.calls))
+    failures = check_invariants(settings, subnet)
+    failures.extend(check_turntable_cache(settings, subnet, model, work_dir))
+    if settings["add_refkit"]:
+        failures.extend(check_rollback(settings, points, cache_dir))
+    failures.extend(check_takes(settings, cache_dir))
+    failures.extend(check_wedge(settings, wedge_paths))
+    failures.extend(check_display_proxy(settings, cache_dir))
+
+    #separate traced build, tracemalloc slows everything down
+    tracemalloc.start()
+    build_once(settings, points, cache_dir)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    times.sort()
+    return {
+        "name": config_name(config),
+        "config": config,
+        "seconds_min": times[0],
+        "seconds_median": times[len(times) // 2],
+        "alloc_peak_bytes": peak,
+        "alloc_retained_bytes": current,
+        "events": len(fake_hou.events),
+        "calls": calls,
+        "failures": failures,
+    }
+
+
+### compare a result with its baseline entry, returns a list of failure messages
+def check_baseline(result, baseline, time_tolerance):
+    entry = baseline.get(result["name"])
+    if entry is None:
+        return []
+    failures = []
+    for name in TRACKED_CALLS:
+        if name not in entry["calls"]:
+            continue
+        count = result["calls"].get(name, 0)
+        limit = entry["calls"][name]
+        if count > limit:
+            failures.append("%s: %d calls, baseline %d" % (name, count, limit))
+    if time_tolerance and result["seconds_min"] > entry["seconds_min"] * time_tolerance:
+        failures.append("%.3fs, baseline %.3fs x %.1f" % (result["seconds_min"], entry["seconds_min"], time_tolerance))
+    return failures
+
+
+def load_baseline(path):
+    if not os.path.isfile(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def write_baseline(path, results):
+    baseline = {}
+    for result in results:
+        baseline[result["name"]] = {
+            "seconds_min": round(result["seconds_min"], 4),
+            "calls": dict((name, result["calls"].get(name, 0)) for name in TRACKED_CALLS),
+        }
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=4, sort_keys=True)
+
+
+def print_report(results):
+    print("%-32s %8s %8s %10s %7s %7s %7s %7s" % ("config", "min ms", "med ms", "peak KiB", "nodes", "sets",
+                                                  "keys", "exprs"))
+    for result in results:
+        calls = result["calls"]
+        print("%-32s %8.1f %8.1f %10.0f %7d %7d %7d %7d" % (
+            result["name"], result["seconds_min"] * 1000, result["seconds_median"] * 1000,
+            result["alloc_peak_bytes"] / 1024.0, calls.get("createNode", 0),
+            calls.get("parm.set", 0) + calls.get("parmTuple.set", 0), calls.get("keyframes", 0),
+            calls.get("setExpression", 0)))
+        for failure in result["failures"]:
+            print("    FAIL: " + failure)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark lookdev rig builds against a recording hou stand-in.")
+    parser.add_argument("--repeat", type=int, default=3, help="timed builds per configuration")
+    parser.add_argument("--quick", action="store_true", help="only the smallest asset and frame count")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline call counts and times")
+    parser.add_argument("--update-baseline", action="store_true", help="write this run as the new baseline")
+    parser.add_argument("--time-tolerance", type=float, default=DEFAULT_TIME_TOLERANCE,
+                        help="fail when slower than baseline times this (0 disables the time check)")
+    parser.add_argument("--json", help="write the full report to this file")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="lookdev_benchmark_")
+    try:
+        fake_hou.reset(pref_dir=work_dir)
+        hdri_path = os.path.join(work_dir, "studio.exr")
+        write_exr(hdri_path)
+        wedge_paths = [os.path.join(work_dir, name + ".exr") for name in ("sunset", "overcast")]
+        for wedge_path in wedge_paths:
+            write_exr(wedge_path)
+        baseline = {} if args.update_baseline else load_baseline(args.baseline)
+        results = []
+        for config in config_matrix(args.quick):
+            result = run_config(config, args.repeat, work_dir, hdri_path, wedge_paths)
+            result["failures"].extend(check_baseline(result, baseline, args.time_tolerance))
+            results.append(result)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+    if args.update_baseline:
+        write_baseline(args.baseline, results)
+        print("baseline written to %s" % args.baseline)
+
+    failed = [result for result in results if result["failures"]]
+    print("%d configurations, %d failed" % (len(results), len(failed)))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,529 @@
+"""
+Headless batch mode for the lookdev turntable rig (run with hython)
+
+Builds one rig per asset listed in a JSON or CSV manifest, saves a hip file per
+asset and renders them over a bounded pool of local hython processes, with a
+log per asset, retries on failure and a summary report.
+
+    hython lookdev_batch.py assets.json --output /renders/turntables --workers 4
+
+With --takes every asset is loaded into one scene around a single shared rig,
+with a take per asset (see lookdev_takes), and rendered in one hython process.
+
+An hdri_wedge (a list, or ; separated in a CSV) renders every asset under
+hdri_path and each of those maps too, into a folder per HDRI (see
+lookdev_hdri_wedge).
+
+With --target-seconds every built rig renders a few low resolution probe
+frames and gets the best sampling preset that fits that many seconds per
+frame (see lookdev_render_tune). The projected render time of each asset is
+written to its log and summary.json, so --no-render gives an estimate of the
+whole batch before it is rendered.
+
+With --preview every asset first gets a progressive preview (coarse to fine
+poses at a quarter of the resolution, a contact sheet and a movie in
+<output>/<name>/render/preview, see lookdev_preview) before any final
+quality render starts.
+
+With --usd every asset is exported as a layered USD stage next to its frames
+and rendered by husk with Karma CPU in one process (see lookdev_usd).
+
+Finished turntables are kept in the disk cache, keyed by a hash of the
+model, the HDRIs and Macbeth texture, the settings and the framing (see
+lookdev_turntable_cache). An asset whose key is cached gets the cached frames
+copied into <output>/<name>/render and is neither built nor rendered. Use
+--no-cache to render everything.
+
+A manifest is a list of assets (or {"defaults": {...}, "assets": [...]}) using
+the same keys as lookdev_turntable_rig.DEFAULT_SETTINGS, plus:
+    name        asset name, used for the output folder (defaults to the geo file name)
+    geo_path    geometry file to load in a File SOP
+    hip_path    or: a hip file to load ...
+    node_path   ... and the geo node in it to build the rig around
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from lookdev_hdri import get_houdini_tool
+from lookdev_profile import profile_build, profile_phase
+
+
+ROP_PATH = "/obj/lookdev_ropnet/lookdev_mantra"
+TAKES_NAME = "lookdev_takes"
+
+
+### read a json or csv manifest into a list of asset dicts with defaults applied, raises ValueError when two assets
+### end up with the same name (their output folders, takes and cache entries would overwrite each other)
+def load_manifest(path, default_settings):
+    if path.lower().endswith(".csv"):
+        with open(path, "r", newline="") as f:
+            assets = [dict((key, value) for key, value in row.items() if value not in (None, "")) for row in csv.DictReader(f)]
+        defaults = {}
+    else:
+        with open(path, "r") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            defaults = data.get("defaults", {})
+            assets = data.get("assets", [])
+        else:
+            defaults = {}
+            assets = data
+
+    resolved = []
+    names = {}
+    for index, asset in enumerate(assets):
+        values = dict(default_settings)
+        values.update(defaults)
+        values.update(asset)
+        for key, default in default_settings.items():
+            values[key] = coerce_value(values[key], default)
+        if not values.get("name"):
+            source = values.get("geo_path") or values.get("node_path") or ""
+            values["name"] = os.path.basename(source).split(".")[0]
+        values["name"] = re.sub(r"[^A-Za-z0-9_]", "_", values["name"]) or "asset_%d" % index
+        #folders compare without case on Windows and macOS
+        other = names.setdefault(values["name"].lower(), index)
+        if other != index:
+            raise ValueError("Assets %d and %d of %s are both named %s, give them distinct names"
+                             % (other + 1, index + 1, path, values["name"]))
+        resolved.append(values)
+    return resolved
+
+
+### convert csv strings to the type of the matching default setting
+def coerce_value(value, default):
+    if not isinstance(value, str) or isinstance(default, str):
+        return value
+    if isinstance(default, list):
+        return [part.strip() for part in value.split(";") if part.strip()]
+    if isinstance(default, bool):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    if isinstance(default, int):
+        return int(float(value))
+    if isinstance(default, float):
+        return float(value)
+    return value
+
+
+### append a line to an asset's log file
+def write_log(log_path, message):
+    with open(log_path, "a") as f:
+        f.write("[%s] %s\n" % (time.strftime("%Y-%m-%d %H:%M:%S"), message))
+
+
+### load the asset into an empty scene (or into the current one when clear is off) and return its geo node
+def load_asset(hou, asset, clear=True):
+    if asset.get("hip_path"):
+        if clear:
+            hou.hipFile.load(asset["hip_path"], suppress_save_prompt=True, ignore_load_warnings=True)
+        else:
+            hou.hipFile.merge(asset["hip_path"], ignore_load_warnings=True)
+        model = hou.node(asset["node_path"])
+        if model is None:
+            raise ValueError("Node %s not found in %s" % (asset["node_path"], asset["hip_path"]))
+        return model
+
+    if clear:
+        hou.hipFile.clear(suppress_save_prompt=True)
+    if not os.path.isfile(asset.get("geo_path", "")):
+        raise ValueError("Invalid geo path: %s" % asset.get("geo_path"))
+    model = hou.node("/obj").createNode("geo", asset["name"])
+    for child in model.children():
+        child.destroy()
+    reader = model.createNode("file", "model")
+    reader.parm("file").set(asset["geo_path"])
+    reader.setDisplayFlag(True)
+    reader.setRenderFlag(True)
+    return model
+
+
+### build one asset's rig and save it to <output>/<name>/<name>.hip, returns the hip path
+### (around model when the asset is already loaded)
+def build_asset(hou, rig_module, asset, output_dir, target_seconds=None, max_noise=None, model=None):
+    asset_dir = os.path.join(output_dir, asset["name"])
+    if not os.path.isdir(asset_dir):
+        os.makedirs(asset_dir)
+    settings = dict((key, asset[key]) for key in rig_module.DEFAULT_SETTINGS)
+    rig_module.validate_settings(settings)
+
+    #LOOKDEV_PROFILE=1 writes a build profile per asset
+    with profile_build(hou, asset["name"], os.path.join(asset_dir, "lookdev_rig_profile.json")):
+        if model is None:
+            with profile_phase("load_asset"):
+                model = load_asset(hou, asset)
+        with profile_phase("build"):
+            rig_module.build_lookdev_rig(settings, model)
+
+    mantra = hou.node(ROP_PATH)
+    mantra.parm("vm_picture").set(os.path.join(asset_dir, "render", asset["name"] + ".$F4.exr"))
+    if settings["hdri_wedge"]:
+        from lookdev_hdri_wedge import apply_hdri_wedge
+        apply_hdri_wedge(settings)
+    if target_seconds is not None:
+        from lookdev_render_tune import tune_render
+        tune_render(mantra, target_seconds, max_noise)
+    hip_path = os.path.join(asset_dir, asset["name"] + ".hip")
+    hou.hipFile.save(hip_path)
+    return hip_path
+
+
+### load every asset into one scene and build a shared rig with a take per asset (settings of the first asset),
+### saved to <output>/lookdev_takes.hip, returns the hip path
+def build_takes_scene(hou, rig_module, assets, output_dir):
+    from lookdev_takes import build_multi_asset_rig
+    settings = dict((key, assets[0][key]) for key in rig_module.DEFAULT_SETTINGS)
+    rig_module.validate_settings(settings)
+
+    with profile_build(hou, TAKES_NAME, os.path.join(output_dir, "lookdev_rig_profile.json")):
+        with profile_phase("load_asset"):
+            hou.hipFile.clear(suppress_save_prompt=True)
+            models = [load_asset(hou, asset, clear=False) for asset in assets]
+        output_paths = {}
+        for asset, model in zip(assets, models):
+            output_paths[model.name()] = os.path.join(output_dir, asset["name"], "render", asset["name"] + ".$F4.exr")
+        with profile_phase("build"), rig_module.rig_transaction("Build Lookdev Multi-Asset Rig", models):
+            build_multi_asset_rig(settings, models, output_paths)
+            if settings["hdri_wedge"]:
+                from lookdev_hdri_wedge import apply_hdri_wedge
+                apply_hdri_wedge(settings)
+
+    hip_path = os.path.join(output_dir, TAKES_NAME + ".hip")
+    hou.hipFile.save(hip_path)
+    return hip_path
+
+
+### render a saved hip in a separate hython process, retrying failed attempts
+def render_asset(hip_path, log_path, retries, rop_path=ROP_PATH, dedup=True, static_ifd=False, mantra_workers=2,
+                 takes=False, preview=False, usd=False):
+    command = [get_houdini_tool("hython"), os.path.abspath(__file__), "--render-hip", hip_path, "--rop", rop_path]
+    if preview:
+        command.append("--preview")
+    if usd:
+        command.append("--usd")
+    if not dedup:
+        command.append("--no-dedup")
+    if takes:
+        command.append("--takes")
+    if static_ifd:
+        command.extend(["--static-ifd", "--mantra-workers", str(mantra_workers)])
+    for attempt in range(1, retries + 2):
+        write_log(log_path, "render attempt %d: %s" % (attempt, " ".join(command)))
+        with open(log_path, "a") as log:
+            returncode = subprocess.call(command, stdout=log, stderr=subprocess.STDOUT)
+        write_log(log_path, "render attempt %d exited with %d" % (attempt, returncode))
+        if returncode == 0:
+            return attempt
+    raise RuntimeError("render failed after %d attempts, see %s" % (retries + 1, log_path))
+
+
+### worker side of render_asset: load the hip and render its rop (each distinct pose once unless dedup is off,
+### through static geometry IFDs and a pool of mantra processes with static_ifd, every asset take with takes;
+### only the progressive preview with preview, through a USD stage and husk with usd)
+def render_hip(hip_path, rop_path, dedup=True, static_ifd=False, mantra_workers=2, takes=False, preview=False,
+               usd=False):
+    import hou
+    hou.hipFile.load(hip_path, suppress_save_prompt=True, ignore_load_warnings=True)
+    rop = hou.node(rop_path)
+    if rop is None:
+        raise ValueError("ROP %s not found in %s" % (rop_path, hip_path))
+    subnet = hou.node("/obj/lookdev_rig")
+    if preview:
+        render_previews(hou, rop, subnet, takes)
+        return
+    if usd:
+        render_usd(hou, rop, subnet, dedup)
+        return
+    if subnet is not None and subnet.userData("lookdev_hdri_variants"):
+        from lookdev_hdri_wedge import render_hdri_wedge
+        plans = render_hdri_wedge(rop, dedup=dedup, static_ifd=static_ifd, workers=mantra_workers, verbose=True)
+        print("rendered %d HDRI variant takes" % len(plans))
+        return
+    if takes:
+        from lookdev_takes import render_asset_takes
+        plans = render_asset_takes(rop, dedup=dedup, verbose=True)
+        for name, plan in sorted(plans.items()):
+            if plan is not None:
+                print("%s: rendered %d of %d frames" % (name, len(plan["unique"]), len(plan["frames"])))
+        return
+    if static_ifd:
+        from lookdev_ifd import render_static_turntable
+        plan = render_static_turntable(rop, workers=mantra_workers)
+        print("rendered %d IFDs of %d frames" % (len(plan["unique"]), len(plan["frames"])))
+        return
+    if not dedup:
+        rop.render(verbose=True, output_progress=True)
+        return
+    from lookdev_render_plan import render_turntable
+    plan = render_turntable(rop, verbose=True)
+    print("rendered %d of %d frames, %d linked from repeated poses"
+          % (len(plan["unique"]), len(plan["frames"]), len(plan["duplicates"])))
+
+
+### load an asset and compute the cache key of its frames without building anything, returns (model, key)
+def get_asset_render_key(hou, rig_module, asset, options):
+    from lookdev_turntable_cache import get_render_key, get_turntable_key
+    settings = rig_module.resolve_settings(dict((key, asset[key]) for key in rig_module.DEFAULT_SETTINGS))
+    model = load_asset(hou, asset)
+    framing = rig_module.compute_framing(model, settings)
+    return model, get_render_key(get_turntable_key(settings, model, framing), options)
+
+
+### render the ROP through a USD stage and husk (every HDRI variant take of a wedge)
+def render_usd(hou, rop, subnet, dedup=True):
+    from lookdev_hdri_wedge import get_variant_takes
+    from lookdev_takes import current_take
+    from lookdev_usd import render_usd_turntable
+    groups = get_variant_takes(subnet) if subnet is not None else []
+    for take in [take for _, variant_takes in groups for _, take in variant_takes] or [hou.takes.currentTake()]:
+        with current_take(take):
+            plan = render_usd_turntable(rop, dedup=dedup, verbose=True)
+        print("%s: rendered %d of %d frames with husk from %s"
+              % (take.name(), len(plan["unique"]), len(plan["frames"]), plan["stage"]))
+
+
+### progressive preview of the ROP (of every asset take with takes, under the first HDRI of a wedge)
+def render_previews(hou, rop, subnet, takes=False):
+    from lookdev_preview import render_preview
+    from lookdev_takes import current_take, get_rig_assets
+    names = [asset["take"] for asset in get_rig_assets(subnet)] if takes and subnet is not None else []
+    for take in [hou.takes.findTake(name) for name in names] or [hou.takes.currentTake()]:
+        with current_take(take):
+            preview = render_preview(rop, verbose=True)
+        print("preview of %d poses: %s %s" % (len(preview["order"]), preview["contact_sheet"], preview["movie"] or ""))
+
+
+### build every asset in this process, then render them over a bounded process pool
+### (or, with takes, build one scene with a take per asset and render it in one process)
+def run_batch(manifest_path, output_dir, workers=2, retries=1, render=True, dedup=True, static_ifd=False,
+              mantra_workers=2, takes=False, target_seconds=None, max_noise=None, preview=False, use_cache=True,
+              usd=False):
+    import hou
+    import lookdev_turntable_rig as rig_module
+    from lookdev_turntable_cache import restore_turntable, store_turntable
+
+    assets = load_manifest(manifest_path, rig_module.DEFAULT_SETTINGS)
+    if takes:
+        return run_takes_batch(hou, rig_module, assets, output_dir, retries, render, dedup, preview)
+    cache_root = rig_module.get_cache_root()
+    #batch options that change the frames are part of the key
+    options = {"target_seconds": target_seconds, "max_noise": max_noise}
+    if usd:
+        options["renderer"] = "karma"
+    results = []
+    to_render = []
+    for asset in assets:
+        asset_dir = os.path.join(output_dir, asset["name"])
+        if not os.path.isdir(asset_dir):
+            os.makedirs(asset_dir)
+        result = {"name": asset["name"], "status": "built", "build_attempts": 0, "render_attempts": 0,
+                  "log": os.path.join(asset_dir, "lookdev_batch.log"), "hip": None, "error": None,
+                  "render_dir": os.path.join(asset_dir, "render"), "cache_key": None}
+        start = time.time()
+        model = None
+        #frames of an earlier run (or hard links between repeated poses) are replaced rather than written through
+        if render:
+            shutil.rmtree(result["render_dir"], ignore_errors=True)
+        if render and use_cache:
+            try:
+                model, result["cache_key"] = get_asset_render_key(hou, rig_module, asset, options)
+                count = restore_turntable(cache_root, result["cache_key"], result["render_dir"])
+            except Exception:
+                write_log(result["log"], "cache lookup failed:\n%s" % traceback.format_exc())
+                model = None
+                count = None
+            if count is not None:
+                result["status"] = "cached"
+                result["build_seconds"] = time.time() - start
+                write_log(result["log"], "%d cached files copied into %s" % (count, result["render_dir"]))
+                results.append(result)
+                continue
+        for attempt in range(1, retries + 2):
+            result["build_attempts"] = attempt
+            try:
+                result["hip"] = build_asset(hou, rig_module, asset, output_dir, target_seconds, max_noise,
+                                            model if attempt == 1 else None)
+                result["status"] = "built"
+                result["error"] = None
+                write_log(result["log"], "built %s" % result["hip"])
+                if target_seconds is not None:
+                    log_tune_report(hou, result)
+                break
+            except Exception:
+                result["status"] = "build_failed"
+                result["error"] = traceback.format_exc().strip().splitlines()[-1]
+                write_log(result["log"], "build attempt %d failed:\n%s" % (attempt, traceback.format_exc()))
+        result["build_seconds"] = time.time() - start
+        results.append(result)
+        if render and result["status"] == "built":
+            to_render.append(result)
+
+    #previews of every asset come first so all of them can be reviewed before the final renders finish
+    def preview_one(result):
+        try:
+            render_asset(result["hip"], result["log"], retries, preview=True)
+            result["preview"] = "rendered"
+        except Exception as error:
+            result["preview"] = "failed: %s" % error
+
+    if preview:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            list(pool.map(preview_one, to_render))
+
+    #fan renders out over a bounded pool, each render runs in its own hython process
+    def render_one(result):
+        start = time.time()
+        try:
+            result["render_attempts"] = render_asset(result["hip"], result["log"], retries, dedup=dedup,
+                                                     static_ifd=static_ifd, mantra_workers=mantra_workers, usd=usd)
+            result["status"] = "rendered"
+        except Exception as error:
+            result["render_attempts"] = retries + 1
+            result["status"] = "render_failed"
+            result["error"] = str(error)
+        result["render_seconds"] = time.time() - start
+        if result["status"] == "rendered" and result["cache_key"] is not None:
+            try:
+                store_turntable(cache_root, result["cache_key"], result["render_dir"],
+                                {"name": result["name"], "hip": result["hip"]})
+            except Exception:
+                write_log(result["log"], "caching the render failed:\n%s" % traceback.format_exc())
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        list(pool.map(render_one, to_render))
+
+    write_summary(results, output_dir)
+    return results
+
+
+### batch with every asset as a take of one shared rig, the results share the hip, log and render time
+def run_takes_batch(hou, rig_module, assets, output_dir, retries=1, render=True, dedup=True, preview=False):
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    log_path = os.path.join(output_dir, TAKES_NAME + ".log")
+    result = {"status": "built", "build_attempts": 0, "render_attempts": 0, "log": log_path, "hip": None, "error": None}
+    start = time.time()
+    for attempt in range(1, retries + 2):
+        result["build_attempts"] = attempt
+        try:
+            result["hip"] = build_takes_scene(hou, rig_module, assets, output_dir)
+            result["status"] = "built"
+            result["error"] = None
+            write_log(log_path, "built %s" % result["hip"])
+            break
+        except Exception:
+            result["status"] = "build_failed"
+            result["error"] = traceback.format_exc().strip().splitlines()[-1]
+            write_log(log_path, "build attempt %d failed:\n%s" % (attempt, traceback.format_exc()))
+    result["build_seconds"] = time.time() - start
+
+    if render and result["status"] == "built":
+        if preview:
+            try:
+                render_asset(result["hip"], log_path, retries, takes=True, preview=True)
+                result["preview"] = "rendered"
+            except Exception as error:
+                result["preview"] = "failed: %s" % error
+        start = time.time()
+        try:
+            result["render_attempts"] = render_asset(result["hip"], log_path, retries, dedup=dedup, takes=True)
+            result["status"] = "rendered"
+        except Exception as error:
+            result["render_attempts"] = retries + 1
+            result["status"] = "render_failed"
+            result["error"] = str(error)
+        result["render_seconds"] = time.time() - start
+
+    results = []
+    for asset in assets:
+        asset_result = dict(result)
+        asset_result["name"] = asset["name"]
+        results.append(asset_result)
+    write_summary(results, output_dir)
+    return results
+
+
+### projected render time of a tuned rig (still loaded) into its log and result
+def log_tune_report(hou, result):
+    from lookdev_render_tune import format_report
+    report = json.loads(hou.node(ROP_PATH).userData("lookdev_render_tune"))
+    result["tune_preset"] = report["preset"]
+    result["projected_render_seconds"] = report["total_seconds"]
+    write_log(result["log"], "render tuning:\n%s" % format_report(report))
+
+
+### write summary.json and print a one line per asset report
+def write_summary(results, output_dir):
+    summary_path = os.path.join(output_dir, "summary.json")
+    with open(summary_path, "w") as f:
+        json.dump(results, f, indent=4)
+
+    failed = [result for result in results if result["status"].endswith("failed")]
+    print("%-32s %-14s %8s %8s  %s" % ("asset", "status", "build s", "render s", "log"))
+    for result in results:
+        print("%-32s %-14s %8.1f %8.1f  %s" % (result["name"], result["status"], result.get("build_seconds", 0),
+                                              result.get("render_seconds", 0), result["log"]))
+    projected = [result["projected_render_seconds"] for result in results if "projected_render_seconds" in result]
+    if projected:
+        print("projected render time %.1f h for %d tuned assets" % (sum(projected) / 3600.0, len(projected)))
+    print("%d assets, %d failed, summary written to %s" % (len(results), len(failed), summary_path))
+    return summary_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and render lookdev turntables for a manifest of assets.")
+    parser.add_argument("manifest", nargs="?", help="JSON or CSV manifest of assets")
+    parser.add_argument("--output", default=os.getcwd(), help="output directory (one folder per asset)")
+    parser.add_argument("--workers", type=int, default=2, help="number of concurrent render processes")
+    parser.add_argument("--retries", type=int, default=1, help="retries for a failed build or render")
+    parser.add_argument("--no-render", action="store_true", help="only build and save the hip files")
+    parser.add_argument("--no-dedup", action="store_true", help="render every frame, even ones repeating an earlier pose")
+    parser.add_argument("--static-ifd", action="store_true",
+                        help="bake static geometry once and render per-frame IFDs with a pool of mantra processes")
+    parser.add_argument("--mantra-workers", type=int, default=2, help="mantra processes per asset with --static-ifd")
+    parser.add_argument("--takes", action="store_true",
+                        help="build one scene with a shared rig and a take per asset and render it in one process")
+    parser.add_argument("--target-seconds", type=float,
+                        help="probe each rig and pick the sampling preset that fits this many seconds per frame")
+    parser.add_argument("--max-noise", type=float,
+                        help="with --target-seconds, the cheapest preset under this relative noise level wins")
+    parser.add_argument("--preview", action="store_true",
+                        help="render a progressive low resolution preview of every asset before the final renders")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="build and render every asset, even ones whose turntable is in the cache")
+    parser.add_argument("--usd", action="store_true",
+                        help="export each rig as a USD stage and render it with husk and Karma CPU in one process")
+    parser.add_argument("--render-hip", help=argparse.SUPPRESS)
+    parser.add_argument("--rop", default=ROP_PATH, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.takes and args.static_ifd:
+        parser.error("--static-ifd renders a single asset, it cannot be combined with --takes")
+    if args.takes and args.target_seconds is not None:
+        parser.error("--target-seconds tunes one rig per asset, it cannot be combined with --takes")
+    if args.usd and (args.takes or args.static_ifd):
+        parser.error("--usd renders one asset rig through husk, it cannot be combined with --takes or --static-ifd")
+    if args.render_hip:
+        render_hip(args.render_hip, args.rop, not args.no_dedup, args.static_ifd, args.mantra_workers, args.takes,
+                   args.preview, args.usd)
+        return 0
+    if not args.manifest:
+        parser.error("a manifest is required")
+
+    results = run_batch(args.manifest, os.path.abspath(args.output), args.workers, args.retries, not args.no_render,
+                        not args.no_dedup, args.static_ifd, args.mantra_workers, args.takes, args.target_seconds,
+                        args.max_noise, args.preview, not args.no_cache, args.usd)
+    return 1 if any(result["status"].endswith("failed") for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""
+Bounding box provider for the lookdev turntable rig
+
+Measures the model with the cheapest source available: a disk cache keyed by
+the model's upstream signature, geometry Houdini has already cooked, the
+bounds stored in the file the render SOP reads (bgeo info, Alembic packed
+bounds, USD extents), and only then a full cook of the render SOP.
+"""
+
+import os
+
+import hou
+
+from lookdev_cache import DiskCache, cache_key
+from lookdev_framing import FRAMING_PADDING, box_corners, points_from_buffer, solve_framing
+
+
+BOUNDS_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+# file extensions the file readers can give us bounds for without loading the geometry
+USD_EXTENSIONS = (".usd", ".usda", ".usdc", ".usdz")
+ALEMBIC_EXTENSIONS = (".abc",)
+
+# primitive types whose points are only pivots, framing falls back to the bounds for these
+PACKED_PRIM_TYPES = ("PackedDisk", "PackedDiskSequence", "PackedGeometry", "AlembicRef", "PackedUSD")
+
+
+### disk cache for bounds and framing results
+def get_bounds_cache(cache_root):
+    return DiskCache(cache_root, "bounds", BOUNDS_CACHE_MAX_BYTES)
+
+
+### value of a parm for a signature; a broken expression hashes its text instead of failing the build
+def get_signature_value(parm):
+    try:
+        return parm.eval()
+    except hou.OperationFailed:
+        try:
+            return ("expression", parm.expression())
+        except hou.OperationFailed:
+            return ("unexpanded", parm.unexpandedString())
+
+
+### SOP a node reference parm pulls geometry from (object_merge paths, op: file paths), None for anything else
+def get_referenced_sop(node, parm, value):
+    if not isinstance(value, str) or not value:
+        return None
+    template = parm.parmTemplate()
+    if value.startswith("op:"):
+        value = value[3:]
+    elif template.type() != hou.parmTemplateType.String or template.stringType() != hou.stringParmType.NodeReference:
+        return None
+    target = node.node(value)
+    if isinstance(target, hou.ObjNode):
+        return target.renderNode() if target.type().name() == "geo" else None
+    return target if isinstance(target, hou.SopNode) else None
+
+
+### signature of the model: upstream node types and parm values, plus mtime and size of every file they read
+### (of the render SOP, or of sop if given); geometry pulled in by object_merge or op: paths is followed too,
+### but expressions reading other nodes (ch(), point() ...) are hashed as their values only
+def get_model_signature(model_node, sop=None):
+    if sop is None:
+        sop = model_node.renderNode()
+    parts = [model_node.path(), sop.path()]
+    visited = set()
+    pending = [sop]
+    while pending:
+        branch = pending.pop(0)
+        for node in [branch] + list(branch.inputAncestors()):
+            if node.path() in visited:
+                continue
+            visited.add(node.path())
+            parts.append(node.type().name())
+            for parm in node.parms():
+                template = parm.parmTemplate()
+                value = get_signature_value(parm)
+                referenced = get_referenced_sop(node, parm, value)
+                if referenced is not None:
+                    pending.append(referenced)
+                if isinstance(value, hou.Ramp):
+                    value = (value.keys(), value.values())
+                elif isinstance(value, tuple):
+                    pass  #text of a broken expression
+                elif not isinstance(value, (int, float, str)):
+                    value = type(value).__name__
+                elif (template.type() == hou.parmTemplateType.String
+                        and template.stringType() == hou.stringParmType.FileReference and value):
+                    try:
+                        stat = os.stat(value)
+                        value = (value, stat.st_mtime, stat.st_size)
+                    except OSError:
+                        pass
+                parts.append((parm.name(), value))
+    return cache_key(*parts)
+
+
+### center and size from a hou.BoundingBox
+def bounds_from_bbox(bbox):
+    return tuple(bbox.center()), tuple(bbox.sizevec())
+
+
+### bounds of a USD file from its authored extents
+def get_usd_file_bounds(path):
+    try:
+        from pxr import Usd, UsdGeom
+    except ImportError:
+        return None
+    stage = Usd.Stage.Open(path)
+    if stage is None:
+        return None
+    purposes = [UsdGeom.Tokens.default_, UsdGeom.Tokens.render]
+    bbox_cache = UsdGeom.BBoxCache(Usd.TimeCode.Default(), purposes, useExtentsHint=True)
+    extent = bbox_cache.ComputeWorldBound(stage.GetPseudoRoot()).ComputeAlignedRange()
+    if extent.IsEmpty():
+        return None
+    low, high = extent.GetMin(), extent.GetMax()
+    center = tuple((low[i] + high[i]) / 2.0 for i in range(3))
+    size = tuple(high[i] - low[i] for i in range(3))
+    return center, size
+
+
+### bounds from the file a reader SOP loads, without loading its full geometry
+def get_file_bounds(sop):
+    type_name = sop.type().name().split("::")[0]
+    if type_name == "file":
+        path = sop.evalParm("file")
+    elif type_name == "alembic":
+        path = sop.evalParm("fileName")
+    else:
+        return None
+    if not path or not os.path.isfile(path):
+        return None
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension in USD_EXTENSIONS:
+        return get_usd_file_bounds(path)
+
+    #copy the reader into a scratch geo and switch it to bounds only / packed loading
+    probe_geo = hou.node("/obj").createNode("geo", "lookdev_bounds_probe")
+    try:
+        for child in probe_geo.children(): child.destroy()
+        probe = hou.copyNodesTo([sop], probe_geo)[0]
+        if type_name == "alembic":
+            probe.parm("loadmode").set("alembic")  #alembic delayed load primitives
+        elif extension in ALEMBIC_EXTENSIONS:
+            probe.parm("loadtype").set("delayed")  #packed alembic bounds come from the archive
+        else:
+            probe.parm("loadtype").set("infobbox")  #bounding box stored in the file header
+        geo = probe.geometry()
+        if geo is None:
+            return None
+        bbox = geo.boundingBox()
+    finally:
+        probe_geo.destroy()
+    if min(bbox.sizevec()) < 0 or max(bbox.sizevec()) <= 0:
+        return None
+    return bounds_from_bbox(bbox)
+
+
+### bounds of the model's render SOP (center, size) and where they came from
+def get_model_bounds(model_node, cache_root, signature=None):
+    cache = get_bounds_cache(cache_root)
+    if signature is None:
+        signature = get_model_signature(model_node)
+    cached = cache.get_json(signature)
+    if cached is not None:
+        return tuple(cached["center"]), tuple(cached["size"]), "cache"
+
+    #the render SOP, the display flag can be on a lighter viewport proxy
+    sop = model_node.renderNode()
+    bounds = None
+    source = None
+
+    #the viewport has usually cooked the model already, reading it is free
+    prims = None
+    if not sop.needsToCook():
+        bounds = bounds_from_bbox(sop.geometry().boundingBox())
+        source = "cooked"
+
+    #file, alembic and usd readers can tell us their bounds without loading everything
+    if bounds is None and not sop.inputs():
+        bounds = get_file_bounds(sop)
+        source = "file"
+
+    #last resort: cook the render SOP (packed geometry still only costs its packed bounds)
+    if bounds is None:
+        bounds = bounds_from_bbox(sop.geometry().boundingBox())
+        source = "cook"
+
+    #with the geometry at hand the primitive count is free too (see get_model_prim_count)
+    if source != "file":
+        prims = sop.geometry().intrinsicValue("primitivecount")
+    center, size = bounds
+    cache.put_json(signature, {"center": center, "size": size, "source": source, "prims": prims,
+                               "path": model_node.path()})
+    return center, size, source
+
+
+### primitive count of the model's render SOP if it is known without cooking (from the bounds cache or geometry
+### Houdini has already cooked), None otherwise
+def get_model_prim_count(model_node, cache_root, signature=None):
+    if signature is None:
+        signature = get_model_signature(model_node)
+    cached = get_bounds_cache(cache_root).get_json(signature)
+    if cached is not None and cached.get("prims") is not None:
+        return cached["prims"]
+    sop = model_node.renderNode()
+    if sop.needsToCook():
+        return None
+    return sop.geometry().intrinsicValue("primitivecount")
+
+
+### the model's point positions, or its bounding box corners if reading points would mean cooking it,
+### returns (points, True if they are the real points)
+def get_framing_points(sop, center, size):
+    if sop.needsToCook():
+        return box_corners(center, size), False
+    geo = sop.geometry()
+    if any(geo.countPrimType(prim_type) for prim_type in PACKED_PRIM_TYPES):
+        return box_corners(center, size), False
+    return points_from_buffer(geo.pointFloatAttribValuesAsString("P")), True
+
+
+### center, size and tight orbit radius of the model for the given camera and orbit angles
+### (cached when solved from the real points; the looser box corner fit is cheap and must not outlive a cook)
+def get_model_framing(model_node, cache_root, angles, tan_half_h, tan_half_v, padding=FRAMING_PADDING):
+    signature = get_model_signature(model_node)
+    center, size, source = get_model_bounds(model_node, cache_root, signature)
+
+    cache = get_bounds_cache(cache_root)
+    angle_key = sorted(set(round(angle % 360.0, 4) for angle in angles))
+    key = cache_key(signature, "framing", round(tan_half_h, 6), round(tan_half_v, 6), padding, angle_key)
+    cached = cache.get_json(key)
+    if cached is not None:
+        return center, size, cached["cam_distance"]
+
+    points, exact = get_framing_points(model_node.renderNode(), center, size)
+    cam_distance = solve_framing(points, center, angles, tan_half_h, tan_half_v, padding)
+    if exact:
+        cache.put_json(key, {"cam_distance": cam_distance, "points": len(points), "path": model_node.path()})
+    return center, size, cam_distance
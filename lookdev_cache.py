@@ -0,0 +1,141 @@
+"""
+Content-addressed disk cache for the lookdev turntable rig
+
+Entries live in <root>/<name>/<key><ext> and can be files or directories.
+Reads touch the entry's mtime so eviction drops the least recently used
+entries first once the cache grows past its size limit. No hou dependency.
+"""
+
+import hashlib
+import json
+import math
+import os
+import shutil
+import time
+
+
+### round a float to a number of significant digits so nearby values share a key
+def round_significant(value, digits=3):
+    value = float(value)
+    if value == 0:
+        return 0.0
+    return round(value, digits - 1 - int(math.floor(math.log10(abs(value)))))
+
+
+### stable hash of any json serializable values
+def cache_key(*parts):
+    data = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+### size of a cache entry on disk (file or directory)
+def entry_size(path):
+    if os.path.isdir(path):
+        total = 0
+        for dirpath, _, filenames in os.walk(path):
+            for filename in filenames:
+                try:
+                    total += os.path.getsize(os.path.join(dirpath, filename))
+                except OSError:
+                    pass
+        return total
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+class DiskCache(object):
+    def __init__(self, root, name, max_bytes=512 * 1024 * 1024):
+        self.directory = os.path.join(root, name)
+        self.max_bytes = max_bytes
+
+    #final location of an entry
+    def path(self, key, ext=""):
+        return os.path.join(self.directory, key + ext)
+
+    #return the entry path on a hit (marking it as recently used), None on a miss
+    def get(self, key, ext=""):
+        path = self.path(key, ext)
+        if not os.path.exists(path):
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return path
+
+    #temporary path to write a new entry to, keeps the extension so writers pick the right format
+    def temp_path(self, key, ext=""):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        return os.path.join(self.directory, "%s.tmp%d_%d%s" % (key, os.getpid(), int(time.time() * 1000), ext))
+
+    #move a finished temp file/directory into place and evict old entries
+    def commit(self, temp_path, key, ext=""):
+        path = self.path(key, ext)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        os.replace(temp_path, path)
+        self.evict(keep=path)
+        return path
+
+    #drop a single entry
+    def discard(self, key, ext=""):
+        path = self.path(key, ext)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            os.remove(path)
+
+    #json entries for small metadata
+    def get_json(self, key):
+        path = self.get(key, ".json")
+        if path is None:
+            return None
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put_json(self, key, data):
+        temp_path = self.temp_path(key, ".json")
+        with open(temp_path, "w") as f:
+            json.dump(data, f, indent=4)
+        return self.commit(temp_path, key, ".json")
+
+    #remove least recently used entries until the cache fits in max_bytes
+    def evict(self, keep=None):
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if ".tmp" in name:
+                continue
+            size = entry_size(path)
+            total += size
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+            entries.append((mtime, path, size))
+
+        removed = []
+        for mtime, path, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+            total -= size
+            removed.append(path)
+        return removed
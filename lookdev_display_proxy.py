@@ -0,0 +1,126 @@
+"""
+Viewport display proxy for heavy models in the lookdev turntable rig
+
+Scrubbing the turntable redraws the model on every frame. For models over
+DISPLAY_PROXY_MIN_PRIMS primitives the rig puts a lookdev_display_proxy file
+SOP inside the model's geo object that reads a decimated copy (or just the
+bounding box) from the disk cache and carries the display flag, while the
+render flag stays on the full resolution SOP, so Mantra and the static IFD
+bake still see the real model. Proxies are keyed by the model's upstream
+signature (see lookdev_bounds), so one is only decimated again when the
+model changes, and a lighter model's key remembers that it needs no proxy.
+The primitive count comes from the bounds cache or geometry Houdini has
+already cooked; a model that would have to be cooked just to count it gets
+no proxy until a later build knows its size.
+
+    import lookdev_display_proxy
+    lookdev_display_proxy.apply_display_proxy(hou.node("/obj/asset"), "reduce", cache_root)
+"""
+
+import hou
+
+from lookdev_bounds import get_model_prim_count, get_model_signature
+from lookdev_cache import DiskCache, cache_key
+
+
+DISPLAY_PROXY_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+DISPLAY_PROXY_VERSION = 1
+
+# SOP added inside the model's geo object
+DISPLAY_PROXY_NAME = "lookdev_display_proxy"
+
+# "reduce" decimates the model, "box" shows its bounding box, "off" draws the model itself
+DISPLAY_PROXY_MODES = ("reduce", "box", "off")
+
+# models with fewer primitives draw fast enough, decimated proxies keep about DISPLAY_PROXY_PRIMS
+DISPLAY_PROXY_MIN_PRIMS = 250000
+DISPLAY_PROXY_PRIMS = 50000
+
+
+### decimate (or box) the geometry of sop into path through a temporary geo object
+def bake_display_proxy(sop, mode, prims, path):
+    bake_geo = hou.node("/obj").createNode("geo", "lookdev_display_proxy_bake")
+    try:
+        for child in bake_geo.children(): child.destroy()
+        merge = bake_geo.createNode("object_merge", "model")
+        merge.parm("objpath1").set(sop.path())
+        merge.parm("xformtype").set(0)  #keep the model's object space, the proxy lives in the same object
+        unpack = bake_geo.createNode("unpack", "unpack")
+        unpack.setInput(0, merge)
+        if mode == "box":
+            reduced = bake_geo.createNode("bound", "bound")
+        else:
+            reduced = bake_geo.createNode("polyreduce", "polyreduce")
+            reduced.parm("percentage").set(100.0 * DISPLAY_PROXY_PRIMS / max(prims, 1))
+        reduced.setInput(0, unpack)
+        reduced.geometry().saveToFile(path)
+    finally:
+        bake_geo.destroy()
+
+
+### cached proxy file of the model's render SOP, baking it on a miss (None when the model needs no proxy, or when
+### its size is not known without cooking it, see get_model_prim_count)
+def get_display_proxy_file(model_node, mode, cache_root):
+    sop = model_node.renderNode()
+    cache = DiskCache(cache_root, "display_proxy", DISPLAY_PROXY_CACHE_MAX_BYTES)
+    signature = get_model_signature(model_node, sop)
+    key = cache_key("display_proxy", DISPLAY_PROXY_VERSION, mode, DISPLAY_PROXY_MIN_PRIMS, DISPLAY_PROXY_PRIMS,
+                    signature)
+    path = cache.get(key, ".bgeo.sc")
+    if path is not None:
+        return path
+    #an earlier build found this version light enough
+    if cache.get_json(key) is not None:
+        return None
+
+    #deciding must not cook the model, an uncooked one is drawn as is until a later build knows its size
+    prims = get_model_prim_count(model_node, cache_root, signature)
+    if prims is None:
+        return None
+    if prims < DISPLAY_PROXY_MIN_PRIMS:
+        cache.put_json(key, {"prims": prims, "path": model_node.path()})
+        return None
+    temp_path = cache.temp_path(key, ".bgeo.sc")
+    bake_display_proxy(sop, mode, prims, temp_path)
+    return cache.commit(temp_path, key, ".bgeo.sc")
+
+
+### remove the proxy SOP of a model and give the display flag back to its render SOP
+def remove_display_proxy(model_node):
+    proxy = model_node.node(DISPLAY_PROXY_NAME)
+    if proxy is None:
+        return
+    was_displayed = proxy.isDisplayFlagSet()
+    proxy.destroy()
+    if was_displayed:
+        model_node.renderNode().setDisplayFlag(True)
+
+
+### show the model through a proxy file SOP with the display flag, the render flag stays on the model's SOP
+def set_display_proxy(model_node, proxy_file):
+    proxy = model_node.node(DISPLAY_PROXY_NAME)
+    if proxy is None:
+        sop = model_node.renderNode()
+        proxy = model_node.createNode("file", DISPLAY_PROXY_NAME)
+        proxy.parm("loadtype").set("delayed")  #packed disk primitive, drawn without unpacking
+        proxy.moveToGoodPosition()
+        sop.setRenderFlag(True)
+    if proxy.evalParm("file") != proxy_file:
+        proxy.parm("file").set(proxy_file)
+    if not proxy.isDisplayFlagSet():
+        proxy.setDisplayFlag(True)
+    return proxy
+
+
+### add, refresh or remove the display proxy of a model for a mode of DISPLAY_PROXY_MODES, returns the proxy file
+def apply_display_proxy(model_node, mode, cache_root):
+    if mode not in DISPLAY_PROXY_MODES:
+        raise ValueError("Unknown display proxy mode %r, use one of %s" % (mode, ", ".join(DISPLAY_PROXY_MODES)))
+    if model_node.type().name() != "geo" or model_node.renderNode() is None:
+        return None
+    proxy_file = get_display_proxy_file(model_node, mode, cache_root) if mode != "off" else None
+    if proxy_file is None:
+        remove_display_proxy(model_node)
+    else:
+        set_display_proxy(model_node, proxy_file)
+    return proxy_file
@@ -0,0 +1,119 @@
+"""
+Tight framing solver for the lookdev turntable rig
+
+Finds the smallest orbit radius that keeps every point of the model inside
+the camera frustum at every orbit angle. The point cloud is first reduced to
+a small conservative set (max radius per angle/height bin around the orbit
+axis), then all angles are solved in one vectorized pass. No hou dependency.
+"""
+
+import math
+
+import numpy as np
+
+
+# keep the model inside this fraction of the frame (1.15 = 15% margin)
+FRAMING_PADDING = 1.15
+
+# bins used to reduce the point cloud before solving
+ANGLE_BINS = 360
+HEIGHT_BINS = 128
+
+# orbit angles framing is solved over, one full turn whatever the frame count (keeps the build cost constant)
+FRAMING_ANGLE_STEPS = 360
+
+# limit on temporary array size while solving, in elements
+SOLVE_CHUNK_ELEMENTS = 8 * 1024 * 1024
+
+
+### (N, 3) float32 view of a packed float buffer (e.g. pointFloatAttribValuesAsString("P")), no copy
+def points_from_buffer(buffer):
+    return np.frombuffer(buffer, dtype=np.float32).reshape(-1, 3)
+
+
+### the 8 corners of a box, used when only the bounds of the model are known
+def box_corners(center, size):
+    offsets = np.array([(x, y, z) for x in (-0.5, 0.5) for y in (-0.5, 0.5) for z in (-0.5, 0.5)])
+    return np.asarray(center, dtype=np.float64) + offsets * np.asarray(size, dtype=np.float64)
+
+
+### half angle tangents of a houdini camera's horizontal and vertical field of view
+def camera_tangents(focal, aperture, resx, resy, aspect=1.0):
+    tan_half_h = aperture / (2.0 * focal)
+    tan_half_v = tan_half_h * resy / (resx * aspect)
+    return tan_half_h, tan_half_v
+
+
+### reduce points to a conservative candidate set in orbit space (x, z, |y|) around center
+def reduce_points(points, center, angle_bins=ANGLE_BINS, height_bins=HEIGHT_BINS):
+    points = np.asarray(points)
+    if not len(points):
+        return np.zeros((0, 3))
+    x = points[:, 0] - np.float32(center[0])
+    z = points[:, 2] - np.float32(center[2])
+    w = np.abs(points[:, 1] - np.float32(center[1]))
+
+    #max radius from the orbit axis per (angle, height) bin
+    radius = np.hypot(x, z)
+    angle = np.arctan2(x, z)
+    angle_bin = np.minimum(((angle + math.pi) * (angle_bins / (2 * math.pi))).astype(np.int32), angle_bins - 1)
+    w_max = float(w.max())
+    if w_max > 0:
+        height_bin = np.minimum((w * (height_bins / w_max)).astype(np.int32), height_bins - 1)
+    else:
+        height_bin = np.zeros(len(w), dtype=np.int32)
+    key = angle_bin.astype(np.intp) * height_bins + height_bin
+    #matching dtypes keep maximum.at on its fast path, -1 marks empty bins
+    bin_radius = np.full(angle_bins * height_bins, -1, dtype=radius.dtype)
+    np.maximum.at(bin_radius, key, radius)
+    occupied = np.flatnonzero(bin_radius >= 0)
+
+    #each bin becomes the two outer corners of a triangle that contains its sector,
+    #plus the axis itself, so the max over candidates is never smaller than the max over points
+    step = 2 * math.pi / angle_bins
+    bin_angle = occupied // height_bins
+    bin_height = occupied % height_bins
+    outer_radius = bin_radius[occupied].astype(np.float64) / math.cos(step / 2)
+    top = (bin_height + 1) * (w_max / height_bins)
+    candidates = []
+    for edge in (0, 1):
+        edge_angle = (bin_angle + edge) * step - math.pi
+        candidates.append(np.column_stack((outer_radius * np.sin(edge_angle), outer_radius * np.cos(edge_angle), top)))
+    candidates.append(np.array([[0.0, 0.0, w_max]]))
+    return np.concatenate(candidates)
+
+
+### evenly spaced angles (degrees) over one full orbit from the initial angle
+def framing_angles(initial_angle, steps=FRAMING_ANGLE_STEPS):
+    return initial_angle + np.arange(steps, dtype=np.float64) * (360.0 / steps)
+
+
+### smallest orbit radius that keeps every candidate inside the padded frustum at every angle
+def solve_cam_distance(candidates, angles, tan_half_h, tan_half_v, padding=FRAMING_PADDING):
+    candidates = np.asarray(candidates, dtype=np.float64)
+    if not len(candidates):
+        return 0.0
+    angles = np.unique(np.round(np.mod(np.asarray(angles, dtype=np.float64), 360.0), 6))
+    inv_h = padding / tan_half_h
+    inv_v = padding / tan_half_v
+
+    #the distance a point needs is its depth towards the camera plus the larger of its offset along the camera's
+    #right axis (either side) times inv_h and its height times inv_v: the max of three linear functions of
+    #(x, z, w), so every angle is three columns of one matrix product
+    theta = np.radians(angles)
+    sin, cos = np.sin(theta), np.cos(theta)
+    directions = np.empty((3, 3 * len(angles)))
+    directions[:, 0::3] = (sin + cos * inv_h, cos - sin * inv_h, np.zeros_like(sin))
+    directions[:, 1::3] = (sin - cos * inv_h, cos + sin * inv_h, np.zeros_like(sin))
+    directions[:, 2::3] = (sin, cos, np.full_like(sin, inv_v))
+
+    distance = 0.0
+    chunk = max(1, SOLVE_CHUNK_ELEMENTS // directions.shape[1])
+    for first in range(0, len(candidates), chunk):
+        distance = max(distance, float(candidates[first:first + chunk].dot(directions).max()))
+    return distance
+
+
+### tight camera distance for a point cloud around center over the given orbit angles (degrees)
+def solve_framing(points, center, angles, tan_half_h, tan_half_v, padding=FRAMING_PADDING):
+    return solve_cam_distance(reduce_points(points, center), angles, tan_half_h, tan_half_v, padding)
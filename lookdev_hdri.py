@@ -0,0 +1,267 @@
+"""
+HDRI preprocessing for the lookdev turntable rig
+
+Validates an HDRI from its OpenEXR header and chunk offset table alone
+(channels, resolution, deep or subsampled data, truncated files), then
+converts it once with Houdini's iconvert into a tiled, mipmapped .rat in the
+disk cache, with a small preview made by icp in the same pass. The envlight
+reads the cached .rat so Mantra does not rebuild the map on every render.
+No hou dependency (the tools are found through $HFS or the PATH).
+"""
+
+import json
+import math
+import os
+import shutil
+import struct
+import subprocess
+
+from lookdev_cache import DiskCache, cache_key
+
+
+HDRI_CACHE_MAX_BYTES = 8 * 1024 * 1024 * 1024
+HDRI_BAKE_VERSION = 1
+
+# files inside a cache entry
+MAP_NAME = "map.rat"
+PREVIEW_NAME = "preview.jpg"
+HEADER_NAME = "header.json"
+
+# width of the preview (lat-long, so half as high)
+PREVIEW_WIDTH = 512
+
+EXR_MAGIC = b"\x76\x2f\x31\x01"
+EXR_TILED_FLAG = 0x200
+EXR_NON_IMAGE_FLAG = 0x800
+EXR_MULTIPART_FLAG = 0x1000
+
+# header attributes larger than this mean the file is not a sane EXR
+MAX_ATTRIBUTE_BYTES = 16 * 1024 * 1024
+
+COMPRESSIONS = ("none", "rle", "zips", "zip", "piz", "pxr24", "b44", "b44a", "dwaa", "dwab")
+PIXEL_TYPES = ("uint", "half", "float")
+LEVEL_MODES = ("one_level", "mipmap", "ripmap")
+
+# scanlines per chunk of each compression
+SCANLINES_PER_CHUNK = {"none": 1, "rle": 1, "zips": 1, "zip": 16, "pxr24": 16, "piz": 32, "b44": 32, "b44a": 32,
+                       "dwaa": 32, "dwab": 256}
+
+
+class HdriError(ValueError):
+    pass
+
+
+### read exactly size bytes or fail on a truncated header
+def read_exact(f, size, path):
+    data = f.read(size)
+    if len(data) != size:
+        raise HdriError("%s is truncated (header ends early)" % path)
+    return data
+
+
+### null terminated string from the header
+def read_string(f, path, limit=256):
+    data = b""
+    while True:
+        char = read_exact(f, 1, path)
+        if char == b"\0":
+            return data.decode("latin-1")
+        data += char
+        if len(data) > limit:
+            raise HdriError("%s has a corrupt header (unterminated name)" % path)
+
+
+### decode the header attributes we use, others are kept as their type name
+def decode_attribute(type_name, value):
+    if type_name == "chlist":
+        channels = []
+        offset = 0
+        while offset < len(value) and value[offset:offset + 1] != b"\0":
+            end = value.index(b"\0", offset)
+            name = value[offset:end].decode("latin-1")
+            pixel_type, _, x_sampling, y_sampling = struct.unpack("<iB3xii", value[end + 1:end + 17])
+            channels.append({"name": name, "type": PIXEL_TYPES[pixel_type] if 0 <= pixel_type < 3 else pixel_type,
+                             "x_sampling": x_sampling, "y_sampling": y_sampling})
+            offset = end + 17
+        return channels
+    if type_name == "box2i":
+        return struct.unpack("<iiii", value)
+    if type_name == "compression":
+        index = struct.unpack("<B", value)[0]
+        return COMPRESSIONS[index] if index < len(COMPRESSIONS) else index
+    if type_name == "tiledesc":
+        x_size, y_size, mode = struct.unpack("<IIB", value)
+        return {"x_size": x_size, "y_size": y_size, "level_mode": LEVEL_MODES[mode & 0xf] if (mode & 0xf) < 3 else mode,
+                "round_up": bool(mode >> 4)}
+    if type_name == "int":
+        return struct.unpack("<i", value)[0]
+    if type_name == "float":
+        return struct.unpack("<f", value)[0]
+    if type_name == "string":
+        return value.decode("latin-1")
+    return type_name
+
+
+### number of chunks in the offset table of a single part image (None if we do not check this layout)
+def get_chunk_count(header):
+    width, height = header["width"], header["height"]
+    if not header["tiled"]:
+        return int(math.ceil(height / float(SCANLINES_PER_CHUNK.get(header["compression"], 1))))
+    tiles = header["attributes"].get("tiles")
+    if not isinstance(tiles, dict) or tiles["level_mode"] not in ("one_level", "mipmap") or tiles["round_up"]:
+        return None
+    levels = 1 if tiles["level_mode"] == "one_level" else int(math.floor(math.log(max(width, height), 2))) + 1
+    count = 0
+    for level in range(levels):
+        level_width = max(1, width >> level)
+        level_height = max(1, height >> level)
+        count += int(math.ceil(level_width / float(tiles["x_size"]))) * int(math.ceil(level_height / float(tiles["y_size"])))
+    return count
+
+
+### parse an EXR header and check its chunk offset table against the file size
+def read_exr_header(path):
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        if f.read(4) != EXR_MAGIC:
+            raise HdriError("%s is not an OpenEXR file" % path)
+        flags = struct.unpack("<i", read_exact(f, 4, path))[0]
+        attributes = {}
+        while True:
+            name = read_string(f, path)
+            if not name:
+                break
+            type_name = read_string(f, path)
+            size = struct.unpack("<i", read_exact(f, 4, path))[0]
+            if size < 0 or size > MAX_ATTRIBUTE_BYTES:
+                raise HdriError("%s has a corrupt header (attribute %s is %d bytes)" % (path, name, size))
+            try:
+                attributes[name] = decode_attribute(type_name, read_exact(f, size, path))
+            except (struct.error, ValueError, IndexError):
+                raise HdriError("%s has a corrupt %s attribute" % (path, name))
+
+        header = {
+            "path": path,
+            "version": flags & 0xff,
+            "tiled": bool(flags & EXR_TILED_FLAG),
+            "deep": bool(flags & EXR_NON_IMAGE_FLAG),
+            "multipart": bool(flags & EXR_MULTIPART_FLAG),
+            "compression": attributes.get("compression"),
+            "channels": [channel["name"] for channel in attributes.get("channels") or []],
+            "attributes": attributes,
+        }
+        window = attributes.get("dataWindow")
+        if isinstance(window, tuple):
+            header["width"] = window[2] - window[0] + 1
+            header["height"] = window[3] - window[1] + 1
+
+        #every chunk offset must point inside the file, otherwise the pixels are cut off
+        if not header["multipart"] and not header["deep"] and header.get("width", 0) > 0 and header.get("height", 0) > 0:
+            chunk_count = get_chunk_count(header)
+            if chunk_count is not None:
+                table = read_exact(f, 8 * chunk_count, path)
+                offsets = struct.unpack("<%dQ" % chunk_count, table)
+                if any(offset <= 0 or offset >= file_size for offset in offsets):
+                    raise HdriError("%s is truncated or corrupt (chunk offsets point past the end of the file)" % path)
+    return header
+
+
+### check a parsed header can be used as an environment map, returns a list of warnings
+def validate_exr_header(header):
+    path = header["path"]
+    if header["deep"]:
+        raise HdriError("%s holds deep data and cannot be used as an environment map" % path)
+    if "width" not in header or not header["channels"]:
+        raise HdriError("%s is missing its dataWindow or channels" % path)
+    if header["width"] <= 0 or header["height"] <= 0:
+        raise HdriError("%s has an empty data window" % path)
+
+    names = header["channels"]
+    for component in ("R", "G", "B"):
+        if not any(name == component or name.endswith("." + component) for name in names):
+            raise HdriError("%s has no %s channel (channels: %s)" % (path, component, ", ".join(names)))
+    for channel in header["attributes"]["channels"]:
+        if channel["x_sampling"] != 1 or channel["y_sampling"] != 1:
+            raise HdriError("%s has subsampled channel %s" % (path, channel["name"]))
+
+    warnings = []
+    if header["width"] != 2 * header["height"]:
+        warnings.append("%s is %dx%d, not a 2:1 lat-long map" % (path, header["width"], header["height"]))
+    if header["multipart"]:
+        warnings.append("%s is a multipart EXR, only its first part is checked" % path)
+    return warnings
+
+
+### read and validate an HDRI, returns its header (with a "warnings" list), raises HdriError if it is unusable
+def check_hdri(path):
+    if not os.path.isfile(path):
+        raise HdriError("Invalid HDRI path: %s" % path)
+    header = read_exr_header(path)
+    header["warnings"] = validate_exr_header(header)
+    return header
+
+
+### a Houdini command line tool, from $HFS/bin if set
+def get_houdini_tool(name):
+    hfs = os.environ.get("HFS")
+    if hfs:
+        for file_name in (name, name + ".exe"):
+            path = os.path.join(hfs, "bin", file_name)
+            if os.path.isfile(path):
+                return path
+    return name
+
+
+### run a tool, raises HdriError with its output if it fails or does not write output_path
+def run_tool(command, output_path):
+    try:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    except OSError as error:
+        raise HdriError("cannot run %s: %s" % (command[0], error))
+    output = process.communicate()[0].decode("utf-8", "replace").strip()
+    if process.returncode != 0 or not os.path.isfile(output_path):
+        raise HdriError("%s failed (%s): %s" % (os.path.basename(command[0]), process.returncode, output))
+
+
+### result dict of a cache entry directory
+def read_entry(entry):
+    preview = os.path.join(entry, PREVIEW_NAME)
+    with open(os.path.join(entry, HEADER_NAME), "r") as f:
+        header = json.load(f)
+    return {"map": os.path.join(entry, MAP_NAME), "preview": preview if os.path.isfile(preview) else None,
+            "header": header, "converted": True, "error": None}
+
+
+### validate an EXR HDRI and return its cached .rat and preview, converting it on the first use (other
+### formats are used as they are, and the map falls back to the original file when the tools cannot convert it)
+def prepare_hdri(path, cache_root, preview_width=PREVIEW_WIDTH):
+    path = os.path.abspath(path)
+    if os.path.splitext(path)[1].lower() != ".exr":
+        return {"map": path, "preview": None, "header": None, "converted": False, "error": None}
+    header = check_hdri(path)
+
+    cache = DiskCache(cache_root, "hdri", HDRI_CACHE_MAX_BYTES)
+    stat = os.stat(path)
+    key = cache_key("hdri", HDRI_BAKE_VERSION, path, stat.st_size, stat.st_mtime, preview_width)
+    entry = cache.get(key)
+    if entry is not None and os.path.isfile(os.path.join(entry, MAP_NAME)):
+        return read_entry(entry)
+
+    temp_path = cache.temp_path(key)
+    os.makedirs(temp_path)
+    try:
+        run_tool([get_houdini_tool("iconvert"), path, os.path.join(temp_path, MAP_NAME)], os.path.join(temp_path, MAP_NAME))
+    except HdriError as error:
+        shutil.rmtree(temp_path, ignore_errors=True)
+        return {"map": path, "preview": None, "header": header, "converted": False, "error": str(error)}
+
+    #the preview is a nice to have, the map is usable without it
+    preview_path = os.path.join(temp_path, PREVIEW_NAME)
+    try:
+        run_tool([get_houdini_tool("icp"), "-w", str(preview_width), "-h", str(max(1, preview_width // 2)),
+                  path, preview_path], preview_path)
+    except HdriError:
+        pass
+    with open(os.path.join(temp_path, HEADER_NAME), "w") as f:
+        json.dump(header, f, indent=4, default=str)
+    return read_entry(cache.commit(temp_path, key))
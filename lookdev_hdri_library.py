@@ -0,0 +1,295 @@
+"""
+Indexed HDRI library for the lookdev turntable rig
+
+Scans HDRI directories and keeps per-file metadata in a JSON index in the
+disk cache: resolution, mean and peak luminance and the direction of the
+dominant light, measured with NumPy on a small lat-long downsample. Rescans
+only stat the files and reuse every entry whose size and mtime did not change,
+so a library of thousands of maps is re-indexed in a fraction of a second
+after the first pass. The dominant light gives the HDRI rotation offset that
+puts the key light KEY_LIGHT_ANGLE degrees to the side of the camera.
+
+    import lookdev_hdri_library
+    library = lookdev_hdri_library.HdriLibrary(cache_root)
+    library.scan(["/studio/hdri"])
+    for entry in library.search("studio", min_key_ratio=0.2):
+        print(entry["path"], entry["rotation_offset"])
+
+Pixels are read through hou (imported when the first map is measured), the
+rest has no hou dependency.
+"""
+
+import json
+import math
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+
+from lookdev_hdri import HdriError, get_houdini_tool, read_exr_header, run_tool
+
+
+HDRI_INDEX_VERSION = 1
+INDEX_NAME = "hdri_library.json"
+
+# extensions indexed as HDRIs
+HDRI_EXTENSIONS = (".exr", ".hdr", ".rat", ".pic")
+
+# size of the lat-long the stats are measured on
+STATS_WIDTH = 256
+STATS_HEIGHT = 128
+
+# the brightest fraction of the map (by solid angle) taken as the key light
+KEY_FRACTION = 0.01
+
+# azimuth (degrees from +Z towards +X) the centre of an unrotated lat-long faces, u grows towards +X
+MAP_CENTER_AZIMUTH = 180.0
+
+# where the key light should end up, in degrees around the model from the camera
+KEY_LIGHT_ANGLE = 45.0
+
+# Rec. 709 luminance of linear RGB
+LUMINANCE_WEIGHTS = (0.2126, 0.7152, 0.0722)
+
+
+### area average an image (rows, columns, channels) down to at most height x width
+def downsample(pixels, width=STATS_WIDTH, height=STATS_HEIGHT):
+    rows, columns = pixels.shape[:2]
+    step_y = max(1, rows // height)
+    step_x = max(1, columns // width)
+    rows -= rows % step_y
+    columns -= columns % step_x
+    blocks = pixels[:rows, :columns].reshape(rows // step_y, step_y, columns // step_x, step_x, -1)
+    return blocks.mean(axis=(1, 3))
+
+
+### unit direction of every pixel centre of a lat-long (rows top to bottom) and its solid angle
+def latlong_directions(width, height):
+    elevation = math.pi / 2 - (np.arange(height) + 0.5) / height * math.pi
+    azimuth = np.radians(MAP_CENTER_AZIMUTH - ((np.arange(width) + 0.5) / width - 0.5) * 360.0)
+    elevation, azimuth = np.meshgrid(elevation, azimuth, indexing="ij")
+    directions = np.stack((np.cos(elevation) * np.sin(azimuth), np.sin(elevation), np.cos(elevation) * np.cos(azimuth)), -1)
+    solid_angle = np.cos(elevation) * (2 * math.pi / width) * (math.pi / height)
+    return directions, solid_angle
+
+
+### HDRI rotation offset that puts a light at key_azimuth on the side of the camera
+def key_rotation_offset(key_azimuth, key_light_angle=KEY_LIGHT_ANGLE):
+    #the envlight turns by rotation_offset + 180 with the camera, so the offset does not depend on the orbit
+    offset = (key_light_angle - 180.0 - key_azimuth) % 360.0
+    return offset - 360.0 if offset > 180.0 else offset
+
+
+### luminance stats and dominant light of a lat-long (rows top to bottom, RGB or RGBA)
+def latlong_stats(pixels):
+    pixels = np.nan_to_num(np.asarray(pixels, dtype=np.float64)[..., :3], nan=0.0, posinf=0.0, neginf=0.0)
+    pixels = downsample(np.maximum(pixels, 0.0))
+    height, width = pixels.shape[:2]
+    luminance = pixels.dot(LUMINANCE_WEIGHTS)
+    directions, solid_angle = latlong_directions(width, height)
+
+    energy = luminance * solid_angle
+    total = energy.sum()
+    stats = {
+        "mean_luminance": float(total / solid_angle.sum()),
+        "peak_luminance": float(luminance.max()),
+        "key_azimuth": None,
+        "key_elevation": None,
+        "key_ratio": 0.0,
+        "rotation_offset": 0.0,
+    }
+    if total <= 0:
+        return stats
+
+    #brightest pixels covering KEY_FRACTION of the sphere
+    order = np.argsort(luminance, axis=None)[::-1]
+    covered = np.cumsum(solid_angle.ravel()[order])
+    key = order[:np.searchsorted(covered, KEY_FRACTION * solid_angle.sum()) + 1]
+    vector = (directions.reshape(-1, 3)[key] * energy.ravel()[key, None]).sum(axis=0)
+    length = np.linalg.norm(vector)
+    if length <= 0:
+        return stats
+    stats["key_azimuth"] = float(math.degrees(math.atan2(vector[0], vector[2])))
+    stats["key_elevation"] = float(math.degrees(math.asin(max(-1.0, min(1.0, vector[1] / length)))))
+    stats["key_ratio"] = float(energy.ravel()[key].sum() / total)
+    stats["rotation_offset"] = round(key_rotation_offset(stats["key_azimuth"]), 3)
+    return stats
+
+
+### float RGBA pixels of an image through hou, rows top to bottom
+def load_image(path):
+    import hou
+    width, height = hou.imageResolution(path)
+    data = hou.loadImageDataFromFile(path, hou.imageDepth.Float32)
+    #hou returns the rows bottom up
+    return np.frombuffer(data, dtype=np.float32).reshape(height, width, 4)[::-1]
+
+
+### resolution of an HDRI, from the EXR header when there is one
+def get_resolution(path):
+    if path.lower().endswith(".exr"):
+        header = read_exr_header(path)
+        if "width" in header:
+            return header["width"], header["height"]
+    import hou
+    return tuple(hou.imageResolution(path))
+
+
+### read a downsampled lat-long of an HDRI, shrunk by icp first so big maps are never fully loaded
+def load_latlong(path, loader=load_image):
+    temp_dir = tempfile.mkdtemp(prefix="lookdev_hdri_")
+    try:
+        small_path = os.path.join(temp_dir, "stats.exr")
+        try:
+            run_tool([get_houdini_tool("icp"), "-w", str(STATS_WIDTH), "-h", str(STATS_HEIGHT), path, small_path], small_path)
+        except HdriError:
+            small_path = path
+        return loader(small_path)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+### measure one HDRI, returns its index entry (with an "error" instead of stats when it cannot be read)
+def measure_hdri(path, stat, loader=load_image):
+    entry = {"path": path, "name": os.path.splitext(os.path.basename(path))[0], "size": stat.st_size,
+             "mtime": stat.st_mtime, "width": None, "height": None, "error": None}
+    try:
+        entry["width"], entry["height"] = get_resolution(path)
+        entry.update(latlong_stats(load_latlong(path, loader)))
+    except Exception as error:
+        entry["error"] = str(error)
+    return entry
+
+
+### every HDRI file under the given directories with its stat result
+def find_hdris(directories):
+    found = {}
+    stack = [os.path.abspath(directory) for directory in directories]
+    while stack:
+        directory = stack.pop()
+        try:
+            items = list(os.scandir(directory))
+        except OSError:
+            continue
+        for item in items:
+            if item.is_dir():
+                stack.append(item.path)
+            elif os.path.splitext(item.name)[1].lower() in HDRI_EXTENSIONS:
+                try:
+                    found[item.path] = item.stat()
+                except OSError:
+                    pass
+    return found
+
+
+class HdriLibrary(object):
+    def __init__(self, cache_root, loader=load_image):
+        self.path = os.path.join(cache_root, INDEX_NAME)
+        self.loader = loader
+        self.entries = {}
+        self.directories = []
+        #the dialog scans and looks maps up on worker threads
+        self.lock = threading.RLock()
+        self.load()
+
+    #read the index from disk, an outdated or broken index starts empty
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return
+        if data.get("version") == HDRI_INDEX_VERSION:
+            self.entries = data.get("entries", {})
+            self.directories = data.get("directories", [])
+
+    #write the index atomically
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        temp_path = "%s.tmp%d_%d" % (self.path, os.getpid(), threading.current_thread().ident)
+        with self.lock:
+            data = {"version": HDRI_INDEX_VERSION, "directories": list(self.directories), "entries": dict(self.entries)}
+        with open(temp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(temp_path, self.path)
+
+    #entry of a file, re-measured only when its size or mtime changed
+    def update_entry(self, path, stat):
+        with self.lock:
+            entry = self.entries.get(path)
+        if entry is not None and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            return entry, False
+        entry = measure_hdri(path, stat, self.loader)
+        with self.lock:
+            self.entries[path] = entry
+        return entry, True
+
+    #index the HDRIs under directories (the previously scanned ones by default), returns the number measured
+    def scan(self, directories=None, progress=None):
+        with self.lock:
+            if directories is not None:
+                self.directories = sorted(set(self.directories) | set(os.path.abspath(d) for d in directories))
+            scan_directories = list(self.directories)
+        found = find_hdris(scan_directories)
+
+        #files that were deleted or are outside the library now
+        with self.lock:
+            stale = [path for path in self.entries if path not in found]
+            for path in stale:
+                del self.entries[path]
+
+        measured = 0
+        for index, path in enumerate(sorted(found)):
+            measured += self.update_entry(path, found[path])[1]
+            if progress is not None:
+                progress(index + 1, len(found), path)
+        if measured or stale or directories is not None:
+            self.save()
+        return measured
+
+    #entry of a single file (indexing it if needed), None if it does not exist
+    def lookup(self, path):
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        entry, measured = self.update_entry(path, stat)
+        if measured:
+            self.save()
+        return entry
+
+    #entries matching all the given filters, text matches the file name and folder
+    def search(self, text="", min_width=0, min_mean=None, max_mean=None, min_peak=None, min_key_ratio=None,
+               include_errors=False, sort="name"):
+        words = text.lower().split()
+        results = []
+        with self.lock:
+            entries = list(self.entries.values())
+        for entry in entries:
+            if entry["error"] and not include_errors:
+                continue
+            if any(word not in entry["path"].lower() for word in words):
+                continue
+            if min_width and (entry["width"] or 0) < min_width:
+                continue
+            if min_mean is not None and entry.get("mean_luminance", 0) < min_mean:
+                continue
+            if max_mean is not None and entry.get("mean_luminance", 0) > max_mean:
+                continue
+            if min_peak is not None and entry.get("peak_luminance", 0) < min_peak:
+                continue
+            if min_key_ratio is not None and entry.get("key_ratio", 0) < min_key_ratio:
+                continue
+            results.append(entry)
+
+        if sort == "name":
+            results.sort(key=lambda entry: (entry["name"].lower(), entry["path"]))
+        else:
+            #numeric stats, highest first
+            results.sort(key=lambda entry: entry.get(sort) or 0, reverse=True)
+        return results
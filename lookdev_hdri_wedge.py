@@ -0,0 +1,212 @@
+"""
+HDRI wedge for the lookdev turntable rig
+
+Renders the same turntable under several HDRIs. The rig's hdri_path and
+every map in its hdri_wedge setting are lighting variants: the first uses
+lookdev_envlight, the others get a lookdev_envlight_<name> that follows its
+rotation and intensity through channel references. The extra lights have
+their display flag off, so only one lights the viewport, and Mantra only
+renders what the ROP forces. Each variant is a take (a child of every asset
+take on a multi-asset rig) that points the ROP at its light and at a
+per-HDRI output folder.
+
+render_hdri_wedge() renders every variant in one session and reuses one
+render plan per asset. With static IFDs the model is baked and proxied
+once, every variant writes its small per-frame IFDs against the same baked
+geometry, and a single mantra pool renders the IFDs of all variants.
+
+    import lookdev_hdri_wedge
+    lookdev_hdri_wedge.build_hdri_wedge(["/hdri/studio.exr", "/hdri/sunset.exr"])
+    lookdev_hdri_wedge.render_hdri_wedge(static_ifd=True, workers=4)
+"""
+
+import json
+import os
+import re
+
+import hou
+
+from lookdev_render_plan import plan_rop, render_turntable
+from lookdev_takes import ROP_PATH, current_take, get_rig_assets
+from lookdev_turntable_rig import get_env_map, rig_transaction
+
+
+VARIANT_LIGHT_PREFIX = "lookdev_envlight_"
+VARIANT_TAKE_PREFIX = "lookdev_hdri_"
+
+# envlight parms the variant lights take from lookdev_envlight
+FOLLOWED_PARMS = ("ry", "light_intensity")
+
+
+### unique node-safe names of the HDRIs (file names without extension)
+def get_variant_names(hdri_paths):
+    names = []
+    for path in hdri_paths:
+        base = re.sub(r"[^A-Za-z0-9_]", "_", os.path.splitext(os.path.basename(path))[0]) or "hdri"
+        name = base
+        index = 2
+        while name in names:
+            name = "%s_%d" % (base, index)
+            index += 1
+        names.append(name)
+    return names
+
+
+### take name of a variant under a parent take
+def get_variant_take_name(parent, name):
+    if parent == hou.takes.rootTake():
+        return VARIANT_TAKE_PREFIX + name
+    return "%s_hdri_%s" % (parent.name(), name)
+
+
+### output of a variant: the image folder of the parent take's output with a folder per HDRI
+def get_variant_output(base_output, name):
+    directory, file_name = os.path.split(base_output)
+    return os.path.join(directory, name, file_name)
+
+
+### variants stored on a rig ([] without a wedge)
+def get_rig_variants(subnet):
+    return json.loads(subnet.userData("lookdev_hdri_variants") or "[]")
+
+
+### remove the lights and takes of a previous wedge
+def remove_hdri_variants(subnet):
+    for variant in get_rig_variants(subnet):
+        for take_name in variant["takes"]:
+            take = hou.takes.findTake(take_name)
+            if take is not None:
+                take.destroy()
+        light = hou.node(variant["light"])
+        if light is not None and light.name().startswith(VARIANT_LIGHT_PREFIX):
+            light.destroy()
+    subnet.destroyUserData("lookdev_hdri_variants", must_exist=False)
+
+
+### envlight of an extra HDRI that follows lookdev_envlight
+def create_variant_light(subnet, name, hdri_path):
+    env = subnet.node("lookdev_envlight")
+    light = subnet.createNode("envlight", VARIANT_LIGHT_PREFIX + name)
+    light.setFirstInput(subnet.node("hdri_rotation"))
+    light.parm("light_enable").set(True)
+    light.parm("light_contribprimary").set(True)
+    for parm_name in FOLLOWED_PARMS:
+        light.parm(parm_name).setExpression('ch("../%s/%s")' % (env.name(), parm_name), hou.exprLanguage.Hscript)
+    light.parm("env_map").set(get_env_map(hdri_path))
+    #hidden in the viewport, Mantra still renders it when the ROP forces it
+    light.setDisplayFlag(False)
+    return light
+
+
+### take of one variant under a parent take: the ROP renders its light into its own folder
+def create_variant_take(parent, name, light, mantra):
+    with current_take(parent):
+        base_output = mantra.parm("vm_picture").unexpandedString()
+    take = parent.addChildTake(get_variant_take_name(parent, name))
+    try:
+        with current_take(take):
+            take.addParmTuple(mantra.parmTuple("forcelights"))
+            mantra.parm("forcelights").set(light.path())
+            take.addParmTuple(mantra.parmTuple("vm_picture"))
+            mantra.parm("vm_picture").set(get_variant_output(base_output, name))
+    except Exception:
+        #takes are not nodes, the transaction's rollback does not see them
+        take.destroy()
+        raise
+    return take
+
+
+### light every rig variant (hdri_path first, then the wedge) with its own envlight and take, as one transaction
+def build_hdri_wedge(hdri_paths, subnet=None):
+    subnet = subnet or hou.node("/obj/lookdev_rig")
+    if subnet is None:
+        raise ValueError("Build a lookdev rig before adding an HDRI wedge.")
+    mantra = hou.node(ROP_PATH)
+
+    with rig_transaction("Build Lookdev HDRI Wedge"):
+        with current_take(hou.takes.rootTake()):
+            remove_hdri_variants(subnet)
+            if not hdri_paths:
+                return []
+
+            #the take of every asset on a multi-asset rig, or the root take
+            parents = [hou.takes.findTake(asset["take"]) for asset in get_rig_assets(subnet)]
+            parents = [take for take in parents if take is not None] or [hou.takes.rootTake()]
+
+            variants = []
+            created = []
+            try:
+                for index, (name, hdri_path) in enumerate(zip(get_variant_names(hdri_paths), hdri_paths)):
+                    light = subnet.node("lookdev_envlight") if index == 0 else create_variant_light(subnet, name, hdri_path)
+                    takes = [create_variant_take(parent, name, light, mantra) for parent in parents]
+                    created.extend(takes)
+                    variants.append({"name": name, "hdri": hdri_path, "light": light.path(),
+                                     "takes": [take.name() for take in takes]})
+            except Exception:
+                for take in created:
+                    take.destroy()
+                raise
+            subnet.setUserData("lookdev_hdri_variants", json.dumps(variants))
+    return variants
+
+
+### add, update or remove the wedge of a rig to match its settings (hdri_path plus the hdri_wedge list)
+def apply_hdri_wedge(values, subnet=None):
+    subnet = subnet or hou.node("/obj/lookdev_rig")
+    wedge = list(values.get("hdri_wedge") or [])
+    if wedge:
+        return build_hdri_wedge([values["hdri_path"]] + wedge, subnet)
+    if get_rig_variants(subnet):
+        with rig_transaction("Remove Lookdev HDRI Wedge"):
+            with current_take(hou.takes.rootTake()):
+                remove_hdri_variants(subnet)
+    return []
+
+
+### variant takes grouped by their parent take, [(parent take name, [(variant, take)])]
+def get_variant_takes(subnet):
+    groups = []
+    by_parent = {}
+    for variant in get_rig_variants(subnet):
+        for take_name in variant["takes"]:
+            take = hou.takes.findTake(take_name)
+            if take is None:
+                raise ValueError("Take %s of HDRI variant %s is missing" % (take_name, variant["name"]))
+            parent_name = take.parent().name()
+            if parent_name not in by_parent:
+                by_parent[parent_name] = []
+                groups.append((parent_name, by_parent[parent_name]))
+            by_parent[parent_name].append((variant, take))
+    return groups
+
+
+### render every HDRI variant of the rig in this session, returns {take name: plan} (plan None without dedup)
+### (one plan per asset is shared by its variants: only the light differs between them)
+def render_hdri_wedge(rop=ROP_PATH, dedup=True, static_ifd=False, workers=2, threads=None, keep_ifds=False,
+                      verbose=False):
+    if isinstance(rop, str):
+        rop = hou.node(rop)
+    subnet = hou.node("/obj/lookdev_rig")
+    groups = get_variant_takes(subnet) if subnet is not None else []
+    if not groups:
+        raise ValueError("No HDRI wedge on the lookdev rig in this scene.")
+    if static_ifd:
+        if len(groups) > 1:
+            raise ValueError("Static IFD wedges render a single asset rig, render multi-asset wedges without it.")
+        from lookdev_ifd import render_static_variants
+        return render_static_variants(rop, [take for variant, take in groups[0][1]], workers=workers,
+                                      threads=threads, keep_ifds=keep_ifds)
+
+    plans = {}
+    for parent_name, variant_takes in groups:
+        plan = None
+        for variant, take in variant_takes:
+            with current_take(take):
+                if not dedup:
+                    rop.render(verbose=verbose, output_progress=verbose)
+                    plans[take.name()] = None
+                    continue
+                if plan is None:
+                    plan = plan_rop(rop)
+                plans[take.name()] = render_turntable(rop, plan, verbose=verbose)
+    return plans
@@ -0,0 +1,205 @@
+"""
+Static geometry IFD export for the lookdev turntable rig
+
+Only the camera, sweep_animation and envlight transforms change between
+frames. The model is baked once into the disk cache (keyed by its upstream
+signature) and rendered through a proxy object that loads it as a packed disk
+primitive, like the sweep and the ref kit, so a copy of the Mantra ROP writes
+small per-frame IFDs that reference the baked files instead of carrying the
+geometry. The IFDs of every distinct pose are rendered by a pool of local
+mantra processes and repeated poses are linked (see lookdev_render_plan).
+Lighting variant takes (see lookdev_hdri_wedge) share the bake, the proxy
+and one mantra pool.
+
+    import lookdev_ifd
+    lookdev_ifd.render_static_turntable("/obj/lookdev_ropnet/lookdev_mantra", workers=4)
+"""
+
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import hou
+
+from lookdev_bounds import get_model_signature
+from lookdev_cache import DiskCache, cache_key
+from lookdev_hdri import get_houdini_tool
+from lookdev_render_plan import frame_ranges, get_output_path, link_output, plan_rop
+from lookdev_takes import current_take
+from lookdev_turntable_rig import defer, get_cache_root, rig_transaction
+
+
+# size limit of the baked model cache, bump the version when the bake changes
+MODEL_CACHE_MAX_BYTES = 8 * 1024 * 1024 * 1024
+MODEL_BAKE_VERSION = 1
+
+# nodes added next to the rig for the static render
+MODEL_PROXY_NAME = "lookdev_model_static"
+IFD_ROP_NAME = "lookdev_mantra_ifd"
+
+
+### bake the model's render SOP into the disk cache, or reuse the bake of an unchanged model
+def bake_model(model_node, cache_root):
+    sop = model_node.renderNode()
+    cache = DiskCache(cache_root, "model", MODEL_CACHE_MAX_BYTES)
+    key = cache_key("model", MODEL_BAKE_VERSION, get_model_signature(model_node, sop))
+    path = cache.get(key, ".bgeo.sc")
+    if path is not None:
+        return path
+    temp_path = cache.temp_path(key, ".bgeo.sc")
+    sop.geometry().saveToFile(temp_path)
+    return cache.commit(temp_path, key, ".bgeo.sc")
+
+
+### geo object in the rig that loads the baked model as a packed disk primitive, in place of the model
+def create_model_proxy(subnet, model_node, model_file):
+    proxy = subnet.node(MODEL_PROXY_NAME)
+    if proxy is None:
+        proxy = subnet.createNode("geo", MODEL_PROXY_NAME)
+        for child in proxy.children():
+            child.destroy()
+        reader = proxy.createNode("file", "model_cache")
+        reader.parm("loadtype").set("delayed")  #packed disk primitive
+        output = proxy.createNode("null", "OUT")
+        output.setInput(0, reader)
+        output.setDisplayFlag(True)
+        output.setRenderFlag(True)
+        proxy.setDisplayFlag(False)
+        defer(proxy.layoutChildren)
+
+    proxy.node("model_cache").parm("file").set(model_file)
+    proxy.setWorldTransform(model_node.worldTransform())
+    #object level material of the model, SOP level assignments are baked into the file
+    if model_node.parm("shop_materialpath") is not None:
+        proxy.parm("shop_materialpath").set(model_node.parm("shop_materialpath").eval())
+    return proxy
+
+
+### copy of the mantra ROP that writes IFDs to ifd_dir and renders the proxy instead of the model
+def create_ifd_rop(rop, model_node, proxy, ifd_dir):
+    ifd_rop = rop.parent().node(IFD_ROP_NAME)
+    if ifd_rop is not None:
+        ifd_rop.destroy()
+    ifd_rop = hou.copyNodesTo([rop], rop.parent())[0]
+    ifd_rop.setName(IFD_ROP_NAME)
+
+    objects = [proxy.path() if path == model_node.path() else path for path in rop.evalParm("forceobject").split()]
+    ifd_rop.parm("forceobject").set(" ".join(objects))
+    #images keep the names the original ROP would give them
+    ifd_rop.parm("vm_picture").set(rop.parm("vm_picture").unexpandedString().replace("$OS", rop.name()))
+    ifd_rop.parm("soho_outputmode").set(1)
+    ifd_rop.parm("soho_diskfile").set(os.path.join(ifd_dir, rop.name() + ".$F4.ifd"))
+    return ifd_rop
+
+
+### write the IFDs of the given frames, returns their paths
+def export_ifds(ifd_rop, frames, step=1):
+    for start, end in frame_ranges(frames, step):
+        ifd_rop.render(frame_range=(start, end, step))
+    return [ifd_rop.parm("soho_diskfile").evalAtFrame(frame) for frame in frames]
+
+
+### render IFDs over a pool of local mantra processes, threads split between them
+def render_ifds(ifd_paths, workers=2, threads=None):
+    workers = max(1, workers)
+    if threads is None:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+    mantra = get_houdini_tool("mantra")
+
+    def render_one(ifd_path):
+        return ifd_path, subprocess.call([mantra, "-j", str(threads), "-f", ifd_path])
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(render_one, ifd_paths))
+    failed = [ifd_path for ifd_path, returncode in results if returncode != 0]
+    if failed:
+        raise RuntimeError("mantra failed on %d of %d IFDs: %s" % (len(failed), len(ifd_paths), ", ".join(failed)))
+    return results
+
+
+### create the image folder of a ROP and the ifd folder in it, returns the ifd folder
+def make_output_dirs(rop, frame):
+    image_dir = os.path.dirname(get_output_path(rop, frame))
+    ifd_dir = os.path.join(image_dir, "ifd")
+    for directory in (image_dir, ifd_dir):
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+    return ifd_dir
+
+
+### bake the model and set up its proxy and the IFD ROP (in the root take, the only one new nodes can be edited in)
+def setup_static_render(rop, model_node, ifd_dir):
+    subnet = hou.node("/obj/lookdev_rig")
+    if model_node is None:
+        model_node = hou.node(subnet.userData("lookdev_model"))
+    model_file = bake_model(model_node, get_cache_root())
+    with current_take(hou.takes.rootTake()):
+        with rig_transaction("Lookdev Static IFD Setup"):
+            proxy = create_model_proxy(subnet, model_node, model_file)
+            return create_ifd_rop(rop, model_node, proxy, ifd_dir)
+
+
+### duplicate frames point at the image of the pose they repeat
+def link_duplicates(ifd_rop, plan):
+    for frame, source_frame in sorted(plan["duplicates"].items()):
+        source = get_output_path(ifd_rop, source_frame)
+        if os.path.isfile(source):
+            link_output(source, get_output_path(ifd_rop, frame))
+
+
+def remove_ifds(ifd_paths):
+    for ifd_path in ifd_paths:
+        if os.path.isfile(ifd_path):
+            os.remove(ifd_path)
+
+
+### step between the frames of a plan
+def get_plan_step(plan):
+    frames = plan["frames"]
+    return frames[1] - frames[0] if len(frames) > 1 else 1
+
+
+### render a turntable ROP through static geometry IFDs, returns the render plan
+def render_static_turntable(rop, model_node=None, workers=2, threads=None, keep_ifds=False):
+    if isinstance(rop, str):
+        rop = hou.node(rop)
+    plan = plan_rop(rop)
+    ifd_dir = make_output_dirs(rop, plan["frames"][0])
+    ifd_rop = setup_static_render(rop, model_node, ifd_dir)
+
+    ifd_paths = export_ifds(ifd_rop, plan["unique"], get_plan_step(plan))
+    render_ifds(ifd_paths, workers, threads)
+    link_duplicates(ifd_rop, plan)
+    if not keep_ifds:
+        remove_ifds(ifd_paths)
+    return plan
+
+
+### render lighting variant takes of one model through static geometry IFDs: the model is baked and proxied
+### once, each take writes IFDs of the shared plan's poses, and one mantra pool renders the IFDs of every take
+### (returns {take name: plan})
+def render_static_variants(rop, takes, model_node=None, workers=2, threads=None, keep_ifds=False):
+    if isinstance(rop, str):
+        rop = hou.node(rop)
+    with current_take(takes[0]):
+        plan = plan_rop(rop)
+        ifd_rop = setup_static_render(rop, model_node, make_output_dirs(rop, plan["frames"][0]))
+
+    ifd_paths = []
+    for take in takes:
+        with current_take(take):
+            ifd_dir = make_output_dirs(rop, plan["frames"][0])
+            for parm_name in ("forcelights", "vm_picture", "soho_diskfile"):
+                take.addParmTuple(ifd_rop.parmTuple(parm_name))
+            ifd_rop.parm("forcelights").set(rop.evalParm("forcelights"))
+            ifd_rop.parm("vm_picture").set(rop.parm("vm_picture").unexpandedString().replace("$OS", rop.name()))
+            ifd_rop.parm("soho_diskfile").set(os.path.join(ifd_dir, rop.name() + ".$F4.ifd"))
+            ifd_paths.extend(export_ifds(ifd_rop, plan["unique"], get_plan_step(plan)))
+
+    render_ifds(ifd_paths, workers, threads)
+    for take in takes:
+        with current_take(take):
+            link_duplicates(ifd_rop, plan)
+    if not keep_ifds:
+        remove_ifds(ifd_paths)
+    return dict((take.name(), plan) for take in takes)
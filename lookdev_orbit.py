@@ -0,0 +1,120 @@
+"""
+Orbit path math for the lookdev turntable rig
+
+Computes the camera / sweep orbit for the whole turntable in one batch so the
+rig can write each channel with a single setKeyframes call. No hou dependency,
+so it can be imported and checked outside of Houdini.
+"""
+
+import math
+
+import numpy as np
+
+
+# frames per turntable pass, frames keyed per orbit pass and the number of frames one full turn takes
+DEFAULT_FRAME_COUNT = 100
+ORBIT_KEY_COUNT = DEFAULT_FRAME_COUNT + 1
+ORBIT_PERIOD = DEFAULT_FRAME_COUNT - 1
+
+
+### key count and period of the orbit for a pass of frame_count frames
+def orbit_timing(frame_count=DEFAULT_FRAME_COUNT):
+    if frame_count < 2:
+        raise ValueError("Turntable needs at least 2 frames per pass, got %s" % frame_count)
+    return frame_count + 1, frame_count - 1
+
+
+### first and last frame of the full turntable (orbit pass + hdri pass)
+def turntable_range(start_frame, frame_count=DEFAULT_FRAME_COUNT):
+    return start_frame, start_frame + 2 * frame_count
+
+
+### envlight ry keys: follow the orbit for the first pass, rotate back on the second
+def envlight_keys(initial_angle, start_frame, frame_count=DEFAULT_FRAME_COUNT):
+    base = initial_angle + 180
+    frames = (start_frame, start_frame + frame_count - 1, start_frame + 2 * frame_count - 1)
+    return frames, (base - 360, base, base - 360)
+
+
+### frame numbers covered by the orbit keys
+def orbit_frames(start_frame, key_count=ORBIT_KEY_COUNT):
+    return np.arange(start_frame, start_frame + key_count, dtype=np.float64)
+
+
+### compute every (tx, ty, tz) sample of the orbit as a (key_count, 3) array
+def orbit_samples(center, cam_distance, initial_angle, start_frame,
+                  frame_count=DEFAULT_FRAME_COUNT):
+    key_count, period = orbit_timing(frame_count)
+    frames = orbit_frames(start_frame, key_count)
+    t = (frames - start_frame) / float(period)
+    angle_rad = np.radians(initial_angle + t * 360.0)
+
+    samples = np.empty((key_count, 3), dtype=np.float64)
+    samples[:, 0] = center[0] + cam_distance * np.sin(angle_rad)
+    samples[:, 1] = center[1]
+    samples[:, 2] = center[2] + cam_distance * np.cos(angle_rad)
+    return frames, samples
+
+
+### per-frame reference of the orbit (the original keyframing loop)
+def reference_orbit_samples(center, cam_distance, initial_angle, start_frame,
+                            frame_count=DEFAULT_FRAME_COUNT):
+    key_count, period = orbit_timing(frame_count)
+    samples = []
+    for f in range(start_frame, start_frame + key_count):
+        t = (f - start_frame) / float(period)
+        angle_rad = math.radians(initial_angle + t * 360)
+        samples.append((
+            center[0] + cam_distance * math.sin(angle_rad),
+            center[1],
+            center[2] + cam_distance * math.cos(angle_rad),
+        ))
+    return samples
+
+
+### check batched orbit samples against the per-frame reference, returns the max error
+def check_orbit_samples(samples, center, cam_distance, initial_angle, start_frame,
+                        tolerance=1e-6, frame_count=DEFAULT_FRAME_COUNT):
+    reference = np.asarray(reference_orbit_samples(
+        center, cam_distance, initial_angle, start_frame, frame_count))
+    samples = np.asarray(samples, dtype=np.float64)
+    if samples.shape != reference.shape:
+        raise ValueError("Orbit sample shape %s does not match reference %s"
+                         % (samples.shape, reference.shape))
+
+    error = float(np.max(np.abs(samples - reference))) if len(reference) else 0.0
+    if error > tolerance:
+        raise ValueError("Orbit samples differ from reference by %g (tolerance %g)"
+                         % (error, tolerance))
+    return error
+
+
+### Hscript expression for the orbit angle, read from spare parms on the rig control
+def orbit_phase_expression(control="."):
+    start = 'ch("%s/orbit_start")' % control
+    frames = 'ch("%s/orbit_frames")' % control
+    return ('ch("{c}/orbit_angle") + 360 * ch("{c}/orbit_turns") * '
+            '(clamp($FF, {s}, {s} + {n}) - {s}) / ({n} - 1)').format(c=control, s=start, n=frames)
+
+
+### Hscript expressions for tx, ty, tz of a node orbiting the lookat target
+def orbit_position_expressions(control, target):
+    radius = 'ch("%s/orbit_radius")' % control
+    phase = 'ch("%s/orbit_phase")' % control
+    return {
+        "tx": 'ch("%s/tx") + %s * sin(%s)' % (target, radius, phase),
+        "ty": 'ch("%s/ty")' % target,
+        "tz": 'ch("%s/tz") + %s * cos(%s)' % (target, radius, phase),
+    }
+
+
+### Hscript expression for the envlight ry (linear version of envlight_keys)
+def envlight_rotation_expression(control):
+    start = 'ch("%s/orbit_start")' % control
+    frames = 'ch("%s/orbit_frames")' % control
+    sweep = '360 * ch("%s/orbit_turns")' % control
+    base = '(ch("%s/orbit_angle") + 180)' % control
+    return ('if($FF < {s} + {n} - 1, '
+            '{b} - {w} + {w} * (max($FF, {s}) - {s}) / ({n} - 1), '
+            '{b} - {w} * (min($FF, {s} + 2 * {n} - 1) - ({s} + {n} - 1)) / {n})'
+            ).format(s=start, n=frames, w=sweep, b=base)
@@ -0,0 +1,240 @@
+"""
+Progressive turntable preview for the lookdev rig
+
+Renders the distinct poses of the turntable coarse to fine (every 16th pose,
+then the ones halfway between, down to every pose) at a fraction of the
+resolution with draft sampling, inside a temporary take so the ROP keeps its
+final settings. Every finished frame is tone mapped into a PNG and the
+contact sheet next to it is rewritten, with frames that are not rendered yet
+holding the nearest earlier pose (dimmed). After each pass the preview movie
+is assembled again with ffmpeg from the PNGs, each held for as many frames
+as it stands in for, so a full orbit can be reviewed minutes after the
+render starts. Everything is written to a preview folder next to the ROP's
+images.
+
+    import lookdev_preview
+    lookdev_preview.render_progressive("/obj/lookdev_ropnet/lookdev_mantra")
+
+ffmpeg is looked up in LOOKDEV_FFMPEG or the PATH, the movie is skipped
+without it.
+"""
+
+import os
+import shutil
+import struct
+import subprocess
+import zlib
+
+import numpy as np
+
+import hou
+
+from lookdev_hdri_library import downsample, load_image
+from lookdev_render_plan import get_output_path, plan_rop, render_turntable
+from lookdev_render_tune import TUNE_PRESETS, apply_preset
+from lookdev_takes import ROP_PATH, current_take
+
+
+TAKE_NAME = "lookdev_preview"
+PREVIEW_DIR_NAME = "preview"
+
+# poses between the frames of the first pass, halved every pass
+FIRST_STEP = 16
+
+# preview resolution (a res_fraction menu entry of the ROP) and sampling (a TUNE_PRESETS name)
+PREVIEW_RES_FRACTION = "0.25"
+PREVIEW_PRESET = "draft"
+
+# contact sheet layout (cells are frames shrunk by a whole factor to about CONTACT_CELL_WIDTH), and how dark
+# cells holding an earlier pose are drawn
+CONTACT_COLUMNS = 20
+CONTACT_CELL_WIDTH = 128
+HELD_BRIGHTNESS = 0.35
+
+MOVIE_FPS = 24
+
+
+### order frames coarse to fine: every first_step-th one, then the ones halfway between, until all are in
+def progressive_order(frames, first_step=FIRST_STEP):
+    step = 1
+    while step * 2 <= max(1, first_step):
+        step *= 2
+    ordered = list(frames[::step])
+    while step > 1:
+        ordered.extend(frames[step // 2::step])
+        step //= 2
+    return ordered
+
+
+### index in the order at which each coarse to fine pass ends
+def pass_ends(frame_count, first_step=FIRST_STEP):
+    step = 1
+    while step * 2 <= max(1, first_step):
+        step *= 2
+    ends = []
+    done = len(range(0, frame_count, step))
+    ends.append(done)
+    while step > 1:
+        done += len(range(step // 2, frame_count, step))
+        ends.append(done)
+        step //= 2
+    return ends
+
+
+### image shown for every frame of the plan: its own, its pose's, or the nearest earlier rendered one
+### (the first rendered one before any), returns [(frame shown, held)] in plan order
+def held_frames(plan, rendered):
+    shown = []
+    last = None
+    first = min(rendered) if rendered else None
+    for frame in plan["frames"]:
+        source = plan["duplicates"].get(frame, frame)
+        if source in rendered:
+            last = source
+            shown.append((source, False))
+        else:
+            shown.append((last if last is not None else first, True))
+    return shown
+
+
+### linear float RGB to 8 bit sRGB
+def to_srgb8(pixels):
+    pixels = np.clip(np.nan_to_num(np.asarray(pixels, dtype=np.float64)[..., :3]), 0.0, 1.0)
+    srgb = np.where(pixels <= 0.0031308, pixels * 12.92, 1.055 * np.power(pixels, 1 / 2.4) - 0.055)
+    return (srgb * 255.0 + 0.5).astype(np.uint8)
+
+
+### write an 8 bit RGB array (rows, columns, 3) as a PNG, atomically
+def write_png(path, rgb):
+    height, width = rgb.shape[:2]
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xffffffff)
+    rows = np.hstack((np.zeros((height, 1), dtype=np.uint8), np.ascontiguousarray(rgb).reshape(height, width * 3)))
+    data = (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(rows.tobytes(), 1)) + chunk(b"IEND", b""))
+    temp_path = path + ".tmp.png"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+    return path
+
+
+### area average an image by the whole factor that brings it closest to CONTACT_CELL_WIDTH wide
+def shrink(pixels, width=CONTACT_CELL_WIDTH):
+    step = max(1, pixels.shape[1] // width)
+    return downsample(pixels, pixels.shape[1] // step, pixels.shape[0] // step)
+
+
+### contact sheet of every frame of the plan from the thumbnails rendered so far (frame: 8 bit RGB)
+def compose_contact_sheet(plan, thumbnails, columns=CONTACT_COLUMNS):
+    cell_height, cell_width = next(iter(thumbnails.values())).shape[:2]
+    shown = held_frames(plan, thumbnails)
+    rows = (len(shown) + columns - 1) // columns
+    sheet = np.zeros((rows * cell_height, columns * cell_width, 3), dtype=np.uint8)
+    for index, (frame, held) in enumerate(shown):
+        cell = thumbnails[frame]
+        if held:
+            cell = (cell * HELD_BRIGHTNESS).astype(np.uint8)
+        row, column = divmod(index, columns)
+        sheet[row * cell_height:(row + 1) * cell_height, column * cell_width:(column + 1) * cell_width] = cell
+    return sheet
+
+
+### ffmpeg executable, None if there is none
+def get_ffmpeg():
+    return os.environ.get("LOOKDEV_FFMPEG") or shutil.which("ffmpeg")
+
+
+### assemble the preview movie from the frame PNGs, each held as long as it stands in for later frames,
+### returns the movie path (None without ffmpeg)
+def write_movie(plan, frame_paths, movie_path, fps=MOVIE_FPS):
+    ffmpeg = get_ffmpeg()
+    if ffmpeg is None:
+        return None
+    runs = []
+    for frame, held in held_frames(plan, frame_paths):
+        if runs and runs[-1][0] == frame:
+            runs[-1][1] += 1
+        else:
+            runs.append([frame, 1])
+
+    list_path = movie_path + ".txt"
+    with open(list_path, "w") as f:
+        f.write("ffconcat version 1.0\n")
+        for frame, count in runs:
+            f.write("file '%s'\nduration %.6f\n" % (frame_paths[frame].replace("'", "'\\''"), count / float(fps)))
+        #the concat demuxer drops the duration of the last entry without a closing file line
+        f.write("file '%s'\n" % frame_paths[runs[-1][0]].replace("'", "'\\''"))
+    temp_path = movie_path + ".tmp.mp4"
+    command = [ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path,
+               "-vf", "fps=%d,scale=trunc(iw/2)*2:trunc(ih/2)*2,format=yuv420p" % fps,
+               "-c:v", "libx264", "-crf", "23", temp_path]
+    try:
+        if subprocess.call(command) != 0:
+            raise RuntimeError("ffmpeg failed to write %s" % movie_path)
+        os.replace(temp_path, movie_path)
+    finally:
+        for path in (list_path, temp_path):
+            if os.path.exists(path):
+                os.remove(path)
+    return movie_path
+
+
+### folder of the preview next to the ROP's images
+def get_preview_dir(rop, plan):
+    return os.path.join(os.path.dirname(get_output_path(rop, plan["frames"][0])), PREVIEW_DIR_NAME)
+
+
+### render the turntable's poses coarse to fine at a reduced resolution, updating the contact sheet after every
+### frame and the movie after every pass, returns {"dir", "contact_sheet", "movie", "order", "plan"}
+def render_preview(rop=ROP_PATH, res_fraction=PREVIEW_RES_FRACTION, first_step=FIRST_STEP, preset=PREVIEW_PRESET,
+                   movie=True, fps=MOVIE_FPS, progress=None, verbose=False):
+    if isinstance(rop, str):
+        rop = hou.node(rop)
+    plan = plan_rop(rop)
+    preview_dir = get_preview_dir(rop, plan)
+    frames_dir = os.path.join(preview_dir, "frames")
+    if not os.path.isdir(frames_dir):
+        os.makedirs(frames_dir)
+    name = os.path.basename(get_output_path(rop, plan["frames"][0])).split(".")[0]
+    sheet_path = os.path.join(preview_dir, name + "_contact_sheet.png")
+    movie_path = os.path.join(preview_dir, name + "_preview.mp4") if movie else None
+
+    order = progressive_order(plan["unique"], first_step)
+    ends = set(pass_ends(len(plan["unique"]), first_step))
+    thumbnails = {}
+    frame_paths = {}
+    written_movie = None
+    take = hou.takes.currentTake().addChildTake(TAKE_NAME)
+    try:
+        with current_take(take):
+            for parm_name in ["override_camerares", "res_fraction", "vm_picture"] + sorted(dict(TUNE_PRESETS)[preset]):
+                take.addParmTuple(rop.parmTuple(parm_name))
+            rop.parm("override_camerares").set(True)
+            rop.parm("res_fraction").set(res_fraction)
+            rop.parm("vm_picture").set(os.path.join(frames_dir, name + ".$F4.exr"))
+            apply_preset(rop, dict(TUNE_PRESETS)[preset])
+
+            for index, frame in enumerate(order):
+                rop.render(frame_range=(frame, frame), verbose=verbose)
+                pixels = load_image(get_output_path(rop, frame))
+                frame_paths[frame] = write_png(os.path.join(frames_dir, "%s.%04d.png" % (name, frame)), to_srgb8(pixels))
+                thumbnails[frame] = to_srgb8(shrink(pixels))
+                write_png(sheet_path, compose_contact_sheet(plan, thumbnails))
+                if movie and index + 1 in ends:
+                    written_movie = write_movie(plan, frame_paths, movie_path, fps)
+                if progress is not None:
+                    progress(index + 1, len(order), frame)
+    finally:
+        take.destroy()
+    return {"dir": preview_dir, "contact_sheet": sheet_path, "movie": written_movie, "order": order, "plan": plan}
+
+
+### progressive preview first, then the final quality turntable with the ROP's own settings, returns the final plan
+def render_progressive(rop=ROP_PATH, verbose=False, **preview_options):
+    if isinstance(rop, str):
+        rop = hou.node(rop)
+    preview = render_preview(rop, verbose=verbose, **preview_options)
+    if verbose:
+        print("preview written to %s" % preview["dir"])
+    return render_turntable(rop, verbose=verbose)
@@ -0,0 +1,215 @@
+"""
+Opt-in build profiler for the lookdev turntable rig
+
+Set LOOKDEV_PROFILE=1 to record the wall time of every build phase and how
+many createNode, setKeyframe(s), parm and parm tuple set, setExpression,
+setParmTemplateGroup and layoutChildren calls it made, written as JSON next to the saved settings.
+LOOKDEV_PROFILE=perfmon also records a hou.perfMon profile of the build with
+one event per phase. When the variable is not set the phase markers do nothing.
+
+Phase times include their nested phases, call counts go to the innermost one.
+Time spent waiting on the user (a modal dialog) is marked with profile_wait
+and left out of the total and of every phase.
+"""
+
+import contextlib
+import json
+import os
+import time
+
+
+PROFILE_ENV = "LOOKDEV_PROFILE"
+
+# hou methods counted per phase: (class names to patch, method names, prefix of the counted name)
+COUNTED_METHODS = (
+    (("Node", "OpNode"), ("createNode", "setParmTemplateGroup", "layoutChildren"), ""),
+    (("Parm",), ("set", "setKeyframe", "setKeyframes", "setExpression"), ""),
+    (("ParmTuple",), ("set",), "parmTuple."),
+)
+
+# calls made outside of any phase
+UNPHASED = "(unphased)"
+
+# profiler of the build that is running, None when profiling is off
+_active = None
+
+
+### profiling mode from the environment: None, "calls" or "perfmon"
+def profiling_mode():
+    value = os.environ.get(PROFILE_ENV, "").strip().lower()
+    if value in ("", "0", "false", "off"):
+        return None
+    return "perfmon" if value == "perfmon" else "calls"
+
+
+class BuildProfiler(object):
+    def __init__(self, hou, name, use_perfmon=False):
+        self.hou = hou
+        self.name = name
+        self.use_perfmon = use_perfmon
+        self.phases = {}
+        self.order = []
+        self.stack = []
+        self.patched = []
+        self.perfmon_profile = None
+        self.perfmon_path = None
+        self.start_time = None
+        self.total_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    #per phase record, created on first use so re-entered phases accumulate
+    def record(self, name):
+        if name not in self.phases:
+            self.phases[name] = {"name": name, "seconds": 0.0, "entered": 0, "calls": {}}
+            self.order.append(name)
+        return self.phases[name]
+
+    #count a hou call against the innermost phase
+    def count(self, method_name):
+        calls = self.record(self.stack[-1] if self.stack else UNPHASED)["calls"]
+        calls[method_name] = calls.get(method_name, 0) + 1
+
+    #wrap the counted hou methods on the classes that define them
+    def patch(self):
+        for class_names, method_names, prefix in COUNTED_METHODS:
+            for class_name in class_names:
+                cls = getattr(self.hou, class_name, None)
+                if cls is None:
+                    continue
+                for method_name in method_names:
+                    original = cls.__dict__.get(method_name)
+                    if original is None:
+                        continue
+                    setattr(cls, method_name, self.counting(prefix + method_name, original))
+                    self.patched.append((cls, method_name, original))
+
+    def unpatch(self):
+        for cls, method_name, original in reversed(self.patched):
+            setattr(cls, method_name, original)
+        self.patched = []
+
+    def counting(self, counted_name, original):
+        profiler = self
+        def wrapper(*args, **kwargs):
+            profiler.count(counted_name)
+            return original(*args, **kwargs)
+        wrapper.__name__ = original.__name__
+        return wrapper
+
+    def start(self):
+        self.patch()
+        if self.use_perfmon:
+            self.perfmon_profile = self.hou.perfMon.startProfile("lookdev rig: " + self.name)
+        self.start_time = time.time()
+
+    def stop(self):
+        self.total_seconds = time.time() - self.start_time - self.wait_seconds
+        self.unpatch()
+        if self.perfmon_profile is not None:
+            self.perfmon_profile.stop()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        record = self.record(name)
+        record["entered"] += 1
+        event = self.hou.perfMon.startEvent("lookdev: " + name) if self.perfmon_profile is not None else None
+        self.stack.append(name)
+        start = time.time()
+        try:
+            yield record
+        finally:
+            record["seconds"] += time.time() - start
+            self.stack.pop()
+            if event is not None:
+                event.stop()
+
+    #interactive wait, taken out of the total and of the phases it is nested in
+    @contextlib.contextmanager
+    def wait(self):
+        start = time.time()
+        try:
+            yield
+        finally:
+            seconds = time.time() - start
+            self.wait_seconds += seconds
+            for name in self.stack:
+                self.phases[name]["seconds"] -= seconds
+
+    #totals over every phase
+    def call_totals(self):
+        totals = {}
+        for record in self.phases.values():
+            for method_name, count in record["calls"].items():
+                totals[method_name] = totals.get(method_name, 0) + count
+        return totals
+
+    def report(self):
+        try:
+            version = self.hou.applicationVersionString()
+        except Exception:
+            version = None
+        return {
+            "name": self.name,
+            "houdini_version": version,
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "total_seconds": self.total_seconds,
+            "wait_seconds": self.wait_seconds,
+            "calls": self.call_totals(),
+            "phases": [self.phases[name] for name in self.order],
+            "perfmon": self.perfmon_path,
+        }
+
+    #write the json report, and the perfMon profile next to it
+    def write(self, path):
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        if self.perfmon_profile is not None:
+            self.perfmon_path = os.path.splitext(path)[0] + ".hperf"
+            self.perfmon_profile.save(self.perfmon_path)
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=4)
+        return path
+
+
+### profile everything inside the block when LOOKDEV_PROFILE is set, and write the report to report_path
+@contextlib.contextmanager
+def profile_build(hou, name, report_path):
+    global _active
+    mode = profiling_mode()
+    if mode is None or _active is not None:
+        yield None
+        return
+
+    profiler = BuildProfiler(hou, name, use_perfmon=(mode == "perfmon"))
+    _active = profiler
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        _active = None
+        try:
+            profiler.write(report_path)
+        except (OSError, IOError):
+            pass
+
+
+### mark a build phase, does nothing unless a profile_build block is running
+@contextlib.contextmanager
+def profile_phase(name):
+    if _active is None:
+        yield None
+        return
+    with _active.phase(name) as record:
+        yield record
+
+
+### mark time spent waiting on the user, left out of the profile
+@contextlib.contextmanager
+def profile_wait():
+    if _active is None:
+        yield
+        return
+    with _active.wait():
+        yield
@@ -0,0 +1,152 @@
+"""
+Pose deduplicating render plan for the lookdev turntable ROP
+
+Hashes everything that changes between frames of the turntable (world
+transforms of the camera, the rendered objects and the lights, plus the
+camera lens and light parms) at every frame of the ROP range, renders only
+the first frame of every distinct pose and hard links (or copies) its image
+to the frame numbers that repeat it. If any rendered geometry is time
+dependent every frame is rendered.
+
+    import lookdev_render_plan
+    lookdev_render_plan.render_turntable("/obj/lookdev_ropnet/lookdev_mantra")
+"""
+
+import os
+import shutil
+
+import hou
+
+from lookdev_cache import cache_key
+
+
+# transforms are compared after rounding to this many decimals (360 degrees apart must match)
+POSE_DECIMALS = 5
+
+# camera and light parms that change the image without moving anything
+CAMERA_PARMS = ("focal", "aperture", "resx", "resy", "aspect", "near", "far", "winx", "winy", "winsizex", "winsizey")
+LIGHT_PARMS = ("light_enable", "light_intensity", "light_color", "env_map")
+
+
+### frames rendered by a ROP (start, end, step from its f parms)
+def get_rop_frames(rop):
+    start, end, step = rop.evalParmTuple("f")
+    step = max(1, int(round(step)))
+    return list(range(int(round(start)), int(round(end)) + 1, step))
+
+
+### camera, rendered objects and lights of a mantra ROP
+def get_render_nodes(rop):
+    camera = hou.node(rop.evalParm("camera"))
+    objects = [hou.node(path) for path in rop.evalParm("forceobject").split()]
+    lights = [hou.node(path) for path in rop.evalParm("forcelights").split()]
+    return camera, [node for node in objects if node is not None], [node for node in lights if node is not None]
+
+
+### True if any rendered object's geometry changes over time (then no two frames can be assumed equal)
+def has_animated_geometry(objects):
+    for node in objects:
+        sop = node.renderNode()
+        if sop is not None and sop.isTimeDependent():
+            return True
+    return False
+
+
+### values of the parms that exist on node at frame
+def parm_values(node, parm_names, frame):
+    values = []
+    for parm_name in parm_names:
+        parm = node.parm(parm_name) or node.parmTuple(parm_name)
+        if parm is not None:
+            values.append((parm_name, parm.evalAtFrame(frame)))
+    return values
+
+
+### rounded world transform of a node at frame
+def world_transform(node, frame):
+    matrix = node.worldTransformAtTime(hou.frameToTime(frame)).asTuple()
+    return [round(value, POSE_DECIMALS) + 0.0 for value in matrix]
+
+
+### hash of the pose of the turntable at frame
+def pose_key(camera, objects, lights, frame):
+    parts = [world_transform(camera, frame), parm_values(camera, CAMERA_PARMS, frame)]
+    for node in objects:
+        parts.append((node.path(), world_transform(node, frame)))
+    for node in lights:
+        parts.append((node.path(), world_transform(node, frame), parm_values(node, LIGHT_PARMS, frame)))
+    return cache_key(*parts)
+
+
+### plan from a key per frame: the frames to render and, for the others, the frame they repeat
+def build_plan(frames, keys):
+    first_frame = {}
+    unique = []
+    duplicates = {}
+    for frame, key in zip(frames, keys):
+        if key in first_frame:
+            duplicates[frame] = first_frame[key]
+        else:
+            first_frame[key] = frame
+            unique.append(frame)
+    return {"frames": list(frames), "unique": unique, "duplicates": duplicates}
+
+
+### render plan of a ROP
+def plan_rop(rop):
+    frames = get_rop_frames(rop)
+    camera, objects, lights = get_render_nodes(rop)
+    if has_animated_geometry(objects):
+        plan = build_plan(frames, frames)
+        plan["animated_geometry"] = True
+        return plan
+    plan = build_plan(frames, [pose_key(camera, objects, lights, frame) for frame in frames])
+    plan["animated_geometry"] = False
+    return plan
+
+
+### split sorted frames into (start, end) runs of consecutive frames
+def frame_ranges(frames, step=1):
+    ranges = []
+    for frame in frames:
+        if ranges and frame == ranges[-1][1] + step:
+            ranges[-1][1] = frame
+        else:
+            ranges.append([frame, frame])
+    return [tuple(frame_range) for frame_range in ranges]
+
+
+### image a ROP writes for a frame
+def get_output_path(rop, frame):
+    return rop.parm("vm_picture").evalAtFrame(frame)
+
+
+### put source at target as a hard link, or a copy where links are not possible
+def link_output(source, target):
+    if os.path.abspath(source) == os.path.abspath(target):
+        return
+    if os.path.lexists(target):
+        os.remove(target)
+    try:
+        os.link(source, target)
+    except (OSError, AttributeError):
+        shutil.copy2(source, target)
+
+
+### render the unique poses of a ROP and fill in the duplicate frames from them, returns the plan
+def render_turntable(rop, plan=None, verbose=False):
+    if isinstance(rop, str):
+        rop = hou.node(rop)
+    if plan is None:
+        plan = plan_rop(rop)
+    frames = plan["frames"]
+    step = frames[1] - frames[0] if len(frames) > 1 else 1
+    for start, end in frame_ranges(plan["unique"], step):
+        rop.render(frame_range=(start, end, step), verbose=verbose, output_progress=verbose)
+
+    #duplicate frames point at the image of the pose they repeat
+    for frame, source_frame in sorted(plan["duplicates"].items()):
+        source = get_output_path(rop, source_frame)
+        if os.path.isfile(source):
+            link_output(source, get_output_path(rop, frame))
+    return plan
@@ -0,0 +1,237 @@
+"""
+Time-budgeted sampling for the lookdev Mantra ROP
+
+Renders a few probe frames spread over the distinct poses of the turntable
+(both ends of the orbit and of the HDRI pass) at a fraction of the camera
+resolution, once with the cheapest and once with the most expensive preset
+of TUNE_PRESETS, inside a temporary take so the ROP is left as it was. The
+probe times give a fixed per-frame cost plus a cost per camera ray that is
+scaled to the full resolution, and the probe images give a noise level
+(Immerkaer's estimate on luminance, relative to the mean) that falls off
+with the pixel samples. The best preset that fits the target seconds per
+frame (or the cheapest one under max_noise) is applied to the ROP and the
+projected render time of every frame the render plan renders is reported.
+
+    import lookdev_render_tune
+    report = lookdev_render_tune.tune_render(target_seconds=90)
+    print(lookdev_render_tune.format_report(report))
+
+Projections assume render time is linear in pixel samples and that the
+presets in between the two probed ones fall on the same line.
+"""
+
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+import hou
+
+from lookdev_hdri_library import LUMINANCE_WEIGHTS, load_image
+from lookdev_render_plan import plan_rop
+from lookdev_takes import ROP_PATH, current_take
+
+
+TAKE_NAME = "lookdev_render_tune"
+
+# sampling presets from cheapest to best, parms of the mantra ROP
+TUNE_PRESETS = (
+    ("draft", {"vm_samples": (2, 2), "vm_minraysamples": 1, "vm_maxraysamples": 4, "vm_variance": 0.02,
+               "vm_diffuselimit": 1, "vm_reflectlimit": 2, "vm_refractlimit": 2}),
+    ("low", {"vm_samples": (3, 3), "vm_minraysamples": 1, "vm_maxraysamples": 6, "vm_variance": 0.01,
+             "vm_diffuselimit": 1, "vm_reflectlimit": 4, "vm_refractlimit": 4}),
+    ("medium", {"vm_samples": (4, 4), "vm_minraysamples": 1, "vm_maxraysamples": 9, "vm_variance": 0.005,
+                "vm_diffuselimit": 2, "vm_reflectlimit": 6, "vm_refractlimit": 6}),
+    ("high", {"vm_samples": (6, 6), "vm_minraysamples": 1, "vm_maxraysamples": 12, "vm_variance": 0.0025,
+              "vm_diffuselimit": 2, "vm_reflectlimit": 8, "vm_refractlimit": 8}),
+    ("final", {"vm_samples": (8, 8), "vm_minraysamples": 1, "vm_maxraysamples": 16, "vm_variance": 0.001,
+               "vm_diffuselimit": 3, "vm_reflectlimit": 10, "vm_refractlimit": 10}),
+)
+
+# probes per preset and their resolution (a res_fraction menu entry of the ROP)
+PROBE_COUNT = 4
+PROBE_RES_FRACTION = "0.25"
+
+
+### pixel samples of a preset
+def get_pixel_samples(settings):
+    samples_x, samples_y = settings["vm_samples"]
+    return samples_x * samples_y
+
+
+### count frames spread evenly over the distinct poses of a render plan, first and last included
+def get_probe_frames(plan, count=PROBE_COUNT):
+    unique = plan["unique"]
+    if len(unique) <= count:
+        return list(unique)
+    indices = sorted(set(int(round(index * (len(unique) - 1) / float(count - 1))) for index in range(count)))
+    return [unique[index] for index in indices]
+
+
+### noise of an image (rows, columns, channels) relative to its mean luminance (Immerkaer's fast noise estimate)
+def estimate_noise(pixels):
+    pixels = np.nan_to_num(np.asarray(pixels, dtype=np.float64)[..., :3], nan=0.0, posinf=0.0, neginf=0.0)
+    luminance = pixels.dot(LUMINANCE_WEIGHTS)
+    height, width = luminance.shape
+    if height < 3 or width < 3:
+        return 0.0
+    #3x3 kernel [[1, -2, 1], [-2, 4, -2], [1, -2, 1]] that cancels smooth gradients
+    laplacian = (luminance[:-2, :-2] + luminance[:-2, 2:] + luminance[2:, :-2] + luminance[2:, 2:]
+                 - 2 * (luminance[:-2, 1:-1] + luminance[2:, 1:-1] + luminance[1:-1, :-2] + luminance[1:-1, 2:])
+                 + 4 * luminance[1:-1, 1:-1])
+    sigma = math.sqrt(math.pi / 2) * np.abs(laplacian).sum() / (6.0 * (width - 2) * (height - 2))
+    mean = luminance.mean()
+    return float(sigma / mean) if mean > 0 else 0.0
+
+
+### projected seconds per full resolution frame and noise of every preset from the probes of the cheapest
+### and the best preset, probes are {"frame", "preset", "seconds", "noise", "pixels"}
+def fit_presets(probes, full_pixels, presets=TUNE_PRESETS):
+    low_name, low = presets[0]
+    high_name, high = presets[-1]
+    low_spp = get_pixel_samples(low)
+    high_spp = get_pixel_samples(high)
+    by_frame = {}
+    for probe in probes:
+        by_frame.setdefault(probe["frame"], {})[probe["preset"]] = probe
+
+    fits = []
+    for frame, frame_probes in sorted(by_frame.items()):
+        if low_name not in frame_probes or high_name not in frame_probes:
+            continue
+        low_probe = frame_probes[low_name]
+        high_probe = frame_probes[high_name]
+        #seconds = fixed + per_ray * pixel samples * pixels
+        low_rays = low_spp * low_probe["pixels"]
+        high_rays = high_spp * high_probe["pixels"]
+        per_ray = max(0.0, (high_probe["seconds"] - low_probe["seconds"]) / float(max(high_rays - low_rays, 1)))
+        fixed = max(0.0, low_probe["seconds"] - per_ray * low_rays)
+        #noise = low noise * (low samples / samples) ** falloff, the falloff is 0.5 for pure Monte Carlo noise
+        falloff = 0.0
+        if low_probe["noise"] > 0 and high_probe["noise"] > 0:
+            falloff = math.log(low_probe["noise"] / high_probe["noise"]) / math.log(high_spp / float(low_spp))
+        fits.append((fixed, per_ray, low_probe["noise"], min(1.0, max(0.0, falloff))))
+    if not fits:
+        raise ValueError("No frame was probed with both the %s and the %s preset" % (low_name, high_name))
+
+    estimates = []
+    for name, settings in presets:
+        spp = get_pixel_samples(settings)
+        seconds = [fixed + per_ray * spp * full_pixels for fixed, per_ray, noise, falloff in fits]
+        noise = [noise * (low_spp / float(spp)) ** falloff for fixed, per_ray, noise, falloff in fits]
+        estimates.append({"preset": name, "settings": settings, "seconds_per_frame": sum(seconds) / len(seconds),
+                          "noise": sum(noise) / len(noise)})
+    return estimates
+
+
+### best estimate within target_seconds per frame (the cheapest one under max_noise if given), the cheapest if none fits
+def choose_preset(estimates, target_seconds, max_noise=None):
+    fitting = [estimate for estimate in estimates if estimate["seconds_per_frame"] <= target_seconds]
+    if not fitting:
+        return dict(estimates[0], within_budget=False)
+    if max_noise is not None:
+        for estimate in fitting:
+            if estimate["noise"] <= max_noise:
+                return dict(estimate, within_budget=True)
+    return dict(fitting[-1], within_budget=True)
+
+
+### set the sampling parms of a preset on the ROP
+def apply_preset(rop, settings):
+    for name, value in sorted(settings.items()):
+        if isinstance(value, tuple):
+            rop.parmTuple(name).set(value)
+        else:
+            rop.parm(name).set(value)
+
+
+### render one probe frame with a preset into image_dir (the ROP's parms are set in the current take)
+def render_probe(rop, frame, name, settings, image_dir):
+    apply_preset(rop, settings)
+    rop.parm("vm_picture").set(os.path.join(image_dir, name + ".$F4.exr"))
+    start = time.perf_counter()
+    rop.render(frame_range=(frame, frame))
+    seconds = time.perf_counter() - start
+    pixels = load_image(rop.parm("vm_picture").evalAtFrame(frame))
+    return {"frame": frame, "preset": name, "seconds": seconds, "noise": estimate_noise(pixels),
+            "pixels": pixels.shape[0] * pixels.shape[1]}
+
+
+### render the probes of the cheapest and the best preset at a fraction of the resolution, in a temporary take
+def probe_rop(rop, frames, res_fraction=PROBE_RES_FRACTION, presets=TUNE_PRESETS, verbose=False):
+    probed = (presets[0], presets[-1])
+    parm_names = ["override_camerares", "res_fraction", "vm_picture"] + sorted(presets[0][1])
+    image_dir = tempfile.mkdtemp(prefix="lookdev_tune_")
+    take = hou.takes.currentTake().addChildTake(TAKE_NAME)
+    probes = []
+    try:
+        with current_take(take):
+            for parm_name in parm_names:
+                take.addParmTuple(rop.parmTuple(parm_name))
+            rop.parm("override_camerares").set(True)
+            rop.parm("res_fraction").set(res_fraction)
+            for frame in frames:
+                for name, settings in probed:
+                    probe = render_probe(rop, frame, name, settings, image_dir)
+                    probes.append(probe)
+                    if verbose:
+                        print("probe %s frame %d: %.2fs, noise %.4f" % (name, frame, probe["seconds"], probe["noise"]))
+    finally:
+        take.destroy()
+        shutil.rmtree(image_dir, ignore_errors=True)
+    return probes
+
+
+### probe the ROP, apply the best preset for target_seconds per frame and store the report on the ROP
+### (as the lookdev_render_tune user data), returns the report
+def tune_render(rop=ROP_PATH, target_seconds=60.0, max_noise=None, probe_count=PROBE_COUNT, dedup=True, apply=True,
+                verbose=False):
+    if isinstance(rop, str):
+        rop = hou.node(rop)
+    camera = hou.node(rop.evalParm("camera"))
+    full_pixels = camera.evalParm("resx") * camera.evalParm("resy")
+    plan = plan_rop(rop)
+    frames = plan["unique"] if dedup else plan["frames"]
+
+    start = time.perf_counter()
+    probes = probe_rop(rop, get_probe_frames(plan, probe_count), verbose=verbose)
+    estimates = fit_presets(probes, full_pixels)
+    chosen = choose_preset(estimates, target_seconds, max_noise)
+    if apply:
+        apply_preset(rop, chosen["settings"])
+
+    report = {
+        "preset": chosen["preset"],
+        "settings": chosen["settings"],
+        "within_budget": chosen["within_budget"],
+        "target_seconds": target_seconds,
+        "seconds_per_frame": chosen["seconds_per_frame"],
+        "noise": chosen["noise"],
+        "frames": len(frames),
+        "total_frames": len(plan["frames"]),
+        "total_seconds": chosen["seconds_per_frame"] * len(frames),
+        "probe_seconds": time.perf_counter() - start,
+        "estimates": estimates,
+        "probes": probes,
+    }
+    rop.setUserData("lookdev_render_tune", json.dumps(report))
+    return report
+
+
+### human readable summary of a tune report
+def format_report(report):
+    hours, rest = divmod(int(round(report["total_seconds"])), 3600)
+    lines = ["%-8s %10s %8s" % ("preset", "s/frame", "noise")]
+    for estimate in report["estimates"]:
+        marker = " <" if estimate["preset"] == report["preset"] else ""
+        lines.append("%-8s %10.1f %8.4f%s" % (estimate["preset"], estimate["seconds_per_frame"], estimate["noise"], marker))
+    lines.append("%s preset, %.1f s per frame (target %.1f%s), %d of %d frames to render: %dh%02dm projected"
+                 % (report["preset"], report["seconds_per_frame"], report["target_seconds"],
+                    "" if report["within_budget"] else ", over budget", report["frames"], report["total_frames"],
+                    hours, rest // 60))
+    lines.append("probing took %.1f s" % report["probe_seconds"])
+    return "\n".join(lines)
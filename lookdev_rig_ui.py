@@ -0,0 +1,437 @@
+"""
+Qt dialog for the lookdev turntable rig
+
+Only imported by lookdev_turntable_rig.create_lookdev_envlight_rig_with_ui(),
+so building rigs from hython or a batch process never loads PySide2.
+
+Anything that reads files (path checks, thumbnails, library scans and
+lookups) runs on a QThreadPool worker and reports back through a queued
+signal, so slow network storage never blocks the Houdini UI thread.
+"""
+
+from PySide2 import QtWidgets, QtCore, QtGui
+
+from lookdev_thumbnails import THUMBNAIL_SIZE, ThumbnailMemoryCache, load_thumbnail
+from lookdev_turntable_rig import check_hdri_path, get_cache_root, get_hdri_library, load_settings, resolve_settings
+
+
+# ms to wait after the last keystroke before a typed path is checked
+VALIDATE_DELAY = 300
+
+# worker threads of the dialog
+WORKER_COUNT = 4
+
+# pool shared by every dialog, not parented so closing a dialog never waits on a slow read
+_pool = None
+
+
+### the dialog's thread pool
+def get_thread_pool():
+    global _pool
+    if _pool is None:
+        _pool = QtCore.QThreadPool()
+        _pool.setMaxThreadCount(WORKER_COUNT)
+    return _pool
+
+
+### signals of a worker task (a QRunnable is not a QObject)
+class TaskSignals(QtCore.QObject):
+    finished = QtCore.Signal(object, object, object)  #token, result, error message
+
+
+### run a function on a thread pool worker and emit its result (or error) with the caller's token
+class Task(QtCore.QRunnable):
+    def __init__(self, function, args, token):
+        super(Task, self).__init__()
+        self.function = function
+        self.args = args
+        self.token = token
+        self.signals = TaskSignals()
+
+    def run(self):
+        try:
+            result = self.function(*self.args)
+        except Exception as error:
+            self.signals.finished.emit(self.token, None, str(error))
+            return
+        self.signals.finished.emit(self.token, result, None)
+
+
+### Build UI        
+class LookdevRigUI(QtWidgets.QDialog):
+    def __init__(self, parent=None):
+        super(LookdevRigUI, self).__init__(parent)
+        self.setWindowTitle("LookDev Light Rig Setup")
+        self.setMinimumWidth(400)
+
+        settings = resolve_settings(load_settings())
+        self.pool = get_thread_pool()
+        self.tasks = set()
+        self.closed = False
+        self.cache_root = get_cache_root()
+        self.thumbnails = ThumbnailMemoryCache()
+        self.hdri_error = None
+        self.prefill_path = None
+
+        # HDRI File Path
+        self.hdri_label = QtWidgets.QLabel("HDRI File (.exr):")
+        self.hdri_input = QtWidgets.QLineEdit(settings.get("hdri_path", ""))
+        self.hdri_browse = QtWidgets.QPushButton("Browse")
+        self.hdri_browse.clicked.connect(self.browse_hdri)
+        hdri_layout = QtWidgets.QHBoxLayout()
+        hdri_layout.addWidget(self.hdri_input)
+        hdri_layout.addWidget(self.hdri_browse)
+        self.hdri_thumbnail = self.create_thumbnail_label()
+        self.hdri_status = self.create_status_label()
+        self.hdri_timer = self.create_validate_timer(self.validate_hdri)
+        self.hdri_input.textChanged.connect(lambda text: self.hdri_timer.start())
+
+        # HDRI library folder and search (the index is read on a worker, see library_loaded)
+        self.library = None
+        self.library_label = QtWidgets.QLabel("HDRI Library:")
+        self.library_input = QtWidgets.QLineEdit(settings.get("hdri_library", ""))
+        self.library_browse = QtWidgets.QPushButton("Browse")
+        self.library_browse.clicked.connect(self.browse_library)
+        self.library_scan = QtWidgets.QPushButton("Scan")
+        self.library_scan.setEnabled(False)
+        self.library_scan.clicked.connect(self.scan_library)
+        library_layout = QtWidgets.QHBoxLayout()
+        library_layout.addWidget(self.library_input)
+        library_layout.addWidget(self.library_browse)
+        library_layout.addWidget(self.library_scan)
+        self.search_input = QtWidgets.QLineEdit()
+        self.search_input.setPlaceholderText("Search HDRIs")
+        self.search_input.textChanged.connect(self.update_search)
+        self.search_results = QtWidgets.QListWidget()
+        self.search_results.setMaximumHeight(120)
+        self.search_results.currentItemChanged.connect(self.pick_library_hdri)
+
+        # HDRI wedge: more maps to render the same turntable under
+        self.wedge_label = QtWidgets.QLabel("HDRI Wedge (more .exr files, separated by ;)")
+        self.wedge_input = QtWidgets.QLineEdit("; ".join(settings.get("hdri_wedge") or []))
+
+        # Object rotation inputs
+        self.rotation_label = QtWidgets.QLabel("Rotation Offset")
+        self.rotation_input = QtWidgets.QDoubleSpinBox()
+        self.rotation_input.setRange(-1e6, 1e6)
+        self.rotation_input.setDecimals(3)
+        self.rotation_input.setValue(settings.get("rotation_offset", 0.0))
+
+        # HDRI rotation inputs
+        self.light_rotation_label = QtWidgets.QLabel("HDRI Rotation Offset")
+        self.light_rotation_input = QtWidgets.QDoubleSpinBox()
+        self.light_rotation_input.setRange(-1e6, 1e6)
+        self.light_rotation_input.setDecimals(3)
+        self.light_rotation_input.setValue(settings.get("hdri_rotation_offset", 0.0))
+
+        # Sweep checkbox
+        self.sweep_checkbox = QtWidgets.QCheckBox("Background Geo Enabled")
+        self.sweep_checkbox.setChecked(settings.get("sweep_enabled", True))
+
+        # Lookdev Ref Kit checkbox
+        self.refkit_checkbox = QtWidgets.QCheckBox("Add Lookdev Reference Kit")
+        self.refkit_checkbox.setChecked(settings.get("add_refkit", True))
+
+        # Macbeth texture path with browse button
+        self.macbeth_label = QtWidgets.QLabel("Macbeth Chart Texture:")
+        self.macbeth_input = QtWidgets.QLineEdit(settings.get("macbeth_path", ""))
+        self.macbeth_browse = QtWidgets.QPushButton("Browse")
+        self.macbeth_browse.clicked.connect(self.browse_macbeth)
+        macbeth_layout = QtWidgets.QHBoxLayout()
+        macbeth_layout.addWidget(self.macbeth_input)
+        macbeth_layout.addWidget(self.macbeth_browse)
+        self.macbeth_thumbnail = self.create_thumbnail_label()
+        self.macbeth_status = self.create_status_label()
+        self.macbeth_timer = self.create_validate_timer(self.validate_macbeth)
+        self.macbeth_input.textChanged.connect(lambda text: self.macbeth_timer.start())
+        self.refkit_checkbox.toggled.connect(lambda checked: self.macbeth_timer.start())
+        
+        #start frame
+        self.start_frame_label = QtWidgets.QLabel("Start Frame")
+        self.start_frame_input = QtWidgets.QSpinBox()
+        self.start_frame_input.setRange(1, 100000)
+        self.start_frame_input.setValue(1001)  # Default value
+
+        #frames per turntable pass
+        self.frame_count_label = QtWidgets.QLabel("Frames Per Pass")
+        self.frame_count_input = QtWidgets.QSpinBox()
+        self.frame_count_input.setRange(2, 100000)
+        self.frame_count_input.setValue(settings["frame_count"])
+
+        # Tight framing checkbox
+        self.tight_framing_checkbox = QtWidgets.QCheckBox("Tight Framing (solve camera distance from the model's points)")
+        self.tight_framing_checkbox.setChecked(settings.get("tight_framing", True))
+
+        # Procedural orbit checkbox
+        self.procedural_checkbox = QtWidgets.QCheckBox("Procedural Orbit (expression driven)")
+        self.procedural_checkbox.setChecked(settings.get("procedural_orbit", False))
+
+        # Viewport proxy of heavy models
+        self.display_proxy_label = QtWidgets.QLabel("Viewport Proxy (heavy models)")
+        self.display_proxy_input = QtWidgets.QComboBox()
+        for label, mode in (("Decimated", "reduce"), ("Bounding Box", "box"), ("Off", "off")):
+            self.display_proxy_input.addItem(label, mode)
+        self.display_proxy_input.setCurrentIndex(max(0, self.display_proxy_input.findData(settings.get("display_proxy", "reduce"))))
+
+        # Buttons
+        self.button_box = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Ok | QtWidgets.QDialogButtonBox.Cancel)
+        self.button_box.accepted.connect(self.accept)
+        self.button_box.rejected.connect(self.reject)
+
+        # Layout
+        layout = QtWidgets.QVBoxLayout()
+        layout.addWidget(self.hdri_label)
+        layout.addLayout(hdri_layout)
+        layout.addWidget(self.hdri_thumbnail)
+        layout.addWidget(self.hdri_status)
+        layout.addWidget(self.library_label)
+        layout.addLayout(library_layout)
+        layout.addWidget(self.search_input)
+        layout.addWidget(self.search_results)
+        layout.addWidget(self.wedge_label)
+        layout.addWidget(self.wedge_input)
+        layout.addWidget(self.rotation_label)
+        layout.addWidget(self.rotation_input)
+        layout.addWidget(self.light_rotation_label)
+        layout.addWidget(self.light_rotation_input)
+        layout.addWidget(self.sweep_checkbox)
+        layout.addWidget(self.refkit_checkbox)
+        layout.addWidget(self.macbeth_label)
+        layout.addLayout(macbeth_layout)
+        layout.addWidget(self.macbeth_thumbnail)
+        layout.addWidget(self.macbeth_status)
+        layout.addWidget(self.start_frame_label)
+        layout.addWidget(self.start_frame_input)
+        layout.addWidget(self.frame_count_label)
+        layout.addWidget(self.frame_count_input)
+        layout.addWidget(self.tight_framing_checkbox)
+        layout.addWidget(self.procedural_checkbox)
+        layout.addWidget(self.display_proxy_label)
+        layout.addWidget(self.display_proxy_input)
+        layout.addWidget(self.button_box)
+        self.setLayout(layout)
+        self.start_task(get_hdri_library, (), None, self.library_loaded)
+        self.validate_hdri()
+        self.validate_macbeth()
+
+    #run function(*args) on the worker pool, callback(token, result, error) is called on the UI thread
+    def start_task(self, function, args, token, callback):
+        task = Task(function, args, token)
+        task.setAutoDelete(False)
+        self.tasks.add(task)
+
+        def finished(token, result, error):
+            self.tasks.discard(task)
+            if not self.closed:
+                callback(token, result, error)
+
+        task.signals.finished.connect(finished, QtCore.Qt.QueuedConnection)
+        self.pool.start(task)
+
+    #drop queued work when the dialog closes, running tasks finish in the background
+    def done(self, result):
+        self.closed = True
+        for task in list(self.tasks):
+            if self.pool.tryTake(task):
+                self.tasks.discard(task)
+        for timer in (self.hdri_timer, self.macbeth_timer):
+            timer.stop()
+        super(LookdevRigUI, self).done(result)
+
+    def create_thumbnail_label(self):
+        label = QtWidgets.QLabel()
+        label.setFixedHeight(THUMBNAIL_SIZE // 2)
+        label.setAlignment(QtCore.Qt.AlignCenter)
+        return label
+
+    def create_status_label(self):
+        label = QtWidgets.QLabel()
+        label.setWordWrap(True)
+        return label
+
+    #single shot timer that restarts on every keystroke
+    def create_validate_timer(self, slot):
+        timer = QtCore.QTimer(self)
+        timer.setSingleShot(True)
+        timer.setInterval(VALIDATE_DELAY)
+        timer.timeout.connect(slot)
+        return timer
+
+    def set_status(self, label, text, color=None):
+        label.setText(text)
+        label.setStyleSheet("color: %s;" % color if color else "")
+
+    #check the typed HDRI on a worker (reads the EXR header)
+    def validate_hdri(self):
+        path = self.hdri_input.text()
+        if not path:
+            self.hdri_error = "No HDRI selected"
+            self.set_status(self.hdri_status, "")
+            self.hdri_thumbnail.clear()
+            self.update_ok_button()
+            return
+        self.set_status(self.hdri_status, "Checking...")
+        self.start_task(check_hdri_path, (path,), path, self.hdri_checked)
+
+    def hdri_checked(self, path, warnings, error):
+        if path != self.hdri_input.text():
+            return  #the user has typed on since
+        self.hdri_error = error
+        if error:
+            self.set_status(self.hdri_status, error, "#e05050")
+            self.hdri_thumbnail.clear()
+        else:
+            self.set_status(self.hdri_status, "\n".join(warnings), "#e0a030" if warnings else None)
+            self.request_thumbnail(path, self.hdri_thumbnail)
+            if path == self.prefill_path and self.library is not None:
+                self.start_task(self.library.lookup, (path,), path, self.hdri_looked_up)
+        self.update_ok_button()
+
+    #pre-fill the rotation offset of a browsed HDRI from its library stats
+    def hdri_looked_up(self, path, entry, error):
+        if path != self.hdri_input.text() or path != self.prefill_path:
+            return
+        self.prefill_path = None
+        if entry is not None and not entry["error"]:
+            self.light_rotation_input.setValue(entry["rotation_offset"])
+
+    #check the macbeth texture on a worker, a missing one only warns (the chart renders untextured)
+    def validate_macbeth(self):
+        path = self.macbeth_input.text()
+        if not path or not self.refkit_checkbox.isChecked():
+            self.set_status(self.macbeth_status, "")
+            self.macbeth_thumbnail.clear()
+            return
+        self.start_task(load_thumbnail, (path, self.cache_root), path, self.macbeth_checked)
+
+    def macbeth_checked(self, path, result, error):
+        if path != self.macbeth_input.text():
+            return
+        if error:
+            self.set_status(self.macbeth_status, "Macbeth texture: %s" % error, "#e0a030")
+            self.macbeth_thumbnail.clear()
+            return
+        self.set_status(self.macbeth_status, "")
+        self.thumbnails.put(path, *result)
+        self.show_thumbnail(self.macbeth_thumbnail, result[1])
+
+    #show the thumbnail held in memory straight away and refresh it on a worker if the file changed
+    def request_thumbnail(self, path, label):
+        key, image = self.thumbnails.get(path)
+        if image is not None:
+            self.show_thumbnail(label, image)
+        else:
+            label.setText("Loading preview...")
+
+        def loaded(token, result, error):
+            if (label is self.hdri_thumbnail and token != self.hdri_input.text()) or \
+                    (label is self.macbeth_thumbnail and token != self.macbeth_input.text()):
+                return
+            if error:
+                label.setText("No preview")
+            elif result[1] is not None:
+                self.thumbnails.put(token, *result)
+                self.show_thumbnail(label, result[1])
+
+        self.start_task(load_thumbnail, (path, self.cache_root, THUMBNAIL_SIZE, key), path, loaded)
+
+    #QPixmaps can only be made on the UI thread
+    def show_thumbnail(self, label, image):
+        label.setPixmap(QtGui.QPixmap.fromImage(image))
+
+    def update_ok_button(self):
+        ok_button = self.button_box.button(QtWidgets.QDialogButtonBox.Ok)
+        ok_button.setEnabled(not self.hdri_error)
+        ok_button.setToolTip(self.hdri_error or "")
+
+    #file browser for HDRI image
+    def browse_hdri(self):
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Select HDRI File", "", "EXR Files (*.exr)")
+        if path:
+            #the rotation offset is filled in once the map has been checked and measured
+            self.prefill_path = path
+            self.hdri_input.setText(path)
+            self.hdri_timer.stop()
+            self.validate_hdri()
+
+    #folder browser for the HDRI library
+    def browse_library(self):
+        path = QtWidgets.QFileDialog.getExistingDirectory(self, "Select HDRI Library", self.library_input.text())
+        if path:
+            self.library_input.setText(path)
+            self.scan_library()
+
+    #the library index is ready: enable scanning and list it, and measure a browsed HDRI that was waiting for it
+    def library_loaded(self, token, library, error):
+        if error:
+            self.set_status(self.hdri_status, "HDRI library unavailable: %s" % error, "#e05050")
+            return
+        self.library = library
+        self.library_scan.setEnabled(True)
+        self.update_search()
+        path = self.hdri_input.text()
+        if path and path == self.prefill_path and self.hdri_error is None:
+            self.start_task(self.library.lookup, (path,), path, self.hdri_looked_up)
+
+    #index new and changed maps of the library folder on a worker (only the first scan of a folder is slow)
+    def scan_library(self):
+        if not self.library_input.text() or self.library is None:
+            return
+        self.library_scan.setEnabled(False)
+        self.library_scan.setText("Scanning...")
+        self.start_task(self.library.scan, ([self.library_input.text()],), None, self.library_scanned)
+
+    def library_scanned(self, token, measured, error):
+        self.library_scan.setEnabled(True)
+        self.library_scan.setText("Scan")
+        if error:
+            self.set_status(self.hdri_status, "Library scan failed: %s" % error, "#e05050")
+        self.update_search()
+
+    #list the indexed maps matching the search text
+    def update_search(self):
+        self.search_results.clear()
+        if self.library is None:
+            return
+        for entry in self.library.search(self.search_input.text()):
+            item = QtWidgets.QListWidgetItem("%s  %dx%d  mean %.2f  key %.0f%%" % (
+                entry["name"], entry["width"], entry["height"], entry["mean_luminance"], entry["key_ratio"] * 100))
+            item.setToolTip(entry["path"])
+            item.setData(QtCore.Qt.UserRole, entry["path"])
+            self.search_results.addItem(item)
+
+    #use a library map, with the rotation offset that puts its key light beside the camera
+    def pick_library_hdri(self, item, previous=None):
+        if item is None:
+            return
+        with self.library.lock:
+            entry = self.library.entries.get(item.data(QtCore.Qt.UserRole))
+        if entry is None:
+            return
+        self.prefill_path = None
+        self.hdri_input.setText(entry["path"])
+        self.light_rotation_input.setValue(entry["rotation_offset"])
+
+    #file browser for macbeth chart texture          
+    def browse_macbeth(self):
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Select Macbeth Texture", "", "Image Files (*.jpg *.jpeg *.png *.tif *.tiff)")
+        if path:
+            self.macbeth_input.setText(path)
+
+    #return values for rig setup
+    def get_values(self):
+        return {
+            "hdri_path": self.hdri_input.text(),
+            "rotation_offset": self.rotation_input.value(),
+            "hdri_rotation_offset": self.light_rotation_input.value(),
+            "sweep_enabled": self.sweep_checkbox.isChecked(),
+            "add_refkit": self.refkit_checkbox.isChecked(),
+            "macbeth_path": self.macbeth_input.text(),
+            "start_frame": int(self.start_frame_input.text()),
+            "frame_count": self.frame_count_input.value(),
+            "procedural_orbit": self.procedural_checkbox.isChecked(),
+            "tight_framing": self.tight_framing_checkbox.isChecked(),
+            "hdri_library": self.library_input.text(),
+            "hdri_wedge": [path.strip() for path in self.wedge_input.text().split(";") if path.strip()],
+            "display_proxy": self.display_proxy_input.currentData(),
+        }
@@ -0,0 +1,206 @@
+"""
+Multi-asset lookdev rigs expressed as takes
+
+One rig (camera, envlight, sweep, ref kit and Mantra ROP) is shared by every
+selected model. The root take frames the largest model, and each model gets
+a child take that only overrides what differs per asset: the look-at target,
+the orbit (camera and sweep keys, or the orbit radius in procedural mode),
+the sweep placement, the ROP's rendered objects and output path, and which
+model is displayed. Rendering switches takes on the single ROP inside one
+Houdini session, so the HDRI, the shared sweep and ref kit bakes and the
+shaders are loaded once for all assets.
+
+    import lookdev_takes
+    lookdev_takes.build_multi_asset_rig(settings, hou.selectedNodes())
+    lookdev_takes.render_asset_takes()
+"""
+
+import contextlib
+import json
+import re
+
+import hou
+
+from lookdev_render_plan import render_turntable
+from lookdev_turntable_rig import (
+    DEFAULT_FRAME_COUNT, compute_framing, create_lookdev_rig_nodes, get_asset_output, get_sweep_cache_file,
+    get_sweep_dimensions, resolve_settings, rig_transaction, set_sweep_dimensions, update_camera_animation,
+    update_display_proxy, update_lookdev_rig_nodes, update_sweep_animation,
+)
+
+
+ROP_PATH = "/obj/lookdev_ropnet/lookdev_mantra"
+TAKE_PREFIX = "lookdev_"
+
+
+### run a block with a take current, restoring the previous one after
+@contextlib.contextmanager
+def current_take(take):
+    previous = hou.takes.currentTake()
+    hou.takes.setCurrentTake(take)
+    try:
+        yield take
+    finally:
+        hou.takes.setCurrentTake(previous)
+
+
+### take name of a model
+def get_take_name(model_node):
+    return TAKE_PREFIX + re.sub(r"[^A-Za-z0-9_]", "_", model_node.name())
+
+
+### assets stored on a multi-asset rig ([] for a single asset rig)
+def get_rig_assets(subnet):
+    return json.loads(subnet.userData("lookdev_assets") or "[]")
+
+
+### remove the takes of a previous multi-asset build
+def remove_asset_takes(subnet):
+    for asset in get_rig_assets(subnet):
+        take = hou.takes.findTake(asset["take"])
+        if take is not None:
+            take.destroy()
+    subnet.destroyUserData("lookdev_assets", must_exist=False)
+
+
+### include the translate of a locked transform in the current take and set it
+def set_take_translate(take, node, translate):
+    parm_tuple = node.parmTuple("t")
+    take.addParmTuple(parm_tuple)
+    for parm in parm_tuple:
+        parm.lock(False)
+    parm_tuple.set(translate)
+    for parm in parm_tuple:
+        parm.lock(True)
+
+
+### create a model's take and apply its framing inside it
+def create_asset_take(subnet, values, model_node, models, framing, output_path):
+    center, size, cam_distance = framing
+
+    #the sweep for this framing is baked under the root take (baking creates nodes)
+    if values["sweep_enabled"]:
+        get_sweep_cache_file(get_sweep_dimensions(size, center, cam_distance))
+
+    take = hou.takes.rootTake().addChildTake(get_take_name(model_node))
+    try:
+        apply_asset_take(take, subnet, values, model_node, models, framing, output_path)
+    except Exception:
+        #takes are not nodes, the transaction's rollback does not see them
+        take.destroy()
+        raise
+    return take
+
+
+### override a model's framing, rendered objects and output in its take
+def apply_asset_take(take, subnet, values, model_node, models, framing, output_path):
+    center, size, cam_distance = framing
+    start_frame = values["start_frame"]
+    frame_count = values.get("frame_count", DEFAULT_FRAME_COUNT)
+    rig = hou.node("/obj/lookdev_rig_control")
+    cam = subnet.node("lookdev_cam")
+    sweep_null = subnet.node("sweep_animation")
+    sweep = subnet.node("lookdev_sweep")
+    mantra = hou.node(ROP_PATH)
+    with current_take(take):
+        set_take_translate(take, subnet.node("lookat_target"), center)
+
+        if values.get("procedural_orbit"):
+            take.addParmTuple(rig.parmTuple("orbit_radius"))
+            rig.parm("orbit_radius").set(cam_distance)
+        else:
+            take.addParmTuple(cam.parmTuple("t"))
+            take.addParmTuple(sweep_null.parmTuple("t"))
+            update_camera_animation(cam, center, cam_distance, values["rotation_offset"], start_frame, frame_count)
+            update_sweep_animation(sweep_null, center, cam_distance, values["rotation_offset"], start_frame, frame_count)
+
+        if values["sweep_enabled"]:
+            take.addParmTuple(sweep.node("sweep_cache").parmTuple("file"))
+            take.addParmTuple(sweep.node("center").parmTuple("t"))
+            take.addParmTuple(sweep.node("center").parmTuple("p"))
+            set_sweep_dimensions(sweep, size, center, cam_distance)
+            set_take_translate(take, sweep, (center[0], -center[1], -cam_distance))
+
+        #render and show only this model
+        forceobject = mantra.evalParm("forceobject").split()
+        forceobject = [path for path in forceobject if path not in [model.path() for model in models]]
+        take.addParmTuple(mantra.parmTuple("forceobject"))
+        mantra.parm("forceobject").set(" ".join(forceobject + [model_node.path()]))
+        take.addParmTuple(mantra.parmTuple("vm_picture"))
+        mantra.parm("vm_picture").set(output_path)
+        for model in models:
+            take.addNodeDisplayFlag(model)
+            model.setDisplayFlag(model == model_node)
+
+
+### build (or update) one rig shared by several models with a take per model, as one transaction
+### (output_paths maps model names to image paths, default $HIP/render/<name>/<name>.$F4.exr)
+def build_multi_asset_rig(values, model_nodes, output_paths=None):
+    values = resolve_settings(values)
+    if not model_nodes:
+        raise ValueError("Select at least one geometry node.")
+    names = [get_take_name(model) for model in model_nodes]
+    if len(set(names)) != len(names):
+        raise ValueError("Selected models need distinct names to get a take each.")
+
+    with rig_transaction("Build Lookdev Multi-Asset Rig", model_nodes):
+        #takes are added to the root take and edited one at a time
+        with current_take(hou.takes.rootTake()):
+            subnet = hou.node("/obj/lookdev_rig")
+            if subnet is None:
+                subnet = create_lookdev_rig_nodes(values, model_nodes[0])
+            elif not subnet.userData("lookdev_settings"):
+                raise ValueError("/obj/lookdev_rig was built by an older version of this script. Delete it to build a new rig.")
+            else:
+                remove_asset_takes(subnet)
+
+            #frame every model with the shared camera, the root take frames the largest one
+            cam = subnet.node("lookdev_cam")
+            framings = dict((model.path(), compute_framing(model, values, cam)) for model in model_nodes)
+            largest = max(model_nodes, key=lambda model: framings[model.path()][2])
+            update_lookdev_rig_nodes(subnet, values, largest)
+
+            assets = []
+            created = []
+            try:
+                for model in model_nodes:
+                    name = model.name()
+                    output_path = (output_paths or {}).get(name) or get_asset_output(name)
+                    take = create_asset_take(subnet, values, model, model_nodes, framings[model.path()], output_path)
+                    created.append(take)
+                    center, size, cam_distance = framings[model.path()]
+                    assets.append({"name": name, "model": model.path(), "take": take.name(), "output": output_path,
+                                   "framing": {"center": center, "size": size, "cam_distance": cam_distance}})
+                    update_display_proxy(model, values)
+            except Exception:
+                for take in created:
+                    take.destroy()
+                raise
+            subnet.setUserData("lookdev_assets", json.dumps(assets))
+    return subnet
+
+
+### render the turntable of every asset take (or the named ones) with the shared ROP in this session,
+### returns {name: render plan}; each distinct pose is rendered once unless dedup is off
+def render_asset_takes(rop=ROP_PATH, names=None, dedup=True, verbose=False):
+    if isinstance(rop, str):
+        rop = hou.node(rop)
+    subnet = hou.node("/obj/lookdev_rig")
+    assets = get_rig_assets(subnet) if subnet is not None else []
+    if not assets:
+        raise ValueError("No multi-asset lookdev rig in this scene.")
+
+    plans = {}
+    for asset in assets:
+        if names is not None and asset["name"] not in names:
+            continue
+        take = hou.takes.findTake(asset["take"])
+        if take is None:
+            raise ValueError("Take %s of asset %s is missing" % (asset["take"], asset["name"]))
+        with current_take(take):
+            if dedup:
+                plans[asset["name"]] = render_turntable(rop, verbose=verbose)
+            else:
+                rop.render(verbose=verbose, output_progress=verbose)
+                plans[asset["name"]] = None
+    return plans
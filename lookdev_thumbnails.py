@@ -0,0 +1,111 @@
+"""
+Thumbnails for the lookdev rig dialog
+
+Images are decoded on worker threads into QImages and kept in two caches: a
+small in-memory LRU for the maps shown in this session and scaled PNGs in the
+disk cache (keyed by path, size and mtime) so reopening the dialog does not
+touch the originals on network storage again. Formats Qt cannot read (EXR,
+.rat, .hdr) are shrunk with icp first. Only imported by lookdev_rig_ui.
+"""
+
+import collections
+import os
+import shutil
+import tempfile
+import threading
+
+from PySide2 import QtCore, QtGui
+
+from lookdev_cache import DiskCache, cache_key
+from lookdev_hdri import HdriError, get_houdini_tool, run_tool
+
+
+THUMBNAIL_CACHE_MAX_BYTES = 256 * 1024 * 1024
+THUMBNAIL_VERSION = 1
+
+# longest side of a thumbnail, and how many are held in memory
+THUMBNAIL_SIZE = 256
+MEMORY_THUMBNAILS = 64
+
+
+### disk cache key of a thumbnail, None if the image does not exist
+def thumbnail_key(path, size=THUMBNAIL_SIZE):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return cache_key("thumbnail", THUMBNAIL_VERSION, os.path.abspath(path), stat.st_size, stat.st_mtime, size)
+
+
+### decode an image scaled to fit size x size, through icp for formats Qt cannot read (worker safe, no QPixmap)
+def decode_thumbnail(path, size=THUMBNAIL_SIZE):
+    reader = QtGui.QImageReader(path)
+    if reader.canRead():
+        #let the decoder scale (jpeg decodes at a fraction of the size)
+        image_size = reader.size()
+        if image_size.isValid():
+            reader.setScaledSize(image_size.scaled(size, size, QtCore.Qt.KeepAspectRatio))
+        image = reader.read()
+        if not image.isNull():
+            return image
+
+    temp_dir = tempfile.mkdtemp(prefix="lookdev_thumbnail_")
+    try:
+        small_path = os.path.join(temp_dir, "thumbnail.jpg")
+        run_tool([get_houdini_tool("icp"), "-w", str(size), "-h", str(max(1, size // 2)), path, small_path], small_path)
+        image = QtGui.QImage(small_path)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    if image.isNull():
+        raise HdriError("cannot read %s" % path)
+    return image.scaled(size, size, QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation)
+
+
+### thumbnail of an image from the disk cache, decoding and storing it on a miss, returns (key, QImage)
+### (the image is None when the key matches known_key, the caller already holds that thumbnail)
+def load_thumbnail(path, cache_root, size=THUMBNAIL_SIZE, known_key=None):
+    key = thumbnail_key(path, size)
+    if key is None:
+        raise HdriError("%s does not exist" % path)
+    if key == known_key:
+        return key, None
+    cache = DiskCache(cache_root, "thumbnails", THUMBNAIL_CACHE_MAX_BYTES)
+    cached = cache.get(key, ".png")
+    if cached is not None:
+        image = QtGui.QImage(cached)
+        if not image.isNull():
+            return key, image
+
+    image = decode_thumbnail(path, size)
+    temp_path = cache.temp_path(key, ".png")
+    try:
+        if image.save(temp_path, "PNG"):
+            cache.commit(temp_path, key, ".png")
+    finally:
+        #a failed save can leave a partial file, and eviction never removes temp files
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return key, image
+
+
+class ThumbnailMemoryCache(object):
+    #least recently used QImages by path, with the disk key they were loaded under
+    def __init__(self, max_count=MEMORY_THUMBNAILS):
+        self.max_count = max_count
+        self.images = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    #(key, image) of a path, or (None, None)
+    def get(self, path):
+        with self.lock:
+            if path not in self.images:
+                return None, None
+            self.images.move_to_end(path)
+            return self.images[path]
+
+    def put(self, path, key, image):
+        with self.lock:
+            self.images[path] = (key, image)
+            self.images.move_to_end(path)
+            while len(self.images) > self.max_count:
+                self.images.popitem(last=False)
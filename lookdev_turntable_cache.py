@@ -0,0 +1,109 @@
+"""
+Whole-turntable result cache for the lookdev rig
+
+A turntable key hashes everything the rendered frames depend on: the
+model's upstream signature (node parms and the size and mtime of the files
+they read, see lookdev_bounds), the size and mtime of the HDRIs and the
+Macbeth texture, the rig settings and the framing solved for the model. It
+is computed at build time and stored as lookdev_turntable_key user data on
+/obj/lookdev_rig, and it can be computed before building anything, since the
+framing only needs the model and the rig camera's lens (CAMERA_LENS in
+lookdev_turntable_rig).
+
+Finished renders are kept in the disk cache as one directory per key,
+evicted least recently used first past TURNTABLE_CACHE_MAX_BYTES. Frames are
+copied in and out rather than hard linked: a later render into the same
+folder (a --no-cache batch, or an artist rendering the saved hip) rewrites
+its files in place and must not change what is cached under the old key.
+Batch mode looks a key up before building a rig and, on a hit, copies the
+cached frames into the asset's render folder instead of building and
+rendering it.
+"""
+
+import json
+import os
+import shutil
+
+from lookdev_bounds import get_model_signature
+from lookdev_cache import DiskCache, cache_key, round_significant
+
+
+TURNTABLE_CACHE_MAX_BYTES = 64 * 1024 * 1024 * 1024
+TURNTABLE_CACHE_VERSION = 1
+
+# settings that do not change the rendered frames
+IGNORED_SETTINGS = ("hdri_library", "display_proxy")
+
+# file listing what a cache entry holds
+MANIFEST_NAME = "lookdev_turntable.json"
+
+
+### (path, size, mtime) of a file the render reads, None for an empty path
+def get_file_state(path):
+    if not path:
+        return None
+    path = os.path.abspath(path)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return (path, None, None)
+    return (path, stat.st_size, stat.st_mtime)
+
+
+### key of the frames a rig renders for these settings, model and framing (center, size, cam_distance)
+def get_turntable_key(values, model_node, framing):
+    center, size, cam_distance = framing
+    settings = dict((key, value) for key, value in values.items() if key not in IGNORED_SETTINGS)
+    files = [get_file_state(values.get("hdri_path")), get_file_state(values.get("macbeth_path"))]
+    files.extend(get_file_state(path) for path in values.get("hdri_wedge") or [])
+    rounded = [round_significant(value, 6) for value in list(center) + list(size) + [cam_distance]]
+    return cache_key("turntable", TURNTABLE_CACHE_VERSION, get_model_signature(model_node), files, settings, rounded)
+
+
+### key of a render of the rig with batch options that change its frames (sampling targets, ...)
+def get_render_key(turntable_key, options=None):
+    return cache_key("render", turntable_key, options or {})
+
+
+def get_turntable_cache(cache_root):
+    return DiskCache(cache_root, "turntables", TURNTABLE_CACHE_MAX_BYTES)
+
+
+### copy every file under source_dir to the same place under target_dir, returns how many
+def copy_tree(source_dir, target_dir, skip=()):
+    count = 0
+    for dirpath, _, filenames in os.walk(source_dir):
+        relative = os.path.relpath(dirpath, source_dir)
+        target = os.path.normpath(os.path.join(target_dir, relative))
+        for filename in filenames:
+            if filename in skip:
+                continue
+            if not os.path.isdir(target):
+                os.makedirs(target)
+            shutil.copy2(os.path.join(dirpath, filename), os.path.join(target, filename))
+            count += 1
+    return count
+
+
+### put the frames rendered into render_dir in the cache under key, returns the entry path
+def store_turntable(cache_root, key, render_dir, info=None):
+    cache = get_turntable_cache(cache_root)
+    temp_dir = cache.temp_path(key)
+    os.makedirs(temp_dir)
+    try:
+        count = copy_tree(render_dir, temp_dir)
+        manifest = dict(info or {}, key=key, files=count)
+        with open(os.path.join(temp_dir, MANIFEST_NAME), "w") as f:
+            json.dump(manifest, f, indent=4)
+    except Exception:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+    return cache.commit(temp_dir, key)
+
+
+### copy the cached frames of key into render_dir, returns the number of files or None on a miss
+def restore_turntable(cache_root, key, render_dir):
+    entry = get_turntable_cache(cache_root).get(key)
+    if entry is None or not os.path.isfile(os.path.join(entry, MANIFEST_NAME)):
+        return None
+    return copy_tree(entry, render_dir, skip=(MANIFEST_NAME,))
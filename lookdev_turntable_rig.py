@@ -6,10 +6,87 @@ Made with Houdini 20.5
 """
 
 import hou
-from PySide2 import QtWidgets, QtCore
 import os
-import math
 import json
+import contextlib
+
+from lookdev_bounds import get_model_bounds, get_model_framing
+from lookdev_cache import DiskCache, cache_key, round_significant
+from lookdev_display_proxy import DISPLAY_PROXY_MODES, apply_display_proxy, remove_display_proxy
+from lookdev_framing import camera_tangents, framing_angles
+from lookdev_hdri import check_hdri, prepare_hdri
+from lookdev_hdri_library import HdriLibrary
+from lookdev_profile import profile_build, profile_phase, profile_wait
+from lookdev_turntable_cache import get_turntable_key
+from lookdev_orbit import (
+    DEFAULT_FRAME_COUNT, envlight_keys, envlight_rotation_expression, orbit_phase_expression,
+    orbit_position_expressions, orbit_samples, turntable_range,
+)
+
+# size limit of the baked sweep cache, bump the version when the sweep SOP chain changes
+SWEEP_CACHE_MAX_BYTES = 256 * 1024 * 1024
+SWEEP_BAKE_VERSION = 2
+
+# same for the shared ref kit bake; the chart is a 2 x 1.4 grid at the origin stood upright (its bounds for the uv projection),
+# the balls sit REFKIT_SPACING to either side and the kit is scaled by REFKIT_SCALE (lookdev_usd rebuilds it from these)
+REFKIT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+REFKIT_BAKE_VERSION = 1
+REFKIT_CHART_CENTER = (0, 0, 0)
+REFKIT_CHART_SIZE = (2, 1.4, 0)
+REFKIT_SPACING = 2.5
+REFKIT_SCALE = 0.008
+
+# lens of the rig camera, set when it is created so framing can be solved before the rig exists
+CAMERA_LENS = (("focal", 50.0), ("aperture", 41.4214), ("resx", 1920), ("resy", 1080), ("aspect", 1.0))
+
+# settings schema shared by the UI (get_values) and batch manifests
+DEFAULT_SETTINGS = {
+    "hdri_path": "",
+    "rotation_offset": 0.0,
+    "hdri_rotation_offset": 0.0,
+    "sweep_enabled": True,
+    "add_refkit": True,
+    "macbeth_path": "",
+    "start_frame": 1001,
+    "frame_count": DEFAULT_FRAME_COUNT,
+    "procedural_orbit": False,
+    "tight_framing": True,
+    "hdri_library": "",
+    "hdri_wedge": [],
+    "display_proxy": "reduce",
+}
+
+# networks to lay out and other view-only work postponed to the end of the running rig transaction, None outside of one
+_deferred = None
+
+
+### fill in missing settings with their defaults
+def resolve_settings(values):
+    settings = dict(DEFAULT_SETTINGS)
+    settings.update(values)
+    return settings
+
+### profile report written by LOOKDEV_PROFILE=1 builds
+def get_profile_path():
+    return os.path.join(os.path.dirname(get_settings_path()), "lookdev_rig_profile.json")
+
+### raise ValueError for an HDRI a rig cannot use, returns warnings about usable ones
+def check_hdri_path(path):
+    if not os.path.isfile(path):
+        raise ValueError("Invalid HDRI path: %s" % path)
+    if path.lower().endswith(".exr"):
+        return check_hdri(path)["warnings"]  #raises HdriError (a ValueError) for unusable EXRs
+    return []
+
+### raise ValueError for settings a rig cannot be built from
+def validate_settings(values):
+    check_hdri_path(values["hdri_path"])
+    for hdri_path in values.get("hdri_wedge") or []:
+        check_hdri_path(hdri_path)
+    if values.get("display_proxy", "reduce") not in DISPLAY_PROXY_MODES:
+        raise ValueError("Display proxy must be one of %s, got %s" % (", ".join(DISPLAY_PROXY_MODES), values["display_proxy"]))
+    if values["frame_count"] < 2:
+        raise ValueError("Turntable needs at least 2 frames per pass, got %s" % values["frame_count"])
 
 
 ### retrieve previously used settings for UI inputs 
@@ -36,175 +113,161 @@ def save_settings(settings):
     except Exception:
         pass
 
-### Build UI        
-class LookdevRigUI(QtWidgets.QDialog):
-    def __init__(self, parent=None):
-        super(LookdevRigUI, self).__init__(parent)
-        self.setWindowTitle("LookDev Light Rig Setup")
-        self.setMinimumWidth(400)
-
-        settings = load_settings()
-
-        # HDRI File Path
-        self.hdri_label = QtWidgets.QLabel("HDRI File (.exr):")
-        self.hdri_input = QtWidgets.QLineEdit(settings.get("hdri_path", ""))
-        self.hdri_browse = QtWidgets.QPushButton("Browse")
-        self.hdri_browse.clicked.connect(self.browse_hdri)
-        hdri_layout = QtWidgets.QHBoxLayout()
-        hdri_layout.addWidget(self.hdri_input)
-        hdri_layout.addWidget(self.hdri_browse)
-
-        # Object rotation inputs
-        self.rotation_label = QtWidgets.QLabel("Rotation Offset")
-        self.rotation_input = QtWidgets.QDoubleSpinBox()
-        self.rotation_input.setRange(-1e6, 1e6)
-        self.rotation_input.setDecimals(3)
-        self.rotation_input.setValue(settings.get("rotation_offset", 0.0))
-
-        # HDRI rotation inputs
-        self.light_rotation_label = QtWidgets.QLabel("HDRI Rotation Offset")
-        self.light_rotation_input = QtWidgets.QDoubleSpinBox()
-        self.light_rotation_input.setRange(-1e6, 1e6)
-        self.light_rotation_input.setDecimals(3)
-        self.light_rotation_input.setValue(settings.get("hdri_rotation_offset", 0.0))
-
-        # Sweep checkbox
-        self.sweep_checkbox = QtWidgets.QCheckBox("Background Geo Enabled")
-        self.sweep_checkbox.setChecked(settings.get("sweep_enabled", True))
-
-        # Lookdev Ref Kit checkbox
-        self.refkit_checkbox = QtWidgets.QCheckBox("Add Lookdev Reference Kit")
-        self.refkit_checkbox.setChecked(settings.get("add_refkit", True))
-
-        # Macbeth texture path with browse button
-        self.macbeth_label = QtWidgets.QLabel("Macbeth Chart Texture:")
-        self.macbeth_input = QtWidgets.QLineEdit(settings.get("macbeth_path", ""))
-        self.macbeth_browse = QtWidgets.QPushButton("Browse")
-        self.macbeth_browse.clicked.connect(self.browse_macbeth)
-        macbeth_layout = QtWidgets.QHBoxLayout()
-        macbeth_layout.addWidget(self.macbeth_input)
-        macbeth_layout.addWidget(self.macbeth_browse)
-        
-        #start frame
-        self.start_frame_label = QtWidgets.QLabel("Start Frame")
-        self.start_frame_input = QtWidgets.QSpinBox()
-        self.start_frame_input.setRange(1, 100000)
-        self.start_frame_input.setValue(1001)  # Default value
-        
-
-        # Buttons
-        self.button_box = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Ok | QtWidgets.QDialogButtonBox.Cancel)
-        self.button_box.accepted.connect(self.accept)
-        self.button_box.rejected.connect(self.reject)
-
-        # Layout
-        layout = QtWidgets.QVBoxLayout()
-        layout.addWidget(self.hdri_label)
-        layout.addLayout(hdri_layout)
-        layout.addWidget(self.rotation_label)
-        layout.addWidget(self.rotation_input)
-        layout.addWidget(self.light_rotation_label)
-        layout.addWidget(self.light_rotation_input)
-        layout.addWidget(self.sweep_checkbox)
-        layout.addWidget(self.refkit_checkbox)
-        layout.addWidget(self.macbeth_label)
-        layout.addLayout(macbeth_layout)
-        layout.addWidget(self.start_frame_label)
-        layout.addWidget(self.start_frame_input)
-        layout.addWidget(self.button_box)
-        self.setLayout(layout)
-
-    #file browser for HDRI image
-    def browse_hdri(self):
-        path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Select HDRI File", "", "EXR Files (*.exr)")
-        if path:
-            self.hdri_input.setText(path)
-
-    #file browser for macbeth chart texture          
-    def browse_macbeth(self):
-        path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Select Macbeth Texture", "", "Image Files (*.jpg *.jpeg *.png *.tif *.tiff)")
-        if path:
-            self.macbeth_input.setText(path)
-
-    #return values for rig setup
-    def get_values(self):
-        return {
-            "hdri_path": self.hdri_input.text(),
-            "rotation_offset": self.rotation_input.value(),
-            "hdri_rotation_offset": self.light_rotation_input.value(),
-            "sweep_enabled": self.sweep_checkbox.isChecked(),
-            "add_refkit": self.refkit_checkbox.isChecked(),
-            "macbeth_path": self.macbeth_input.text(),
-            "start_frame": int(self.start_frame_input.text())
-        }
-
-        
-### function for simplifying keyframing process        
-def create_keyframe(parm, value, frame):
-    key = hou.Keyframe()
-    key.setFrame(frame)
-    key.setValue(value)
-    parm.setKeyframe(key)
-
-### Add turntable animation for camera from frames 1001 - 1100   
-def update_camera_animation(cam, center, cam_distance, initial_angle, start_frame):
-    for parm_name in ("tx", "ty", "tz"):
-        cam.parm(parm_name).deleteAllKeyframes()
+### run a view-only action (layout, network box fitting) now, or once at the end of the running rig transaction
+def defer(action, *args):
+    if _deferred is None:
+        action(*args)
+    elif (action, args) not in _deferred:
+        _deferred.append((action, args))
+
+### destroy the nodes created under roots since the snapshot was taken
+def remove_new_nodes(snapshot):
+    for root_path, names in snapshot.items():
+        root = hou.node(root_path)
+        if root is None:
+            continue
+        for child in root.children():
+            if child.name() not in names:
+                child.destroy()
+
+### SOPs carrying the display and render flags of geo objects, by object path
+def get_flag_nodes(models):
+    return dict((model.path(), (model.displayNode(), model.renderNode()))
+                for model in models if model.type().name() == "geo" and model.renderNode() is not None)
+
+### give the display and render flags back to the SOPs that had them
+def restore_flag_nodes(flag_nodes):
+    for display_node, render_node in flag_nodes.values():
+        if display_node is not None and not display_node.isDisplayFlagSet():
+            display_node.setDisplayFlag(True)
+        if render_node is not None and not render_node.isRenderFlagSet():
+            render_node.setRenderFlag(True)
+
+### run a rig build as one transaction: manual update mode, one undo step in the UI (undo off in hython),
+### layout deferred to the end, and a rollback if the build fails. In the UI the whole step is undone. In hython
+### the nodes created in /obj and /mat and the SOPs added inside models (the display proxy) are removed and the
+### models' display and render flags restored, but parm edits on nodes that existed before (an update of an
+### existing rig) are not reverted: rebuild the rig after a failed update
+@contextlib.contextmanager
+def rig_transaction(label, models=()):
+    global _deferred
+    if _deferred is not None:
+        yield
+        return
 
+    undoable = hou.isUIAvailable()
+    roots = [hou.node("/obj"), hou.node("/mat")] + [model for model in models if model.type().name() == "geo"]
+    snapshot = dict((root.path(), set(child.name() for child in root.children())) for root in roots)
+    flag_nodes = get_flag_nodes(models)
+    update_mode = hou.updateModeSetting()
+    hou.setUpdateMode(hou.updateMode.Manual)
+    _deferred = []
+    try:
+        try:
+            with (hou.undos.group(label) if undoable else hou.undos.disabler()):
+                try:
+                    yield
+                    with profile_phase("layout"):
+                        for action, args in _deferred:
+                            action(*args)
+                except Exception:
+                    #without undo the partial rig is removed by hand
+                    if not undoable:
+                        remove_new_nodes(snapshot)
+                        restore_flag_nodes(flag_nodes)
+                    raise
+        except Exception:
+            if undoable:
+                hou.undos.performUndo()
+            raise
+    finally:
+        _deferred = None
+        #back to the user's update mode, which cooks what is visible once
+        hou.setUpdateMode(update_mode)
+
+### write a whole channel of keys with one setKeyframes call
+def set_keyframes(parm, frames, values):
+    keys = []
+    for frame, value in zip(frames, values):
+        key = hou.Keyframe()
+        key.setFrame(float(frame))
+        key.setValue(float(value))
+        keys.append(key)
+    parm.setKeyframes(keys)
+
+### key tx, ty, tz of a node from a batch of orbit samples
+def apply_orbit_keys(node, frames, samples):
+    for axis, parm_name in enumerate(("tx", "ty", "tz")):
+        parm = node.parm(parm_name)
+        parm.deleteAllKeyframes()
+        set_keyframes(parm, frames, samples[:, axis])
+
+### Add turntable animation for camera over the first pass (1001 - 1100 by default)
+def update_camera_animation(cam, center, cam_distance, initial_angle, start_frame, frame_count=DEFAULT_FRAME_COUNT):
     #calculate rotation of camera around the selected object
-    for f in range(start_frame, start_frame + 101):
-        t = (f - start_frame) / 99.0
-        angle_deg = initial_angle + t * 360
-        angle_rad = math.radians(angle_deg)
-        cam_x = center[0] + cam_distance * math.sin(angle_rad)
-        cam_z = center[2] + cam_distance * math.cos(angle_rad)
-        cam_y = center[1]
-        create_keyframe(cam.parm("tx"), cam_x, f)
-        create_keyframe(cam.parm("ty"), cam_y, f)
-        create_keyframe(cam.parm("tz"), cam_z, f)
+    frames, samples = orbit_samples(center, cam_distance, initial_angle, start_frame, frame_count)
+    apply_orbit_keys(cam, frames, samples)
  
-### Add turntable animation for sweep geo from frames 1001 - 1100 
-def update_sweep_animation(null, center, cam_distance, initial_angle, start_frame):
-    for parm_name in ("tx", "ty", "tz"):
-        null.parm(parm_name).deleteAllKeyframes()
-        
+### Add turntable animation for sweep geo over the first pass (1001 - 1100 by default)
+def update_sweep_animation(null, center, cam_distance, initial_angle, start_frame, frame_count=DEFAULT_FRAME_COUNT):
     #calculate rotation of sweep around the selected object (matching camera)
-    for f in range(start_frame, start_frame + 101):
-        t = (f - start_frame) / 99.0
-        angle_deg = initial_angle + t * 360
-        angle_rad = math.radians(angle_deg)
-        null_x = center[0] + cam_distance * math.sin(angle_rad)
-        null_z = center[2] + cam_distance * math.cos(angle_rad)
-        null_y = center[1]
-        create_keyframe(null.parm("tx"), null_x, f)
-        create_keyframe(null.parm("ty"), null_y, f)
-        create_keyframe(null.parm("tz"), null_z, f)
+    frames, samples = orbit_samples(center, cam_distance, initial_angle, start_frame, frame_count)
+    apply_orbit_keys(null, frames, samples)
         
 
 
-### Add turntable rotation for hdri light (should match object for 1001 - 1100 and should rotate from 1101 - 1200         
-def update_envlight_animation(env_light, initial_angle, hdri_rotation, start_frame):
+### Add turntable rotation for hdri light (should match object for the first pass and rotate back over the second)
+def update_envlight_animation(env_light, initial_angle, hdri_rotation, start_frame, frame_count=DEFAULT_FRAME_COUNT):
     ry = env_light.parm("ry")
     ry.deleteAllKeyframes()
-    base = initial_angle + 180
-    create_keyframe(ry, base - 360, start_frame)
-    create_keyframe(ry, base, start_frame + 99)
-    create_keyframe(ry, base - 360, start_frame + 199)
+    frames, angles = envlight_keys(initial_angle, start_frame, frame_count)
+    set_keyframes(ry, frames, angles)
+
+### drive camera, sweep null and envlight from the orbit spare parms on the control (no keyframes)
+def connect_procedural_orbit(cam, sweep_null, env_light, control="../../lookdev_rig_control", target="../lookat_target"):
+    for node in (cam, sweep_null):
+        for parm_name, expression in orbit_position_expressions(control, target).items():
+            parm = node.parm(parm_name)
+            parm.deleteAllKeyframes()
+            parm.setExpression(expression, hou.exprLanguage.Hscript)
+
+    ry = env_light.parm("ry")
+    ry.deleteAllKeyframes()
+    ry.setExpression(envlight_rotation_expression(control), hou.exprLanguage.Hscript)
 
     
     
     
-### model the backdrop sweep geo    
-def create_sweep(size, center, cam_distance):
-    sweep_geo = hou.node("/obj").createNode("geo", "lookdev_sweep")
-    for c in sweep_geo.children(): c.destroy()
+### root of the on-disk caches (sweep, ref kit, ...)
+def get_cache_root():
+    return os.environ.get("LOOKDEV_CACHE_DIR") or os.path.join(hou.expandString("$HOUDINI_USER_PREF_DIR"), "lookdev_cache")
 
-    # sweep geo dimensions 
+### texture for the envlight: the HDRI converted to a mipmapped .rat in the disk cache (the original if it cannot be)
+def get_env_map(hdri_path):
+    return prepare_hdri(hdri_path, get_cache_root())["map"]
+
+### index of the HDRI library, kept in the disk cache
+def get_hdri_library():
+    return HdriLibrary(get_cache_root())
+
+### decimated viewport proxy of the model from the disk cache, the render flag stays on the model (see lookdev_display_proxy)
+def update_display_proxy(model_node, values):
+    return apply_display_proxy(model_node, values.get("display_proxy", "reduce"), get_cache_root())
+
+### sweep geo dimensions from the model framing, rounded so similar sized assets share a cached sweep
+### (the sweep is baked with its floor at 0, see get_sweep_base)
+def get_sweep_dimensions(size, center, cam_distance):
     arc_radius = max(size[0], size[1], size[2]) * 4
     sweep_width = max(size[0], size[1], size[2]) * 10
     floor_len = cam_distance/4
-    object_base = center[1] - (size[1]/2)
+    return tuple(round_significant(value) for value in (arc_radius, sweep_width, floor_len))
+
+### height of the model's base, where the sweep floor goes (exact, it is not part of the bake)
+def get_sweep_base(size, center):
+    return center[1] - (size[1]/2)
 
+### build the sweep SOP chain with the floor at 0 and return its last node
+def build_sweep_sops(sweep_geo, arc_radius, sweep_width, floor_len):
     #create arc for sweep angle and orient towards camera
     arc = sweep_geo.createNode("circle", "arc")
     arc.parm("type").set(1)
@@ -216,7 +279,7 @@ def create_sweep(size, center, cam_distance):
     arc.parm("divs").set(16)
     arc.parm("ry").set(90)
     arc.parm("rz").set(-90)
-    arc.parm("ty").set(object_base + arc_radius)
+    arc.parm("ty").set(arc_radius)
     
     #move away from camera
     move_arc = sweep_geo.createNode("xform", "offset_arc")
@@ -241,7 +304,6 @@ def create_sweep(size, center, cam_distance):
     floor.parm("sizex").set(sweep_width)
     floor.parm("sizey").set(floor_len * 4)
     floor.parm("tz").set(floor_len)
-    floor.parm("ty").set(object_base)
     floor.parm("rows").set(2)
     floor.parm("cols").set(2)
 
@@ -255,20 +317,54 @@ def create_sweep(size, center, cam_distance):
     #subdivide to smooth out
     subdiv = sweep_geo.createNode("subdivide", "subdivide")
     subdiv.setInput(0, fuse)
+    return subdiv
+
+### bake the sweep for these dimensions into the disk cache, or reuse an earlier bake
+def get_sweep_cache_file(dimensions):
+    cache = DiskCache(get_cache_root(), "sweep", SWEEP_CACHE_MAX_BYTES)
+    key = cache_key("sweep", SWEEP_BAKE_VERSION, dimensions)
+    path = cache.get(key, ".bgeo.sc")
+    if path is not None:
+        return path
+
+    bake_geo = hou.node("/obj").createNode("geo", "lookdev_sweep_bake")
+    try:
+        for c in bake_geo.children(): c.destroy()
+        subdiv = build_sweep_sops(bake_geo, *dimensions)
+        temp_path = cache.temp_path(key, ".bgeo.sc")
+        subdiv.geometry().saveToFile(temp_path)
+    finally:
+        bake_geo.destroy()
+    return cache.commit(temp_path, key, ".bgeo.sc")
+
+### point an existing sweep network at the cached sweep for this framing
+def set_sweep_dimensions(sweep_geo, size, center, cam_distance):
+    sweep_file = get_sweep_cache_file(get_sweep_dimensions(size, center, cam_distance))
+    sweep_geo.node("sweep_cache").parm("file").set(sweep_file)
+    #move under the model, with the floor at its base
+    centered = sweep_geo.node("center")
+    centered.parmTuple("t").set((-center[0], get_sweep_base(size, center), -center[2]))
+    centered.parmTuple("p").set((-center[0], 0, -center[2]))
+
+### backdrop sweep geo loaded from the sweep cache (into sweep_geo if given, e.g. when updating an existing rig)
+def create_sweep(size, center, cam_distance, sweep_geo=None):
+    if sweep_geo is None:
+        sweep_geo = hou.node("/obj").createNode("geo", "lookdev_sweep")
+    for c in sweep_geo.children(): c.destroy()
+
+    #baked sweep geo, as a packed disk primitive so IFDs reference the file instead of carrying the geometry
+    sweep_cache = sweep_geo.createNode("file", "sweep_cache")
+    sweep_cache.parm("loadtype").set("delayed")
     
     #move to object location
     centered = sweep_geo.createNode("xform", "center")
-    centered.setInput(0, subdiv)
-    centered.parm("tx").set(-center[0])
-    centered.parm("tz").set(-center[2])
-    centered.parm("px").set(-center[0])
-    centered.parm("pz").set(-center[2])
-
+    centered.setInput(0, sweep_cache)
+    set_sweep_dimensions(sweep_geo, size, center, cam_distance)
 
     #connect grey shader
     material = sweep_geo.createNode("material", "material")
     material.setInput(0, centered)
-    material.parm("shop_materialpath1").set("/obj/lookdev_sweep/matnet/grey_shader")
+    material.parm("shop_materialpath1").set(sweep_geo.path() + "/matnet/grey_shader")
 
     #set display flags and null output
     output = sweep_geo.createNode("null", "OUT")
@@ -281,20 +377,42 @@ def create_sweep(size, center, cam_distance):
     shader = matnet.createNode("principledshader", "grey_shader")
     shader.parmTuple("basecolor").set((0.007, 0.007, 0.007))
     shader.parm("rough").set(0.5)
-    matnet.layoutChildren()
+    defer(matnet.layoutChildren)
 
-    sweep_geo.layoutChildren()
+    defer(sweep_geo.layoutChildren)
     return sweep_geo
 
 
-### create lookdev ref geo (chrome ball, grey ball, and macbeth color chart) 
-def create_lookdev_reference_kit(parent_node, center, size, texture_path, cam_distance):
-    refs_geo = parent_node.createNode("geo", "lookdev_refs")
-    for child in refs_geo.children():
-        child.destroy()
-
-    spacing = 2.5 #space between chart and balls
-    ball_radius = 1
+### shared material library for the ref kit in /mat, created once per scene and used by every rig
+def get_reference_kit_materials(texture_path):
+    mat = hou.node("/mat")
+    chrome_shader = mat.node("lookdev_chrome_shader")
+    if chrome_shader is None:
+        chrome_shader = mat.createNode("principledshader", "lookdev_chrome_shader")
+        chrome_shader.parm("metallic").set(1)
+        chrome_shader.parm("rough").set(0.02)
+
+    grey_shader = mat.node("lookdev_grey_shader")
+    if grey_shader is None:
+        grey_shader = mat.createNode("principledshader", "lookdev_grey_shader")
+        grey_shader.parmTuple("basecolor").set((0.18, 0.18, 0.18))
+        grey_shader.parm("rough").set(0.5)
+
+    macbeth_shader = mat.node("lookdev_macbeth_shader")
+    if macbeth_shader is None:
+        macbeth_shader = mat.createNode("principledshader", "lookdev_macbeth_shader")
+        macbeth_shader.parm("basecolor_useTexture").set(True)
+        macbeth_shader.parm("rough").set(1)
+        macbeth_shader.parmTuple("basecolor").set((1, 1, 1))
+        defer(mat.layoutChildren)
+    if macbeth_shader.parm("basecolor_texture").eval() != texture_path:
+        macbeth_shader.parm("basecolor_texture").set(texture_path)
+
+    return {"chrome": chrome_shader.path(), "grey": grey_shader.path(), "macbeth": macbeth_shader.path()}
+
+### build the ref kit SOPs (chrome ball, grey ball, and macbeth color chart) and return the last node
+def build_reference_kit_sops(refs_geo, materials):
+    spacing = REFKIT_SPACING #space between chart and balls
 
     # Chrome Ball
     chrome = refs_geo.createNode("sphere", "chrome_ball")
@@ -303,7 +421,7 @@ def create_lookdev_reference_kit(parent_node, center, size, texture_path, cam_di
 
     chrome_mat = refs_geo.createNode("material", "chrome_mat")
     chrome_mat.setInput(0, chrome)
-    chrome_mat.parm("shop_materialpath1").set("/obj/lookdev_refs/matnet/chrome_shader")
+    chrome_mat.parm("shop_materialpath1").set(materials["chrome"])
 
     # Grey Ball 
     grey = refs_geo.createNode("sphere", "grey_ball")
@@ -312,7 +430,7 @@ def create_lookdev_reference_kit(parent_node, center, size, texture_path, cam_di
 
     grey_mat = refs_geo.createNode("material", "grey_mat")
     grey_mat.setInput(0, grey)
-    grey_mat.parm("shop_materialpath1").set("/obj/lookdev_refs/matnet/grey_shader")
+    grey_mat.parm("shop_materialpath1").set(materials["grey"])
 
     # Macbeth Chart
     chart = refs_geo.createNode("grid", "macbeth_chart")
@@ -321,26 +439,17 @@ def create_lookdev_reference_kit(parent_node, center, size, texture_path, cam_di
     chart.parmTuple("t").set((0, (0), 0))
     chart.parmTuple("r").set((-90, 0, 0))
     
-    #UV projection node setup for macbeth chart
+    #UV projection node setup for macbeth chart, using the chart's known bounds instead of cooking it
     uv = refs_geo.createNode("uvproject", "uv")
     uv.setInput(0, chart)
     uv.parm("projtype").set(0)  #orthographic type
-
-    #Get bounding box info from the chart geo
-    refs_geo.layoutChildren() 
-    chart_geo = chart.geometry()
-    bbox = chart_geo.boundingBox()
-    center = bbox.center()
-    size = bbox.sizevec()
-    
-    #calculate UVs
-    uv.parmTuple("t").set((center[0], center[1], center[2]))
-    uv.parmTuple("s").set((size[0], size[1], size[2]))
+    uv.parmTuple("t").set(REFKIT_CHART_CENTER)
+    uv.parmTuple("s").set(REFKIT_CHART_SIZE)
 
     #macbeth chart shader connection
     chart_mat = refs_geo.createNode("material", "chart_mat")
     chart_mat.setInput(0, uv)
-    chart_mat.parm("shop_materialpath1").set("/obj/lookdev_refs/matnet/macbeth_shader")
+    chart_mat.parm("shop_materialpath1").set(materials["macbeth"])
     
     #conbine chart and balls nodes with merge
     merge_refs = refs_geo.createNode("merge", "merge_refs")
@@ -351,38 +460,125 @@ def create_lookdev_reference_kit(parent_node, center, size, texture_path, cam_di
     #scale the lookdev refs down  
     rescale = refs_geo.createNode("xform", "scale")
     rescale.setInput(0, merge_refs)
-    rescale.parmTuple("s").set((.008, .008, .008))
+    rescale.parmTuple("s").set((REFKIT_SCALE, REFKIT_SCALE, REFKIT_SCALE))
+    return rescale
+
+### bake the ref kit geometry into the disk cache once, or reuse the earlier bake
+def get_reference_kit_cache_file(materials):
+    cache = DiskCache(get_cache_root(), "refkit", REFKIT_CACHE_MAX_BYTES)
+    key = cache_key("refkit", REFKIT_BAKE_VERSION, materials)
+    path = cache.get(key, ".bgeo.sc")
+    if path is not None:
+        return path
+
+    bake_geo = hou.node("/obj").createNode("geo", "lookdev_refkit_bake")
+    try:
+        for child in bake_geo.children(): child.destroy()
+        kit = build_reference_kit_sops(bake_geo, materials)
+        temp_path = cache.temp_path(key, ".bgeo.sc")
+        kit.geometry().saveToFile(temp_path)
+    finally:
+        bake_geo.destroy()
+    return cache.commit(temp_path, key, ".bgeo.sc")
+
+### lookdev ref geo referencing the shared, cached ref kit as a packed disk primitive, into refs_geo if given
+def create_lookdev_reference_kit(parent_node, values, refs_geo=None):
+    if refs_geo is None:
+        refs_geo = parent_node.createNode("geo", "lookdev_refs")
+    for child in refs_geo.children():
+        child.destroy()
+
+    materials = get_reference_kit_materials(values["macbeth_path"])
+    refkit = refs_geo.createNode("file", "refkit_cache")
+    refkit.parm("file").set(get_reference_kit_cache_file(materials))
+    refkit.parm("loadtype").set("delayed")  #packed disk primitive
 
     #setup output and display flag
     output = refs_geo.createNode("null", "OUT")
-    output.setInput(0, rescale)
+    output.setInput(0, refkit)
     output.setDisplayFlag(True)
     output.setRenderFlag(True)
 
-    #create material network and shaders for balls and chart
-    matnet = refs_geo.createNode("matnet", "matnet")
-    chrome_shader = matnet.createNode("principledshader", "chrome_shader")
-    chrome_shader.parm("metallic").set(1)
-    chrome_shader.parm("rough").set(0.02)
-
-    grey_shader = matnet.createNode("principledshader", "grey_shader")
-    grey_shader.parmTuple("basecolor").set((0.18, 0.18, 0.18))
-    grey_shader.parm("rough").set(0.5)
-
-    macbeth_shader = matnet.createNode("principledshader", "macbeth_shader")
-    macbeth_shader.parm("basecolor_useTexture").set(True)
-    macbeth_shader.parm("basecolor_texture").set(texture_path)
-    macbeth_shader.parm("rough").set(1)
-    macbeth_shader.parmTuple("basecolor").set((1, 1, 1))
-
-    #layout and return 
-    matnet.layoutChildren()
-    refs_geo.layoutChildren()
+    defer(refs_geo.layoutChildren)
     return refs_geo
     
     
     
-def add_parameters_to_control(rig, values):
+### spare parms read by the procedural orbit expressions
+def create_orbit_parm_templates(values, cam_distance):
+    start_frame, end_frame = turntable_range(values["start_frame"], values.get("frame_count", DEFAULT_FRAME_COUNT))
+    range_callback = ('n = kwargs["node"]; s = n.evalParm("orbit_start"); e = s + 2 * n.evalParm("orbit_frames"); '
+                      'hou.playbar.setFrameRange(s, e); hou.playbar.setPlaybackRange(s, e)')
+    return [
+        hou.FloatParmTemplate(
+            name="orbit_turns", label="Orbit Turns", num_components=1,
+            default_value=(1,), min=0, max=4
+        ),
+        hou.IntParmTemplate(
+            name="orbit_start", label="Orbit Start Frame", num_components=1,
+            default_value=(start_frame,), min=1, max=100000,
+            script_callback=range_callback, script_callback_language=hou.scriptLanguage.Python
+        ),
+        hou.IntParmTemplate(
+            name="orbit_frames", label="Frames Per Pass", num_components=1,
+            default_value=(values.get("frame_count", DEFAULT_FRAME_COUNT),), min=2, max=10000,
+            script_callback=range_callback, script_callback_language=hou.scriptLanguage.Python
+        ),
+        hou.FloatParmTemplate(
+            name="orbit_radius", label="Orbit Radius", num_components=1,
+            default_value=(cam_distance,), min=0, max=max(cam_distance * 4, 1)
+        ),
+        hou.FloatParmTemplate(
+            name="orbit_angle", label="Orbit Start Angle", num_components=1,
+            default_value=(values["rotation_offset"],), min=-360, max=360
+        ),
+        hou.FloatParmTemplate(
+            name="orbit_phase", label="Orbit Phase", num_components=1,
+            default_value=(0,), is_hidden=True
+        ),
+    ]
+
+
+ORBIT_PARM_NAMES = ("orbit_turns", "orbit_start", "orbit_frames", "orbit_radius", "orbit_angle", "orbit_phase")
+
+### append parm templates to the Transform folder of a parm template group
+def append_to_transform_folder(parm_group, templates):
+    for entry in parm_group.entries():
+        if isinstance(entry, hou.FolderParmTemplate) and entry.label() == "Transform":
+            children = list(entry.parmTemplates())
+            children.extend(templates)
+            updated_folder = hou.FolderParmTemplate(
+                entry.name(), entry.label(), children, folder_type=entry.folderType()
+            )
+            parm_group.replace(entry.name(), updated_folder)
+            break
+
+### connect the orbit phase expression and drive the rig nodes from it
+def connect_orbit_parameters(rig, subnet):
+    rig.parm("orbit_phase").setExpression(orbit_phase_expression(), hou.exprLanguage.Hscript)
+    connect_procedural_orbit(subnet.node("lookdev_cam"), subnet.node("sweep_animation"), subnet.node("lookdev_envlight"))
+
+### add the procedural orbit parms to an existing control (switching an existing rig to procedural)
+def add_orbit_parameters(rig, values, cam_distance, subnet):
+    if rig.parm("orbit_phase") is None:
+        parm_group = rig.parmTemplateGroup()
+        append_to_transform_folder(parm_group, create_orbit_parm_templates(values, cam_distance))
+        rig.setParmTemplateGroup(parm_group)
+    connect_orbit_parameters(rig, subnet)
+
+### remove the procedural orbit parms (switching an existing rig back to keyframes)
+def remove_orbit_parameters(rig):
+    parm_group = rig.parmTemplateGroup()
+    for parm_name in ORBIT_PARM_NAMES:
+        if parm_group.find(parm_name) is not None:
+            parm_group.remove(parm_name)
+    rig.setParmTemplateGroup(parm_group)
+
+
+### control parms driving the rig in subnet (/obj/lookdev_rig by default)
+def add_parameters_to_control(rig, values, cam_distance=None, subnet=None):
+    if subnet is None:
+        subnet = hou.node("/obj/lookdev_rig")
 
     # Create a new parameter group from the existing one
     parm_group = rig.parmTemplateGroup()
@@ -411,16 +607,10 @@ def add_parameters_to_control(rig, values):
     rig.setParmTemplateGroup(parm_group)
         
     #add parameters into transform group
-    for entry in parm_group.entries():
-        if isinstance(entry, hou.FolderParmTemplate) and entry.label() == "Transform":
-            children = list(entry.parmTemplates())
-            children.append(hdri_rot_offset_parm)
-            children.append(camera_angle_offset_parm)
-            updated_folder = hou.FolderParmTemplate(
-                entry.name(), entry.label(), children, folder_type=entry.folderType()
-            )
-            parm_group.replace(entry.name(), updated_folder)
-            break
+    templates = [hdri_rot_offset_parm, camera_angle_offset_parm]
+    if values.get("procedural_orbit"):
+        templates.extend(create_orbit_parm_templates(values, cam_distance))
+    append_to_transform_folder(parm_group, templates)
     
     #hide extra parameters
     parms_to_hide = ["t", "r", "s", "p", "pr", "xOrd", "rOrd", "scale", "pre_xform", "keeppos", "childcomp", "constraints_on"]
@@ -434,54 +624,130 @@ def add_parameters_to_control(rig, values):
     rig.setParmTemplateGroup(parm_group)
    
     #connect to HDRI transform relative references 
-    hdri_subnet = hou.node( "/obj/lookdev_rig/hdri_rotation") 
+    hdri_subnet = subnet.node("hdri_rotation")
     hdri_subnet.parm("ry").setExpression('ch("../../lookdev_rig_control/hdri_rotation_offset")', hou.exprLanguage.Hscript)  
     
-    cam_angle_subnet = hou.node( "/obj/lookdev_rig/camera_transform")
+    cam_angle_subnet = subnet.node("camera_transform")
     cam_angle_subnet.parm("ty").setExpression('ch("../../lookdev_rig_control/camera_height_offset")', hou.exprLanguage.Hscript)
 
+    #single orbit expression that the camera, sweep and envlight expressions read from
+    if values.get("procedural_orbit"):
+        connect_orbit_parameters(rig, subnet)
+
+    
     
+### unlock, set and relock the transform parms of a rig node
+def set_locked_parms(node, parm_values):
+    for parm_name, value in parm_values.items():
+        node.parm(parm_name).lock(False)
+        node.parm(parm_name).set(value)
+    for parm_name in ["tx", "ty", "tz", "rx", "ry", "rz", "sx", "sy", "sz"]: 
+        node.parm(parm_name).lock(True)
+
+### parent the sweep geo to the sweep_animation null and push it behind the model
+def place_sweep(sweep, sweep_null, center, cam_distance):
+    sweep.setFirstInput(sweep_null)
+    set_locked_parms(sweep, {"tz": -cam_distance, "ty": -(center[1]), "tx": center[0]})
+
+### parent the ref kit to the camera
+def place_reference_kit(lookdev_refs, cam):
+    lookdev_refs.setFirstInput(cam) #orient towards camera transform
+
+    #calculate location of reference geo - arbitrary numbers for upper left corner of 16:9 camera (so uh please don't change the aspect ratio..)
+    set_locked_parms(lookdev_refs, {"tz": -.25, "ty": .047, "tx": -.072})
+
+### set the ROP and playbar range for the turntable
+def set_frame_range(mantra, values):
+    first_frame, last_frame = turntable_range(values["start_frame"], values.get("frame_count", DEFAULT_FRAME_COUNT))
+    if hou.isUIAvailable():
+        hou.playbar.setFrameRange(first_frame, last_frame)
+        hou.playbar.setPlaybackRange(first_frame, last_frame)
+    mantra.parm("trange").set(1)
+    mantra.parm("f1").deleteAllKeyframes()
+    mantra.parm("f2").deleteAllKeyframes()
+    if values.get("procedural_orbit"):
+        mantra.parm("f1").setExpression('ch("../../lookdev_rig_control/orbit_start")', hou.exprLanguage.Hscript)
+        mantra.parm("f2").setExpression('ch("../../lookdev_rig_control/orbit_start") + 2 * ch("../../lookdev_rig_control/orbit_frames")', hou.exprLanguage.Hscript)
+    else:
+        mantra.parm("f1").set(first_frame)
+        mantra.parm("f2").set(last_frame)
+
+### default image path of an asset's frames, a folder per asset
+def get_asset_output(name):
+    return "$HIP/render/%s/%s.$F4.exr" % (name, name)
+
+### objects rendered by the mantra rop
+def get_force_objects(lookdev_refs, sweep, object_path):
+    return lookdev_refs.path() + " " + sweep.path() + " " + object_path
+
+### get center, size and camera distance for the model: tight framing solved over its points at one degree steps
+### around the orbit (whatever the frame count), or the older bounding box heuristic (both cached, cooks the model
+### only if it has to);
+### without a camera the lens of a new rig (CAMERA_LENS) is used
+def compute_framing(model_node, values, cam=None):
+    if values.get("tight_framing", True):
+        angles = framing_angles(values["rotation_offset"])
+        lens = dict(CAMERA_LENS) if cam is None else dict((name, cam.evalParm(name)) for name, _ in CAMERA_LENS)
+        tan_half_h, tan_half_v = camera_tangents(lens["focal"], lens["aperture"], lens["resx"], lens["resy"],
+                                                 lens["aspect"])
+        return get_model_framing(model_node, get_cache_root(), angles, tan_half_h, tan_half_v)
+    center, size, source = get_model_bounds(model_node, get_cache_root())
     
+    #change distance increment depending on wide vs narrow object
+    if size[0] > size[1]:
+        dist_inc = 2.5
+    else:
+        dist_inc = 3
+    cam_distance = max(size) * dist_inc #calculate distance from camera to object
+    return center, size, cam_distance
+
+### remember what the rig was built from so it can be updated in place later
+def store_rig_state(subnet, values, model_node, center, size, cam_distance):
+    subnet.setUserData("lookdev_settings", json.dumps(values))
+    subnet.setUserData("lookdev_model", model_node.path())
+    subnet.setUserData("lookdev_framing", json.dumps({"center": center, "size": size, "cam_distance": cam_distance}))
+    #what the rendered frames depend on, for the turntable result cache
+    subnet.setUserData("lookdev_turntable_key", get_turntable_key(values, model_node, (center, size, cam_distance)))
+
+### lay out nodes at the top of a network and put them in a new network box
+def group_in_network_box(network, nodes_to_group):
+    network_box = network.createNetworkBox()
+    network.layoutChildren(items = nodes_to_group) 
+    for node in nodes_to_group: 
+        network_box.addItem(node) 
+    network_box.fitAroundContents() 
+    return network_box
+
+### compare two framings, ignoring float noise from the bounding box
+def framing_changed(old_framing, center, size, cam_distance):
+    if not old_framing:
+        return True
+    old = list(old_framing["center"]) + list(old_framing["size"]) + [old_framing["cam_distance"]]
+    new = list(center) + list(size) + [cam_distance]
+    return any(abs(a - b) > 1e-6 for a, b in zip(old, new))
+
+
+
 ##################################################    
 ### main function for building the lookdev rig ###
 ##################################################
 
 
-def create_lookdev_envlight_rig_with_ui():
-    #summon UI
-    dialog = LookdevRigUI(hou.ui.mainQtWindow())
-    if dialog.exec_() != QtWidgets.QDialog.Accepted:
-        return
+### build a new rig around model_node from a settings dict (keys of DEFAULT_SETTINGS, missing ones use the defaults),
+### as one transaction that leaves nothing behind if it fails
+def build_lookdev_rig(values, model_node):
+    with rig_transaction("Build Lookdev Rig", [model_node]):
+        return create_lookdev_rig_nodes(resolve_settings(values), model_node)
 
-    #get and check values from UI
-    values = dialog.get_values()
+### create every node of a new rig (see build_lookdev_rig)
+def create_lookdev_rig_nodes(values, model_node):
     hdri_path = values["hdri_path"] 
     start_frame = values["start_frame"]
-    
-    if not os.path.isfile(hdri_path):
-        hou.ui.displayMessage("Invalid HDRI path.")
-        return
-
-    # make sure object is selected before running code
-    selected = hou.selectedNodes()
-    if not selected:
-        hou.ui.displayMessage("Please select a geometry node.")
-        return
+    frame_count = values.get("frame_count", DEFAULT_FRAME_COUNT)
+    procedural = values.get("procedural_orbit", False)
         
     #get info from object bounding box 
-    geo = selected[0].displayNode().geometry()
-    object = selected[0]
-    object_path = object.path()
-    bbox = geo.boundingBox()
-    center = bbox.center()
-    size = bbox.sizevec()
-    
-    #change distance increment depending on wide vs narrow object
-    if size[0] > size[1]:
-        dist_inc = 2.5
-    else:
-        dist_inc = 3
-    cam_distance = max(size) * dist_inc #calculate distance from camera to object
+    object_path = model_node.path()
     obj = hou.node("/obj")
 
     #create null that controls angle shift of camera 
@@ -497,15 +763,21 @@ def create_lookdev_envlight_rig_with_ui():
     cam_null.setDisplayFlag(False)
     cam_null.setColor(hou.Color((1, 0, 0)))
     cam.setFirstInput(cam_null)
+    for parm_name, value in CAMERA_LENS:
+        cam.parm(parm_name).set(value)
+    with profile_phase("framing"):
+        center, size, cam_distance = compute_framing(model_node, values, cam)
 
     #create null that controls animation of sweep geo
     sweep_null = obj.createNode("null", "sweep_animation")
     sweep_null.setDisplayFlag(False)
     sweep_null.setColor(hou.Color((1, 0, 0)))
   
-    #call functions that setup the camera and sweep animations
-    update_camera_animation(cam, center, cam_distance, values["rotation_offset"], start_frame)
-    update_sweep_animation(sweep_null, center, cam_distance, values["rotation_offset"], start_frame)
+    #call functions that setup the camera and sweep animations (procedural mode connects expressions later)
+    if not procedural:
+        with profile_phase("keyframes"):
+            update_camera_animation(cam, center, cam_distance, values["rotation_offset"], start_frame, frame_count)
+            update_sweep_animation(sweep_null, center, cam_distance, values["rotation_offset"], start_frame, frame_count)
 
     #place null at object location for orientation
     lookat = obj.createNode("null", "lookat_target")
@@ -524,8 +796,11 @@ def create_lookdev_envlight_rig_with_ui():
     env.parm("light_enable").set(True)
     env.parm("light_intensity").set(1.0)
     env.parm("light_contribprimary").set(True)
-    env.parm("env_map").set(hdri_path)
-    update_envlight_animation(env, values["rotation_offset"], values["hdri_rotation_offset"], start_frame)
+    with profile_phase("hdri"):
+        env.parm("env_map").set(get_env_map(hdri_path))
+    if not procedural:
+        with profile_phase("keyframes"):
+            update_envlight_animation(env, values["rotation_offset"], values["hdri_rotation_offset"], start_frame, frame_count)
 
     
     #create null that controls rotation offset of HDRI
@@ -536,76 +811,240 @@ def create_lookdev_envlight_rig_with_ui():
    
     
     #create and transform sweep geo if requested in UI
-    if values["sweep_enabled"]:
-        sweep = create_sweep(size, center, cam_distance)
-        sweep.setFirstInput(sweep_null)
-        sweep.parm("tz").set(-cam_distance)
-        sweep.parm("ty").set(-(center[1]))
-        sweep.parm("tx").set((center[0]))
-        for parm_name in ["tx", "ty", "tz", "rx", "ry", "rz", "sx", "sy", "sz"]: 
-            sweep.parm(parm_name).lock(True)
-    else:
-        sweep = hou.node("/obj").createNode("geo", "lookdev_sweep")
+    with profile_phase("sweep"):
+        if values["sweep_enabled"]:
+            sweep = create_sweep(size, center, cam_distance)
+            place_sweep(sweep, sweep_null, center, cam_distance)
+        else:
+            sweep = hou.node("/obj").createNode("geo", "lookdev_sweep")
      
              
-
-    if values["add_refkit"]:
-        lookdev_refs = create_lookdev_reference_kit(obj, center, size, values["macbeth_path"], cam_distance)
-        #update_lookdev_refs_animation(values["rotation_offset"])
-        lookdev_refs.setFirstInput(cam) #orient towards camera transform
-        
-        #calculate location of reference geo - arbitrary numbers for upper left corner of 16:9 camera (so uh please don't change the aspect ratio..)
-        lookdev_refs.parm("tz").set(-.25)
-        lookdev_refs.parm("ty").set(.047)
-        lookdev_refs.parm("tx").set(-.072)
-        for parm_name in ["tx", "ty", "tz", "rx", "ry", "rz", "sx", "sy", "sz"]: 
-            lookdev_refs.parm(parm_name).lock(True)
-    else:
-        lookdev_refs = hou.node("/obj").createNode("geo", "lookdev_refs")
+    with profile_phase("refkit"):
+        if values["add_refkit"]:
+            lookdev_refs = create_lookdev_reference_kit(obj, values)
+            place_reference_kit(lookdev_refs, cam)
+        else:
+            lookdev_refs = hou.node("/obj").createNode("geo", "lookdev_refs")
         
         
    #create mantra rop and add objects     
-    ropnet = obj.createNode("ropnet", "lookdev_ropnet")
-    mantra = ropnet.createNode("ifd", "lookdev_mantra")
-    mantra.parm("camera").set(cam.path())
-    mantra.parm("vobject").set("")
-    mantra.parm("forceobject").set(lookdev_refs.path() + " " + sweep.path() + " " + object_path)
-    mantra.parm("alights").set("")
-    mantra.parm("forcelights").set(env.path())
-    hou.playbar.setFrameRange(start_frame, start_frame + 200)
-    hou.playbar.setPlaybackRange(start_frame, start_frame + 200)
-    mantra.parm("trange").set(1)
-    mantra.parm("f1").set(start_frame)
-    mantra.parm("f2").set(start_frame + 200)
+    with profile_phase("rop"):
+        ropnet = obj.createNode("ropnet", "lookdev_ropnet")
+        mantra = ropnet.createNode("ifd", "lookdev_mantra")
+        mantra.parm("camera").set(cam.path())
+        mantra.parm("vobject").set("")
+        mantra.parm("forceobject").set(get_force_objects(lookdev_refs, sweep, object_path))
+        mantra.parm("alights").set("")
+        mantra.parm("forcelights").set(env.path())
+        mantra.parm("vm_picture").set(get_asset_output(model_node.name()))
+        set_frame_range(mantra, values)
     
 
     
     #put nodes into a new subnet
-    nodes_to_move = [cam, lookdev_refs, sweep, env, lookat, sweep_null, cam_null, hdri_null]
-    subnet = obj.createNode("subnet", "lookdev_rig")
-    hou.moveNodesTo(nodes_to_move, subnet)
-    subnet.setColor(hou.Color((1, .7, .7)))
-    subnet.layoutChildren()
+    with profile_phase("subnet"):
+        nodes_to_move = [cam, lookdev_refs, sweep, env, lookat, sweep_null, cam_null, hdri_null]
+        subnet = obj.createNode("subnet", "lookdev_rig")
+        hou.moveNodesTo(nodes_to_move, subnet)
+        subnet.setColor(hou.Color((1, .7, .7)))
+        store_rig_state(subnet, values, model_node, center, size, cam_distance)
     
     
     #call function to add parameters to control null
-    add_parameters_to_control(rig, values)
+    with profile_phase("parameters"):
+        add_parameters_to_control(rig, values, cam_distance, subnet)
+
+    #light proxy to scrub the turntable with, last since it edits the model's own network
+    with profile_phase("proxy"):
+        update_display_proxy(model_node, values)
     
-    #create a network box for the obj level lookdev rig nodes
-    network_box = obj.createNetworkBox()
-    nodes_to_group = [subnet, rig, ropnet]
-    obj.layoutChildren(items = nodes_to_group) 
-    for node in nodes_to_group: 
-        network_box.addItem(node) 
-    network_box.fitAroundContents() 
+    #create a network box for the obj level lookdev rig nodes (laid out when the transaction ends)
+    defer(subnet.layoutChildren)
+    defer(group_in_network_box, obj, (subnet, rig, ropnet))
     
     #layout ropnet nodes
-    ropnet.layoutChildren()
+    defer(ropnet.layoutChildren)
+    return subnet
+
+
+### reconcile an existing rig with new settings, only touching what changed (one transaction, see rig_transaction)
+def update_lookdev_rig(subnet, values, model_node):
+    with rig_transaction("Update Lookdev Rig", [model_node]):
+        return update_lookdev_rig_nodes(subnet, resolve_settings(values), model_node)
+
+### apply the settings that changed to an existing rig's nodes (see update_lookdev_rig)
+def update_lookdev_rig_nodes(subnet, values, model_node):
+    old = json.loads(subnet.userData("lookdev_settings") or "{}")
+    old_framing = json.loads(subnet.userData("lookdev_framing") or "{}")
+    def changed(*keys):
+        return any(old.get(key) != values.get(key) for key in keys)
+
+    cam = subnet.node("lookdev_cam")
+    with profile_phase("framing"):
+        center, size, cam_distance = compute_framing(model_node, values, cam)
+    model_changed = subnet.userData("lookdev_model") != model_node.path()
+    reframed = framing_changed(old_framing, center, size, cam_distance)
+
+    rig = hou.node("/obj/lookdev_rig_control")
+    sweep_null = subnet.node("sweep_animation")
+    env = subnet.node("lookdev_envlight")
+    sweep = subnet.node("lookdev_sweep")
+    lookdev_refs = subnet.node("lookdev_refs")
+    mantra = hou.node("/obj/lookdev_ropnet/lookdev_mantra")
+    start_frame = values["start_frame"]
+    frame_count = values.get("frame_count", DEFAULT_FRAME_COUNT)
+    procedural = values.get("procedural_orbit", False)
+    mode_changed = changed("procedural_orbit")
+
+    #follow the model
+    if reframed:
+        center_parms = dict(zip(("tx", "ty", "tz"), center))
+        set_locked_parms(subnet.node("lookat_target"), center_parms)
+
+    #orbit keys or orbit parms
+    if mode_changed and not procedural:
+        remove_orbit_parameters(rig)
+    if procedural:
+        if mode_changed:
+            add_orbit_parameters(rig, values, cam_distance, subnet)
+        else:
+            if changed("start_frame"):
+                rig.parm("orbit_start").set(start_frame)
+            if changed("frame_count"):
+                rig.parm("orbit_frames").set(frame_count)
+            if changed("rotation_offset"):
+                rig.parm("orbit_angle").set(values["rotation_offset"])
+            if reframed:
+                rig.parm("orbit_radius").set(cam_distance)
+    else:
+        with profile_phase("keyframes"):
+            if mode_changed or reframed or changed("rotation_offset", "start_frame", "frame_count"):
+                update_camera_animation(cam, center, cam_distance, values["rotation_offset"], start_frame, frame_count)
+                update_sweep_animation(sweep_null, center, cam_distance, values["rotation_offset"], start_frame, frame_count)
+            if mode_changed or changed("rotation_offset", "start_frame", "frame_count"):
+                update_envlight_animation(env, values["rotation_offset"], values["hdri_rotation_offset"], start_frame, frame_count)
+
+    #hdri
+    if changed("hdri_path"):
+        with profile_phase("hdri"):
+            env.parm("env_map").set(get_env_map(values["hdri_path"]))
+    if changed("hdri_rotation_offset"):
+        rig.parm("hdri_rotation_offset").set(values["hdri_rotation_offset"])
+
+    #sweep geo
+    with profile_phase("sweep"):
+        if values["sweep_enabled"]:
+            if not old.get("sweep_enabled") or not sweep.children():
+                create_sweep(size, center, cam_distance, sweep_geo=sweep)
+                place_sweep(sweep, sweep_null, center, cam_distance)
+            elif reframed:
+                set_sweep_dimensions(sweep, size, center, cam_distance)
+                place_sweep(sweep, sweep_null, center, cam_distance)
+        elif old.get("sweep_enabled"):
+            for child in sweep.children():
+                child.destroy()
+
+    #lookdev ref kit
+    with profile_phase("refkit"):
+        if values["add_refkit"]:
+            if not old.get("add_refkit") or not lookdev_refs.children():
+                create_lookdev_reference_kit(subnet, values, refs_geo=lookdev_refs)
+                place_reference_kit(lookdev_refs, cam)
+            elif changed("macbeth_path"):
+                get_reference_kit_materials(values["macbeth_path"])
+        elif old.get("add_refkit"):
+            for child in lookdev_refs.children():
+                child.destroy()
+
+    #frame range and rendered objects
+    if mode_changed or changed("start_frame", "frame_count"):
+        set_frame_range(mantra, values)
+    if model_changed:
+        mantra.parm("forceobject").set(get_force_objects(lookdev_refs, sweep, model_node.path()))
+        #follow the model unless the output was changed by hand
+        old_name = (subnet.userData("lookdev_model") or "").rsplit("/", 1)[-1]
+        if mantra.parm("vm_picture").unexpandedString() == get_asset_output(old_name):
+            mantra.parm("vm_picture").set(get_asset_output(model_node.name()))
+
+    #viewport proxy, refreshed when the model changed since the last build (a cache hit otherwise)
+    with profile_phase("proxy"):
+        old_model = hou.node(subnet.userData("lookdev_model")) if model_changed and subnet.userData("lookdev_model") else None
+        if old_model is not None and old_model.type().name() == "geo":
+            remove_display_proxy(old_model)
+        update_display_proxy(model_node, values)
+
+    store_rig_state(subnet, values, model_node, center, size, cam_distance)
+    return subnet
+
+
+### build a new rig, or update /obj/lookdev_rig in place when it exists (no UI, usable from hython)
+def build_or_update_lookdev_rig(values, model_node):
+    existing_rig = hou.node("/obj/lookdev_rig")
+    if existing_rig is None:
+        return build_lookdev_rig(values, model_node)
+    if not existing_rig.userData("lookdev_settings"):
+        raise ValueError("/obj/lookdev_rig was built by an older version of this script. Delete it to build a new rig.")
+    return update_lookdev_rig(existing_rig, values, model_node)
+
+
+### interactive entry point: run the UI, then build a new rig or update the existing one (profiled when LOOKDEV_PROFILE is set)
+def create_lookdev_envlight_rig_with_ui():
+    with profile_build(hou, "create_lookdev_envlight_rig_with_ui", get_profile_path()):
+        run_lookdev_rig_ui()
+
+def run_lookdev_rig_ui():
+    #Qt is only loaded here so the rig functions import quickly in hython and batch processes
+    with profile_phase("ui"):
+        from PySide2 import QtWidgets
+        from lookdev_rig_ui import LookdevRigUI
+
+        #summon UI
+        dialog = LookdevRigUI(hou.ui.mainQtWindow())
+
+    #the time the dialog stays open is not part of the build
+    with profile_wait():
+        accepted = dialog.exec_() == QtWidgets.QDialog.Accepted
+    if not accepted:
+        return
+
+    #get and check values from UI
+    values = dialog.get_values()
+    try:
+        validate_settings(values)
+    except ValueError as error:
+        hou.ui.displayMessage(str(error))
+        return
+
+    # make sure object is selected before running code
+    selected = hou.selectedNodes()
+    if not selected:
+        hou.ui.displayMessage("Please select a geometry node.")
+        return
+    models = [node for node in selected if node.type().name() == "geo"] or selected[:1]
+
+    #update the existing rig in place when there is one, several models (or a rig that had several) get a take each
+    existing_rig = hou.node("/obj/lookdev_rig")
+    try:
+        #the rig and its HDRI wedge are one transaction: a single undo step, rolled back together on failure
+        with profile_phase("build"), rig_transaction("Build Lookdev Rig", models):
+            if len(models) > 1 or (existing_rig is not None and existing_rig.userData("lookdev_assets")):
+                from lookdev_takes import build_multi_asset_rig
+                build_multi_asset_rig(values, models)
+            else:
+                build_or_update_lookdev_rig(values, models[0])
+            #an envlight and a take per HDRI when the wedge lists more maps
+            from lookdev_hdri_wedge import apply_hdri_wedge
+            apply_hdri_wedge(values)
+    except ValueError as error:
+        hou.ui.displayMessage(str(error))
+        return
 
     #navigate back to obj level
     hou.ui.paneTabOfType(hou.paneTabType.NetworkEditor).setPwd(hou.node("/obj"))
 
     # Save settings for next time
-    save_settings(values)
+    with profile_phase("save_settings"):
+        save_settings(values)
 
-create_lookdev_envlight_rig_with_ui()
+if __name__ == "__main__":
+    create_lookdev_envlight_rig_with_ui()
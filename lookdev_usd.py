@@ -0,0 +1,377 @@
+"""
+USD export of the lookdev turntable rig for husk rendering
+
+Mantra regenerates the scene for every frame. This writes what the Mantra
+ROP renders (in the current take) as a layered USD stage instead, so husk
+loads it once and renders the whole turntable with Karma CPU in one process:
+
+    <name>.usda            root: sublayers below, render settings, frame range
+    <name>_animation.usda  world transforms of the camera, dome lights and
+                           geometry as time samples, one per frame of the ROP
+    <name>_scene.usda      camera lens, dome lights (the envlight's map,
+                           .rat or original), preview materials and the
+                           geometry as payloads
+    <name>_refkit.usda     chrome ball, grey ball and Macbeth chart
+
+The model and the sweep are imported through a SOP Import LOP into USD files
+in the disk cache, keyed by their upstream signature (see lookdev_bounds), so
+a stage is exported again in seconds and an unchanged model is not converted
+twice. Principled shaders (the sweep's, the ref kit's and an object level
+material on the model) become UsdPreviewSurface materials; SOP level material
+assignments on the model are not translated. The stage is written next to the
+ROP's images, in a usd folder.
+
+    import lookdev_usd
+    lookdev_usd.render_usd_turntable("/obj/lookdev_ropnet/lookdev_mantra")
+"""
+
+import os
+import re
+import subprocess
+
+import hou
+
+from pxr import Gf, Sdf, Tf, Usd, UsdGeom, UsdLux, UsdRender, UsdShade
+
+from lookdev_bounds import get_model_signature
+from lookdev_cache import DiskCache, cache_key
+from lookdev_hdri import get_houdini_tool
+from lookdev_render_plan import build_plan, get_output_path, get_render_nodes, get_rop_frames, link_output, plan_rop
+from lookdev_takes import ROP_PATH, current_take
+from lookdev_turntable_rig import REFKIT_CHART_SIZE, REFKIT_SCALE, REFKIT_SPACING, get_cache_root
+
+
+# size limit of the converted geometry cache, bump the version when the conversion changes
+USD_CACHE_MAX_BYTES = 8 * 1024 * 1024 * 1024
+USD_BAKE_VERSION = 1
+
+# prim the SOP Import LOP puts the geometry under, payloads point at it
+USD_GEOMETRY_PRIM = "/geometry"
+
+# Karma CPU, the husk render delegate
+HUSK_RENDERER = "BRAY_HdKarma"
+RENDER_SETTINGS_PATH = "/Render/rendersettings"
+
+# rig objects built here instead of converted
+SWEEP_NAME = "lookdev_sweep"
+REFS_NAME = "lookdev_refs"
+
+# principled shaders of the shared ref kit in /mat (see lookdev_turntable_rig.get_reference_kit_materials)
+REFKIT_SHADERS = (("chrome", "lookdev_chrome_shader"), ("grey", "lookdev_grey_shader"),
+                  ("macbeth", "lookdev_macbeth_shader"))
+
+
+### empty stage writing to path, clearing the layer of an earlier export when it is still open
+def create_stage(path):
+    layer = Sdf.Layer.Find(path)
+    if layer is None:
+        return Usd.Stage.CreateNew(path)
+    layer.Clear()
+    return Usd.Stage.Open(layer)
+
+
+### valid prim name from a node name
+def get_prim_name(node):
+    return Tf.MakeValidIdentifier(node.name())
+
+
+### convert the render SOP of a geo object into a USD file in the disk cache, or reuse the file of an unchanged one
+### (the LOPs are created in the root take, the SOP is cooked in the current one)
+def bake_usd_geometry(node, cache_root):
+    sop = node.renderNode()
+    cache = DiskCache(cache_root, "usd_geometry", USD_CACHE_MAX_BYTES)
+    key = cache_key("usd_geometry", USD_BAKE_VERSION, get_model_signature(node, sop))
+    path = cache.get(key, ".usdc")
+    if path is not None:
+        return path
+
+    temp_path = cache.temp_path(key, ".usdc")
+    with current_take(hou.takes.rootTake()):
+        lopnet = hou.node("/obj").createNode("lopnet", "lookdev_usd_bake")
+        sop_import = lopnet.createNode("sopimport", "geometry")
+        sop_import.parm("soppath").set(sop.path())
+        sop_import.parm("pathprefix").set(USD_GEOMETRY_PRIM)
+        usd_rop = lopnet.createNode("usd_rop", "write")
+        usd_rop.setInput(0, sop_import)
+        usd_rop.parm("lopoutput").set(temp_path)
+    try:
+        usd_rop.render()
+    finally:
+        lopnet.destroy()
+    return cache.commit(temp_path, key, ".usdc")
+
+
+### color, roughness, metallic and texture of a principled shader (None for other shaders)
+def get_principled_look(shader):
+    if shader is None or shader.type().name().split("::")[0] != "principledshader":
+        return None
+    texture = shader.evalParm("basecolor_texture") if shader.evalParm("basecolor_useTexture") else ""
+    return {"color": shader.evalParmTuple("basecolor"), "roughness": shader.evalParm("rough"),
+            "metallic": shader.evalParm("metallic"), "texture": texture}
+
+
+### UsdPreviewSurface material of a look (see get_principled_look), textures read the st primvar
+def define_preview_material(stage, path, look):
+    material = UsdShade.Material.Define(stage, path)
+    surface = UsdShade.Shader.Define(stage, path + "/surface")
+    surface.CreateIdAttr("UsdPreviewSurface")
+    surface.CreateInput("roughness", Sdf.ValueTypeNames.Float).Set(look["roughness"])
+    surface.CreateInput("metallic", Sdf.ValueTypeNames.Float).Set(look["metallic"])
+    diffuse = surface.CreateInput("diffuseColor", Sdf.ValueTypeNames.Color3f)
+    if look["texture"]:
+        reader = UsdShade.Shader.Define(stage, path + "/st")
+        reader.CreateIdAttr("UsdPrimvarReader_float2")
+        reader.CreateInput("varname", Sdf.ValueTypeNames.Token).Set("st")
+        texture = UsdShade.Shader.Define(stage, path + "/texture")
+        texture.CreateIdAttr("UsdUVTexture")
+        texture.CreateInput("file", Sdf.ValueTypeNames.Asset).Set(Sdf.AssetPath(look["texture"]))
+        texture.CreateInput("sourceColorSpace", Sdf.ValueTypeNames.Token).Set("sRGB")
+        texture.CreateInput("scale", Sdf.ValueTypeNames.Float4).Set(Gf.Vec4f(tuple(look["color"]) + (1.0,)))
+        texture.CreateInput("st", Sdf.ValueTypeNames.Float2).ConnectToSource(reader.ConnectableAPI(), "result")
+        diffuse.ConnectToSource(texture.ConnectableAPI(), "rgb")
+    else:
+        diffuse.Set(Gf.Vec3f(*look["color"]))
+    material.CreateSurfaceOutput().ConnectToSource(surface.ConnectableAPI(), "surface")
+    return material
+
+
+### bind a material to a prim and everything under it
+def bind_material(prim, material):
+    UsdShade.MaterialBindingAPI.Apply(prim).Bind(material)
+
+
+### ref kit layer: the chart and balls of build_reference_kit_sops as USD prims, with the looks of the /mat shaders
+### (the scale is on /refkit/kit, the payload's /refkit gets the animated transform in the stronger animation layer)
+def write_refkit_layer(path):
+    stage = create_stage(path)
+    root = UsdGeom.Xform.Define(stage, "/refkit")
+    stage.SetDefaultPrim(root.GetPrim())
+    kit = UsdGeom.Xform.Define(stage, "/refkit/kit")
+    kit.AddScaleOp().Set(Gf.Vec3f(REFKIT_SCALE, REFKIT_SCALE, REFKIT_SCALE))
+
+    mat = hou.node("/mat")
+    materials = {}
+    for name, shader_name in REFKIT_SHADERS:
+        look = get_principled_look(mat.node(shader_name) if mat is not None else None)
+        if look is not None:
+            materials[name] = define_preview_material(stage, "/refkit/materials/" + name, look)
+
+    #the chart stands upright facing +z, uvs span its bounds like the orthographic uv projection
+    half_x, half_y = REFKIT_CHART_SIZE[0] / 2.0, REFKIT_CHART_SIZE[1] / 2.0
+    chart = UsdGeom.Mesh.Define(stage, "/refkit/kit/macbeth_chart")
+    chart.CreatePointsAttr([(-half_x, -half_y, 0), (half_x, -half_y, 0), (half_x, half_y, 0), (-half_x, half_y, 0)])
+    chart.CreateFaceVertexCountsAttr([4])
+    chart.CreateFaceVertexIndicesAttr([0, 1, 2, 3])
+    chart.CreateExtentAttr([(-half_x, -half_y, 0), (half_x, half_y, 0)])
+    chart.CreateSubdivisionSchemeAttr(UsdGeom.Tokens.none)
+    st = UsdGeom.PrimvarsAPI(chart).CreatePrimvar("st", Sdf.ValueTypeNames.TexCoord2fArray, UsdGeom.Tokens.vertex)
+    st.Set([(0, 0), (1, 0), (1, 1), (0, 1)])
+
+    balls = [("grey_ball", REFKIT_SPACING, "grey"), ("chrome_ball", -REFKIT_SPACING, "chrome")]
+    parts = [(chart.GetPrim(), "macbeth")]
+    for prim_name, offset, material_name in balls:
+        ball = UsdGeom.Sphere.Define(stage, "/refkit/kit/" + prim_name)
+        ball.AddTranslateOp().Set(Gf.Vec3d(offset, 0, 0))
+        parts.append((ball.GetPrim(), material_name))
+    for prim, material_name in parts:
+        if material_name in materials:
+            bind_material(prim, materials[material_name])
+    stage.GetRootLayer().Save()
+    return path
+
+
+### world transforms of a node at frames, a single one when it does not move
+def sample_transforms(node, frames):
+    matrices = [Gf.Matrix4d(node.worldTransformAtTime(hou.frameToTime(frame)).asTupleOfTuples()) for frame in frames]
+    if all(matrix == matrices[0] for matrix in matrices):
+        return matrices[:1]
+    return matrices
+
+
+### author the world transforms of a node on prim_path of the animation stage
+def write_transform(stage, prim_path, node, frames):
+    op = UsdGeom.Xformable(stage.OverridePrim(prim_path)).AddTransformOp()
+    matrices = sample_transforms(node, frames)
+    if len(matrices) == 1:
+        op.Set(matrices[0])
+        return
+    for frame, matrix in zip(frames, matrices):
+        op.Set(matrix, Usd.TimeCode(frame))
+
+
+### camera prim with the lens of a Houdini camera (the world transform goes in the animation layer)
+def define_camera(stage, prim_path, camera):
+    usd_camera = UsdGeom.Camera.Define(stage, prim_path)
+    aperture = camera.evalParm("aperture")
+    usd_camera.CreateFocalLengthAttr(camera.evalParm("focal"))
+    usd_camera.CreateHorizontalApertureAttr(aperture)
+    usd_camera.CreateVerticalApertureAttr(
+        aperture * camera.evalParm("resy") / float(camera.evalParm("resx") * camera.evalParm("aspect")))
+    usd_camera.CreateClippingRangeAttr(Gf.Vec2f(camera.evalParm("near"), camera.evalParm("far")))
+    return usd_camera
+
+
+### dome light prim of an envlight, None for a light that is off
+def define_dome_light(stage, prim_path, light):
+    if light.type().name() != "envlight":
+        raise ValueError("%s is not an environment light, only envlights can be exported to USD" % light.path())
+    if not light.evalParm("light_enable"):
+        return None
+    dome = UsdLux.DomeLight.Define(stage, prim_path)
+    dome.CreateTextureFileAttr(Sdf.AssetPath(light.evalParm("env_map")))
+    dome.CreateTextureFormatAttr(UsdLux.Tokens.latlong)
+    dome.CreateIntensityAttr(light.evalParm("light_intensity"))
+    if light.parm("light_exposure") is not None:
+        dome.CreateExposureAttr(light.evalParm("light_exposure"))
+    dome.CreateColorAttr(Gf.Vec3f(*light.evalParmTuple("light_color")))
+    return dome
+
+
+### material of a rendered object: the sweep's grey shader or an object level principled shader
+def get_object_look(node):
+    if node.name() == SWEEP_NAME:
+        return get_principled_look(node.node("matnet/grey_shader"))
+    material_path = node.evalParm("shop_materialpath") if node.parm("shop_materialpath") is not None else ""
+    return get_principled_look(hou.node(material_path) if material_path else None)
+
+
+### layer with the camera, lights, materials and geometry payloads of a ROP, returns {prim path: node} of what moves
+def write_scene_layer(path, camera, objects, lights, refkit_file):
+    stage = create_stage(path)
+    stage.SetDefaultPrim(UsdGeom.Xform.Define(stage, "/lookdev").GetPrim())
+    moving = {"/lookdev/camera": camera}
+    define_camera(stage, "/lookdev/camera", camera)
+
+    for light in lights:
+        prim_path = "/lookdev/lights/" + get_prim_name(light)
+        if define_dome_light(stage, prim_path, light) is not None:
+            moving[prim_path] = light
+
+    cache_root = get_cache_root()
+    for node in objects:
+        if node.renderNode() is None:
+            continue  #a disabled sweep or ref kit
+        prim_path = "/lookdev/geometry/" + get_prim_name(node)
+        prim = UsdGeom.Xform.Define(stage, prim_path).GetPrim()
+        if node.name() == REFS_NAME:
+            prim.GetPayloads().AddPayload(Sdf.Payload("./" + os.path.basename(refkit_file)))
+        else:
+            prim.GetPayloads().AddPayload(Sdf.Payload(bake_usd_geometry(node, cache_root), USD_GEOMETRY_PRIM))
+            look = get_object_look(node)
+            if look is not None:
+                bind_material(prim, define_preview_material(stage, "/lookdev/materials/" + get_prim_name(node), look))
+        moving[prim_path] = node
+    stage.GetRootLayer().Save()
+    return moving
+
+
+### layer with the world transforms of the moving prims, one time sample per frame
+def write_animation_layer(path, moving, frames):
+    stage = create_stage(path)
+    for prim_path, node in sorted(moving.items()):
+        write_transform(stage, prim_path, node, frames)
+    stage.GetRootLayer().Save()
+
+
+### root layer: the other layers, the frame range and Karma render settings writing the ROP's images
+def write_root_layer(path, sublayers, rop, camera, frames):
+    stage = create_stage(path)
+    stage.GetRootLayer().subLayerPaths = ["./" + os.path.basename(sublayer) for sublayer in sublayers]
+    stage.SetDefaultPrim(stage.OverridePrim("/lookdev"))
+    stage.SetStartTimeCode(frames[0])
+    stage.SetEndTimeCode(frames[-1])
+    stage.SetFramesPerSecond(hou.fps())
+    stage.SetTimeCodesPerSecond(hou.fps())
+    UsdGeom.SetStageUpAxis(stage, UsdGeom.Tokens.y)
+
+    settings = UsdRender.Settings.Define(stage, RENDER_SETTINGS_PATH)
+    settings.CreateCameraRel().SetTargets([Sdf.Path("/lookdev/camera")])
+    settings.CreateResolutionAttr(Gf.Vec2i(camera.evalParm("resx"), camera.evalParm("resy")))
+    settings.CreatePixelAspectRatioAttr(camera.evalParm("aspect"))
+    samples_x, samples_y = rop.evalParmTuple("vm_samples")
+    settings.GetPrim().CreateAttribute("karma:global:pathtracedsamples", Sdf.ValueTypeNames.Int).Set(
+        int(samples_x * samples_y))
+
+    color = UsdRender.Var.Define(stage, "/Render/Products/Vars/C")
+    color.CreateSourceNameAttr("C")
+    color.CreateSourceTypeAttr(UsdRender.Tokens.raw)
+    color.CreateDataTypeAttr("color4f")
+    product = UsdRender.Product.Define(stage, "/Render/Products/beauty")
+    product.CreateOrderedVarsRel().SetTargets([color.GetPath()])
+    product_name = product.CreateProductNameAttr()
+    for frame in frames:
+        product_name.Set(get_output_path(rop, frame), Usd.TimeCode(frame))
+    settings.CreateProductsRel().SetTargets([product.GetPath()])
+    stage.GetRootLayer().Save()
+
+
+### folder of the stage next to the ROP's images
+def get_usd_dir(rop, frame):
+    return os.path.join(os.path.dirname(get_output_path(rop, frame)), "usd")
+
+
+### write the stage of what the ROP renders in the current take, returns the root layer path
+def export_usd(rop=ROP_PATH, usd_dir=None):
+    if isinstance(rop, str):
+        rop = hou.node(rop)
+    frames = get_rop_frames(rop)
+    camera, objects, lights = get_render_nodes(rop)
+    if usd_dir is None:
+        usd_dir = get_usd_dir(rop, frames[0])
+    if not os.path.isdir(usd_dir):
+        os.makedirs(usd_dir)
+    name = re.sub(r"[^A-Za-z0-9_]", "_", os.path.basename(get_output_path(rop, frames[0])).split(".")[0])
+    paths = dict((layer, os.path.join(usd_dir, "%s_%s.usda" % (name, layer))) for layer in ("animation", "scene", "refkit"))
+
+    if any(node.name() == REFS_NAME and node.renderNode() is not None for node in objects):
+        write_refkit_layer(paths["refkit"])
+    moving = write_scene_layer(paths["scene"], camera, objects, lights, paths["refkit"])
+    write_animation_layer(paths["animation"], moving, frames)
+    root_path = os.path.join(usd_dir, name + ".usda")
+    write_root_layer(root_path, [paths["animation"], paths["scene"]], rop, camera, frames)
+    return root_path
+
+
+### husk command rendering frames of a stage in one process
+def get_husk_command(stage_path, frames, threads=None, verbose=False):
+    command = [get_houdini_tool("husk"), "--renderer", HUSK_RENDERER, "--settings", RENDER_SETTINGS_PATH]
+    step = frames[1] - frames[0] if len(frames) > 1 else 1
+    if frames == list(range(frames[0], frames[-1] + 1, step)):
+        command.extend(["--frame", str(frames[0]), "--frame-count", str(len(frames)), "--frame-inc", str(step)])
+    else:
+        command.extend(["--frame-list", " ".join(str(frame) for frame in frames)])
+    if threads:
+        command.extend(["--threads", str(threads)])
+    if verbose:
+        command.extend(["--verbose", "2"])
+    command.append(stage_path)
+    return command
+
+
+### export the ROP's stage and render its distinct poses with husk in one process, then link the repeated
+### frames (see lookdev_render_plan), returns the plan
+def render_usd_turntable(rop=ROP_PATH, dedup=True, threads=None, verbose=False):
+    if isinstance(rop, str):
+        rop = hou.node(rop)
+    if dedup:
+        plan = plan_rop(rop)
+    else:
+        frames = get_rop_frames(rop)
+        plan = build_plan(frames, frames)
+    stage_path = export_usd(rop)
+    for image_dir in set(os.path.dirname(get_output_path(rop, frame)) for frame in plan["unique"]):
+        if not os.path.isdir(image_dir):
+            os.makedirs(image_dir)
+
+    command = get_husk_command(stage_path, plan["unique"], threads, verbose)
+    if verbose:
+        print(" ".join(command))
+    if subprocess.call(command) != 0:
+        raise RuntimeError("husk failed to render %s" % stage_path)
+
+    for frame, source_frame in sorted(plan["duplicates"].items()):
+        source = get_output_path(rop, source_frame)
+        if os.path.isfile(source):
+            link_output(source, get_output_path(rop, frame))
+    plan["stage"] = stage_path
+    return plan
@@ -0,0 +1,39 @@
+"""
+Shared setup of the lookdev tests
+
+The lookdev modules import hou at the top, so the tests run against the
+recording stand-in of benchmarks/fake_hou.py. Run them from the repo root:
+
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+
+import pytest
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "benchmarks")]
+
+import fake_hou
+
+fake_hou.install()
+
+
+### a fresh fake scene per test, with the user pref dir in the test's temp folder
+@pytest.fixture(autouse=True)
+def scene(tmp_path):
+    return fake_hou.reset(str(tmp_path))
+
+
+### default rig settings with a small valid HDRI, and the disk cache in the test's temp folder
+@pytest.fixture
+def rig_settings(tmp_path, monkeypatch):
+    from rig_benchmark import write_exr
+    import lookdev_turntable_rig
+
+    monkeypatch.setenv("LOOKDEV_CACHE_DIR", str(tmp_path / "cache"))
+    hdri_path = str(tmp_path / "studio.exr")
+    write_exr(hdri_path)
+    return lookdev_turntable_rig.resolve_settings({"hdri_path": hdri_path})
@@ -0,0 +1,40 @@
+"""
+Batch manifests: asset names become folders, takes and cache entries, so they must not collide
+"""
+
+import json
+
+import pytest
+
+from lookdev_batch import load_manifest
+from lookdev_turntable_rig import DEFAULT_SETTINGS
+
+
+def write_json(tmp_path, assets):
+    path = tmp_path / "assets.json"
+    path.write_text(json.dumps({"defaults": {"hdri_path": "/hdri/studio.exr"}, "assets": assets}))
+    return str(path)
+
+
+def test_names_are_sanitized(tmp_path):
+    assets = load_manifest(write_json(tmp_path, [{"name": "chair-a", "geo_path": "/assets/chair.abc"},
+                                                 {"geo_path": "/assets/table.v2.abc"}]), DEFAULT_SETTINGS)
+    assert [asset["name"] for asset in assets] == ["chair_a", "table"]
+    assert assets[1]["hdri_path"] == "/hdri/studio.exr"
+
+
+@pytest.mark.parametrize("assets", [
+    [{"name": "chair-a"}, {"name": "chair_a"}],
+    [{"name": "Chair"}, {"name": "chair"}],
+    [{"geo_path": "/a/model.abc"}, {"geo_path": "/b/model.abc"}],
+])
+def test_colliding_names_are_rejected(tmp_path, assets):
+    with pytest.raises(ValueError, match="distinct names"):
+        load_manifest(write_json(tmp_path, assets), DEFAULT_SETTINGS)
+
+
+def test_colliding_names_in_csv(tmp_path):
+    path = tmp_path / "assets.csv"
+    path.write_text("name,geo_path\nchair a,/a/chair.abc\nchair.a,/b/chair.abc\n")
+    with pytest.raises(ValueError, match="Assets 1 and 2"):
+        load_manifest(str(path), DEFAULT_SETTINGS)
@@ -0,0 +1,43 @@
+"""
+Tight framing cache: a fit to the bounding box corners of an uncooked model is not kept once it has cooked
+"""
+
+import numpy as np
+
+import fake_hou
+
+from lookdev_bounds import get_model_framing
+from lookdev_framing import framing_angles
+
+
+TAN_HALF_H = 0.4
+TAN_HALF_V = 0.3
+
+
+### points on a unit sphere above the origin, well inside their bounding box corners
+def sphere_points(count=2000, seed=0):
+    points = np.random.RandomState(seed).standard_normal((count, 3))
+    points /= np.linalg.norm(points, axis=1)[:, None]
+    return (points + (0, 1, 0)).astype(np.float32)
+
+
+def test_corner_fit_is_not_cached(tmp_path):
+    model = fake_hou.create_model("/obj", "asset", sphere_points())
+    sop = model.renderNode()
+    cache_root = str(tmp_path / "cache")
+    angles = framing_angles(0.0)
+
+    #the fit to the points, solved and then read back from the cache
+    get_model_framing(model, cache_root, angles, TAN_HALF_H, TAN_HALF_V)
+    cached_points = get_model_framing(model, cache_root, angles, TAN_HALF_H, TAN_HALF_V)[2]
+
+    #in a fresh cache an uncooked model is framed by its box corners, and that fit is solved again every time
+    cache_root = str(tmp_path / "other_cache")
+    sop._needs_to_cook = True
+    box = get_model_framing(model, cache_root, angles, TAN_HALF_H, TAN_HALF_V)[2]
+    assert get_model_framing(model, cache_root, angles, TAN_HALF_H, TAN_HALF_V)[2] == box
+
+    sop._needs_to_cook = False
+    tight = get_model_framing(model, cache_root, angles, TAN_HALF_H, TAN_HALF_V)[2]
+    assert tight < box
+    assert tight == cached_points
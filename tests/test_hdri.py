@@ -0,0 +1,104 @@
+"""
+EXR header checks of lookdev_hdri on files cut short or with broken attributes
+"""
+
+import struct
+
+import pytest
+
+from lookdev_hdri import EXR_MAGIC, HdriError, check_hdri, read_exr_header
+
+
+WIDTH = 8
+HEIGHT = 4
+
+
+### one header attribute: name, type, size, value
+def attribute(name, type_name, value):
+    return name.encode() + b"\0" + type_name.encode() + b"\0" + struct.pack("<i", len(value)) + value
+
+
+### channel list of half channels
+def chlist(names):
+    return b"".join(name.encode() + b"\0" + struct.pack("<iB3xii", 1, 0, 1, 1) for name in names) + b"\0"
+
+
+### small uncompressed scanline EXR, returns its bytes and the offset of every chunk
+def exr_bytes(channels=("B", "G", "R"), attributes=None):
+    window = struct.pack("<iiii", 0, 0, WIDTH - 1, HEIGHT - 1)
+    if attributes is None:
+        attributes = [attribute("channels", "chlist", chlist(channels)),
+                      attribute("compression", "compression", struct.pack("<B", 0)),
+                      attribute("dataWindow", "box2i", window),
+                      attribute("displayWindow", "box2i", window),
+                      attribute("lineOrder", "lineOrder", struct.pack("<B", 0)),
+                      attribute("pixelAspectRatio", "float", struct.pack("<f", 1.0))]
+    header = EXR_MAGIC + struct.pack("<i", 2) + b"".join(attributes) + b"\0"
+
+    #one scanline per chunk: y, data size, half pixels of every channel
+    line_size = WIDTH * len(channels) * 2
+    first_chunk = len(header) + 8 * HEIGHT
+    offsets = [first_chunk + y * (8 + line_size) for y in range(HEIGHT)]
+    chunks = b"".join(struct.pack("<ii", y, line_size) + b"\0" * line_size for y in range(HEIGHT))
+    return header + struct.pack("<%dQ" % HEIGHT, *offsets) + chunks, offsets
+
+
+def write(tmp_path, data, name="map.exr"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_valid_header(tmp_path):
+    data, _ = exr_bytes()
+    header = check_hdri(write(tmp_path, data))
+    assert (header["width"], header["height"]) == (WIDTH, HEIGHT)
+    assert header["channels"] == ["B", "G", "R"]
+    assert header["compression"] == "none"
+    assert header["warnings"] == []
+
+
+def test_every_cut_before_the_last_chunk_is_reported(tmp_path):
+    data, offsets = exr_bytes()
+    for size in range(offsets[-1] + 1):
+        path = write(tmp_path, data[:size])
+        with pytest.raises(HdriError):
+            read_exr_header(path)
+
+
+def test_missing_pixels_are_reported_from_the_offset_table(tmp_path):
+    data, offsets = exr_bytes()
+    with pytest.raises(HdriError, match="chunk offsets"):
+        read_exr_header(write(tmp_path, data[:offsets[1]]))
+
+
+def test_not_an_exr(tmp_path):
+    with pytest.raises(HdriError, match="not an OpenEXR"):
+        read_exr_header(write(tmp_path, b"#?RADIANCE\n" + b"\0" * 64))
+
+
+@pytest.mark.parametrize("attributes, message", [
+    ([b"channels\0chlist\0" + struct.pack("<i", -1)], "corrupt header"),
+    ([b"channels\0chlist\0" + struct.pack("<i", 1 << 30)], "corrupt header"),
+    ([b"x" * 300], "unterminated"),
+    ([attribute("channels", "chlist", b"R\0" + b"\1" * 4)], "corrupt channels attribute"),
+    ([attribute("dataWindow", "box2i", b"\0" * 12)], "corrupt dataWindow attribute"),
+])
+def test_corrupt_attributes(tmp_path, attributes, message):
+    data, _ = exr_bytes(attributes=attributes)
+    with pytest.raises(HdriError, match=message):
+        read_exr_header(write(tmp_path, data))
+
+
+def test_corrupt_offset_table(tmp_path):
+    data, offsets = exr_bytes()
+    table_start = offsets[0] - 8 * HEIGHT
+    data = data[:table_start] + struct.pack("<Q", 0) + data[table_start + 8:]
+    with pytest.raises(HdriError, match="chunk offsets"):
+        read_exr_header(write(tmp_path, data))
+
+
+def test_missing_channel(tmp_path):
+    data, _ = exr_bytes(channels=("A", "B", "G"))
+    with pytest.raises(HdriError, match="no R channel"):
+        check_hdri(write(tmp_path, data))
@@ -0,0 +1,45 @@
+"""
+HDRI wedge: rendering every variant take, and building the wedge in the rig's transaction
+"""
+
+import pytest
+
+import fake_hou
+from rig_benchmark import make_points, write_exr
+
+import lookdev_hdri_wedge
+from lookdev_turntable_rig import build_lookdev_rig, rig_transaction
+
+
+### rig with a wedge of two more maps, returns the variant take names
+def build_wedge_rig(tmp_path, settings):
+    wedge = []
+    for name in ("sunset", "overcast"):
+        wedge.append(str(tmp_path / (name + ".exr")))
+        write_exr(wedge[-1])
+    settings = dict(settings, hdri_wedge=wedge)
+    build_lookdev_rig(settings, fake_hou.create_model("/obj", "asset", make_points(1000)))
+    variants = lookdev_hdri_wedge.apply_hdri_wedge(settings)
+    return [take_name for variant in variants for take_name in variant["takes"]]
+
+
+@pytest.mark.parametrize("dedup", (True, False))
+def test_every_variant_take_is_reported(tmp_path, rig_settings, dedup, monkeypatch):
+    take_names = build_wedge_rig(tmp_path, rig_settings)
+    assert len(take_names) == 3
+    monkeypatch.setattr(lookdev_hdri_wedge, "plan_rop", lambda rop: {"frames": [1], "unique": [1], "duplicates": {}})
+    monkeypatch.setattr(lookdev_hdri_wedge, "render_turntable", lambda rop, plan, verbose=False: plan)
+    plans = lookdev_hdri_wedge.render_hdri_wedge(dedup=dedup)
+    assert sorted(plans) == sorted(take_names)
+    assert all((plan is not None) == dedup for plan in plans.values())
+
+
+def test_failed_wedge_rolls_back_the_rig(tmp_path, rig_settings):
+    settings = dict(rig_settings, hdri_wedge=[str(tmp_path / "missing.exr")])
+    model = fake_hou.create_model("/obj", "asset", make_points(1000))
+    with pytest.raises(ValueError):
+        with rig_transaction("Build Lookdev Rig", [model]):
+            build_lookdev_rig(settings, model)
+            lookdev_hdri_wedge.apply_hdri_wedge(settings)
+    assert fake_hou.node("/obj/lookdev_rig") is None
+    assert sorted(child.name() for child in fake_hou.node("/obj").children()) == ["asset"]
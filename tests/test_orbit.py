@@ -0,0 +1,127 @@
+"""
+Orbit keyframing of the rig and the procedural orbit expressions, checked against lookdev_orbit
+"""
+
+import json
+import math
+import posixpath
+
+import numpy as np
+import pytest
+
+import fake_hou
+from rig_benchmark import make_points
+
+from lookdev_orbit import (check_orbit_samples, envlight_keys, orbit_samples, orbit_timing,
+                           reference_orbit_samples, turntable_range)
+from lookdev_turntable_rig import build_lookdev_rig
+
+
+FRAME_COUNT = 48
+
+
+### value of a parm at frame, evaluating its Hscript expression (the subset the rig writes) when it has one
+def evaluate(node, parm_name, frame):
+    parm = node.parm(parm_name)
+    expression = parm.expression()
+    if expression is None:
+        return parm.eval()
+
+    def ch(path):
+        node_path, name = posixpath.split(posixpath.normpath(posixpath.join(node.path(), path)))
+        return evaluate(fake_hou.node(node_path), name, frame)
+
+    namespace = {
+        "ch": ch, "FF": frame, "min": min, "max": max,
+        "clamp": lambda value, low, high: min(max(value, low), high),
+        "if_": lambda condition, true, false: true if condition else false,
+        "sin": lambda degrees: math.sin(math.radians(degrees)),
+        "cos": lambda degrees: math.cos(math.radians(degrees)),
+    }
+    return eval(expression.replace("$FF", "FF").replace("if(", "if_("), namespace)
+
+
+def build_rig(settings, **values):
+    model = fake_hou.create_model("/obj", "asset", make_points(1000))
+    return build_lookdev_rig(dict(settings, **values), model)
+
+
+@pytest.mark.parametrize("frame_count", (2, 3, 48, 100, 400))
+@pytest.mark.parametrize("initial_angle", (0.0, 37.5, -90.0))
+def test_batched_samples_match_the_reference(frame_count, initial_angle):
+    frames, samples = orbit_samples((0.5, 1.0, -2.0), 7.0, initial_angle, 1001, frame_count)
+    assert len(frames) == orbit_timing(frame_count)[0]
+    assert np.allclose(samples, reference_orbit_samples((0.5, 1.0, -2.0), 7.0, initial_angle, 1001, frame_count))
+    assert check_orbit_samples(samples, (0.5, 1.0, -2.0), 7.0, initial_angle, 1001, frame_count=frame_count) < 1e-9
+
+
+def test_check_orbit_samples_reports_a_wrong_key():
+    frames, samples = orbit_samples((0, 0, 0), 5.0, 0.0, 1001)
+    samples[10, 2] += 1e-3
+    with pytest.raises(ValueError, match="differ"):
+        check_orbit_samples(samples, (0, 0, 0), 5.0, 0.0, 1001)
+    with pytest.raises(ValueError, match="shape"):
+        check_orbit_samples(samples[:-1], (0, 0, 0), 5.0, 0.0, 1001)
+
+
+def test_orbit_keys_are_written_once_per_channel(rig_settings):
+    subnet = build_rig(rig_settings, frame_count=FRAME_COUNT, rotation_offset=30.0)
+    framing = json.loads(subnet.userData("lookdev_framing"))
+    #nodes are keyed before they move into the subnet, so writes are matched by node and parm name
+    writes = ["/".join(path.split("/")[-2:]) for operation, path, detail in fake_hou.events if operation == "setKeyframes"]
+    assert not [event for event in fake_hou.events if event[0] == "setKeyframe"]
+
+    key_count = orbit_timing(FRAME_COUNT)[0]
+    for node_name in ("lookdev_cam", "sweep_animation"):
+        node = subnet.node(node_name)
+        for parm_name in ("tx", "ty", "tz"):
+            assert writes.count(node_name + "/" + parm_name) == 1
+            assert len(node.parm(parm_name).keyframes()) == key_count
+    cam = subnet.node("lookdev_cam")
+    keys = np.column_stack([[key.value() for key in cam.parm(name).keyframes()] for name in ("tx", "ty", "tz")])
+    check_orbit_samples(keys, framing["center"], framing["cam_distance"], 30.0, rig_settings["start_frame"],
+                        frame_count=FRAME_COUNT)
+
+    ry = subnet.node("lookdev_envlight").parm("ry")
+    env_frames, env_angles = envlight_keys(30.0, rig_settings["start_frame"], FRAME_COUNT)
+    assert [(key.frame(), key.value()) for key in ry.keyframes()] == list(zip(env_frames, env_angles))
+
+
+def test_procedural_expressions_follow_the_keyed_orbit(rig_settings):
+    subnet = build_rig(rig_settings, frame_count=FRAME_COUNT, rotation_offset=30.0, procedural_orbit=True)
+    cam = subnet.node("lookdev_cam")
+    assert not cam.parm("tx").keyframes()
+    framing = json.loads(subnet.userData("lookdev_framing"))
+    start = rig_settings["start_frame"]
+    frames, samples = orbit_samples(framing["center"], framing["cam_distance"], 30.0, start, FRAME_COUNT)
+    env_frames, env_angles = envlight_keys(30.0, start, FRAME_COUNT)
+    first, last = turntable_range(start, FRAME_COUNT)
+
+    for frame in range(first - 5, last + 5):
+        #the orbit holds its last key, like the keyed camera does
+        index = min(max(frame - start, 0), len(frames) - 1)
+        for node_name in ("lookdev_cam", "sweep_animation"):
+            position = [evaluate(subnet.node(node_name), name, frame) for name in ("tx", "ty", "tz")]
+            assert np.allclose(position, samples[index], atol=1e-9)
+        ry = evaluate(subnet.node("lookdev_envlight"), "ry", frame)
+        assert ry == pytest.approx(np.interp(frame, env_frames, env_angles))
+
+    mantra = fake_hou.node("/obj/lookdev_ropnet/lookdev_mantra")
+    assert (evaluate(mantra, "f1", first), evaluate(mantra, "f2", first)) == (first, last)
+
+
+def test_procedural_pass_length_is_a_parm_edit(rig_settings):
+    subnet = build_rig(rig_settings, frame_count=FRAME_COUNT, procedural_orbit=True)
+    control = fake_hou.node("/obj/lookdev_rig_control")
+    calls = dict(fake_hou.calls)
+    control.parm("orbit_frames").set(200)
+    control.parm("orbit_start").set(1)
+    assert fake_hou.calls["setKeyframes"] == calls.get("setKeyframes", 0)
+
+    framing = json.loads(subnet.userData("lookdev_framing"))
+    frames, samples = orbit_samples(framing["center"], framing["cam_distance"], 0.0, 1, 200)
+    for frame in (1, 50, 137, 200, 201):
+        position = [evaluate(subnet.node("lookdev_cam"), name, frame) for name in ("tx", "ty", "tz")]
+        assert np.allclose(position, samples[frame - 1], atol=1e-9)
+    mantra = fake_hou.node("/obj/lookdev_ropnet/lookdev_mantra")
+    assert evaluate(mantra, "f2", 1) == turntable_range(1, 200)[1]
@@ -0,0 +1,67 @@
+"""
+Coarse to fine order of lookdev_preview for frame counts that are not a power of two
+"""
+
+import pytest
+
+from lookdev_preview import FIRST_STEP, held_frames, pass_ends, progressive_order
+
+
+FRAME_COUNTS = (1, 2, 3, 7, 17, 99, 100, 199, 201)
+
+
+### steps of the passes, coarse to fine, for first_step rounded down to a power of two
+def pass_steps(first_step):
+    step = 1
+    while step * 2 <= max(1, first_step):
+        step *= 2
+    steps = [step]
+    while step > 1:
+        step //= 2
+        steps.append(step)
+    return steps
+
+
+@pytest.mark.parametrize("first_step", (FIRST_STEP, 12, 1, 0))
+@pytest.mark.parametrize("count", FRAME_COUNTS)
+def test_every_frame_once(count, first_step):
+    frames = list(range(1001, 1001 + count))
+    order = progressive_order(frames, first_step)
+    assert sorted(order) == frames
+    assert len(set(order)) == len(order)
+
+
+@pytest.mark.parametrize("first_step", (FIRST_STEP, 12, 1))
+@pytest.mark.parametrize("count", FRAME_COUNTS)
+def test_passes_go_coarse_to_fine(count, first_step):
+    frames = list(range(1001, 1001 + 2 * count, 2))
+    order = progressive_order(frames, first_step)
+    ends = pass_ends(count, first_step)
+    steps = pass_steps(first_step)
+    assert len(ends) == len(steps)
+    assert ends[-1] == count
+    assert ends == sorted(ends)
+    #after each pass the rendered frames are exactly every step-th one
+    for end, step in zip(ends, steps):
+        assert sorted(order[:end]) == frames[::step]
+
+
+@pytest.mark.parametrize("count", FRAME_COUNTS)
+def test_held_frames_after_each_pass(count):
+    frames = list(range(1001, 1001 + count))
+    #the last frame repeats the first pose, like the orbit seam
+    plan = {"frames": frames, "unique": frames[:-1] or frames, "duplicates": {}}
+    if count > 1:
+        plan["duplicates"][frames[-1]] = frames[0]
+    order = progressive_order(plan["unique"])
+    for end in pass_ends(len(plan["unique"])):
+        rendered = set(order[:end])
+        shown = held_frames(plan, rendered)
+        assert len(shown) == count
+        for frame, (source, held) in zip(frames, shown):
+            assert source in rendered
+            expected = plan["duplicates"].get(frame, frame)
+            assert held == (expected not in rendered)
+            if held and source != min(rendered):
+                assert source < frame
+    assert all(not held for _, held in held_frames(plan, set(order)))
@@ -0,0 +1,91 @@
+"""
+Build profiler against the fake hou: per phase call counts, and the hou methods put back afterwards
+"""
+
+import json
+import time
+
+import hou
+import fake_hou
+from rig_benchmark import make_points
+
+import lookdev_turntable_rig
+from lookdev_profile import COUNTED_METHODS, profile_build, profile_phase, profile_wait
+
+
+### the hou methods the profiler wraps, as the classes define them
+def counted_methods():
+    methods = {}
+    for class_names, method_names, prefix in COUNTED_METHODS:
+        for class_name in class_names:
+            cls = getattr(hou, class_name, None)
+            for method_name in method_names:
+                if cls is not None and method_name in cls.__dict__:
+                    methods[(class_name, method_name)] = cls.__dict__[method_name]
+    return methods
+
+
+def test_profiled_build(tmp_path, monkeypatch, rig_settings):
+    monkeypatch.setenv("LOOKDEV_PROFILE", "1")
+    model = fake_hou.create_model("/obj", "asset", make_points(1000))
+    originals = counted_methods()
+    assert ("ParmTuple", "set") in originals
+    report_path = str(tmp_path / "profile.json")
+
+    fake_hou.calls.clear()
+    with profile_build(hou, "test", report_path) as profiler:
+        assert profiler is not None
+        assert counted_methods() != originals
+        lookdev_turntable_rig.build_lookdev_rig(rig_settings, model)
+    assert counted_methods() == originals
+
+    with open(report_path) as f:
+        report = json.load(f)
+    phases = dict((phase["name"], phase) for phase in report["phases"])
+    for name in ("framing", "keyframes", "sweep", "refkit", "rop", "subnet", "parameters"):
+        assert phases[name]["entered"] >= 1
+    #every channel is keyed in the keyframes phases, with one setKeyframes call each
+    assert phases["keyframes"]["calls"].get("setKeyframes") == 7
+    assert "setKeyframes" not in phases["rop"]["calls"]
+    #the totals match what the fake hou saw
+    for counted_name, fake_name in (("createNode", "createNode"), ("set", "parm.set"), ("parmTuple.set", "parmTuple.set"),
+                                    ("setKeyframes", "setKeyframes"), ("setExpression", "setExpression")):
+        assert report["calls"].get(counted_name, 0) == fake_hou.calls[fake_name]
+    assert report["calls"]["parmTuple.set"] > 0
+    assert report["wait_seconds"] == 0
+
+
+def test_methods_restored_after_a_failed_build(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOOKDEV_PROFILE", "1")
+    originals = counted_methods()
+    try:
+        with profile_build(hou, "test", str(tmp_path / "profile.json")):
+            with profile_phase("framing"):
+                hou.node("/obj").createNode("geo", "broken")
+                raise RuntimeError("build failed")
+    except RuntimeError:
+        pass
+    assert counted_methods() == originals
+    with open(str(tmp_path / "profile.json")) as f:
+        report = json.load(f)
+    assert report["phases"][0]["calls"] == {"createNode": 1}
+
+
+def test_wait_is_left_out(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOOKDEV_PROFILE", "1")
+    with profile_build(hou, "test", str(tmp_path / "profile.json")) as profiler:
+        with profile_phase("ui"):
+            with profile_wait():
+                time.sleep(0.2)
+    assert profiler.wait_seconds >= 0.2
+    assert profiler.total_seconds < 0.1
+    assert profiler.phases["ui"]["seconds"] < 0.1
+
+
+def test_off_without_the_variable(tmp_path, monkeypatch):
+    monkeypatch.delenv("LOOKDEV_PROFILE", raising=False)
+    originals = counted_methods()
+    with profile_build(hou, "test", str(tmp_path / "profile.json")) as profiler:
+        assert profiler is None
+        assert counted_methods() == originals
+    assert not (tmp_path / "profile.json").exists()
@@ -0,0 +1,86 @@
+"""
+Render plan of the default turntable: poses repeated across the 360 degree seam are rendered once
+"""
+
+import math
+
+import numpy as np
+
+import hou
+
+from lookdev_orbit import DEFAULT_FRAME_COUNT, envlight_keys, orbit_samples, turntable_range
+from lookdev_render_plan import build_plan, pose_key
+
+
+START_FRAME = 1001
+INITIAL_ANGLE = 30.0
+
+
+### Houdini row-vector transform: rotate about y, then translate
+def transform(ry, translate=(0, 0, 0)):
+    angle = math.radians(ry)
+    matrix = np.identity(4)
+    matrix[0, 0], matrix[0, 2], matrix[2, 0], matrix[2, 2] = math.cos(angle), -math.sin(angle), math.sin(angle), math.cos(angle)
+    matrix[3, :3] = translate
+    return hou.Matrix4(matrix)
+
+
+### object whose world transform is looked up per frame, with none of the camera or light parms
+class PoseNode(object):
+    def __init__(self, path, poses):
+        self._path = path
+        self._poses = poses
+
+    def path(self):
+        return self._path
+
+    def parm(self, name):
+        return None
+
+    def parmTuple(self, name):
+        return None
+
+    def worldTransformAtTime(self, time):
+        return self._poses(int(round(time * hou.fps())) + 1)
+
+
+### camera and sweep on the orbit keys (held after the last key), envlight on its linear keys
+def turntable_nodes(frame_count=DEFAULT_FRAME_COUNT):
+    frames, samples = orbit_samples((0, 1, 0), 10.0, INITIAL_ANGLE, START_FRAME, frame_count)
+    angles = INITIAL_ANGLE + (frames - START_FRAME) / float(frame_count - 1) * 360.0
+
+    def orbit(frame):
+        index = min(int(frame - START_FRAME), len(frames) - 1)
+        return transform(angles[index], samples[index])
+
+    env_frames, env_angles = envlight_keys(INITIAL_ANGLE, START_FRAME, frame_count)
+
+    def envlight(frame):
+        return transform(np.interp(frame, env_frames, env_angles))
+
+    return PoseNode("/obj/cam", orbit), [PoseNode("/obj/sweep", orbit)], [PoseNode("/obj/env", envlight)]
+
+
+def test_build_plan_links_repeats_to_their_first_frame():
+    plan = build_plan([1, 2, 3, 4, 5], ["a", "b", "a", "c", "b"])
+    assert plan["unique"] == [1, 2, 4]
+    assert plan["duplicates"] == {3: 1, 5: 2}
+
+
+def test_orbit_seam_is_rendered_once():
+    start, end = turntable_range(START_FRAME)
+    frames = list(range(start, end + 1))
+    camera, objects, lights = turntable_nodes()
+    plan = build_plan(frames, [pose_key(camera, objects, lights, frame) for frame in frames])
+
+    #the orbit's last frame turns 360 degrees back onto the first (camera, sweep and envlight alike),
+    #and the ROP's last frame holds the end of the hdri pass
+    seam = START_FRAME + DEFAULT_FRAME_COUNT - 1
+    assert plan["duplicates"] == {seam: START_FRAME, end: end - 1}
+    assert sorted(plan["unique"] + list(plan["duplicates"])) == frames
+
+
+def test_neighbouring_poses_stay_distinct():
+    camera, objects, lights = turntable_nodes()
+    keys = set(pose_key(camera, objects, lights, frame) for frame in range(START_FRAME, START_FRAME + 10))
+    assert len(keys) == 10
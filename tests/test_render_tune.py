@@ -0,0 +1,81 @@
+"""
+Preset fitting and budget selection of lookdev_render_tune on synthetic probe timings
+"""
+
+import pytest
+
+from lookdev_render_tune import TUNE_PRESETS, choose_preset, fit_presets, get_pixel_samples
+
+
+FULL_PIXELS = 1920 * 1080
+PROBE_PIXELS = FULL_PIXELS // 16
+
+# probe cost model: seconds = FIXED + PER_RAY * pixel samples * pixels, noise halves with 4x the samples
+FIXED = 2.0
+PER_RAY = 1e-6
+NOISE = 0.08
+
+
+def probe(frame, name, settings):
+    spp = get_pixel_samples(settings)
+    return {"frame": frame, "preset": name, "seconds": FIXED + PER_RAY * spp * PROBE_PIXELS,
+            "noise": NOISE * (get_pixel_samples(TUNE_PRESETS[0][1]) / float(spp)) ** 0.5, "pixels": PROBE_PIXELS}
+
+
+### probes of the cheapest and the best preset at a few frames
+def probes(frames=(1001, 1050, 1100, 1200)):
+    return [probe(frame, name, settings) for frame in frames for name, settings in (TUNE_PRESETS[0], TUNE_PRESETS[-1])]
+
+
+def projected_seconds(settings):
+    return FIXED + PER_RAY * get_pixel_samples(settings) * FULL_PIXELS
+
+
+def test_fit_recovers_the_cost_model():
+    estimates = fit_presets(probes(), FULL_PIXELS)
+    assert [estimate["preset"] for estimate in estimates] == [name for name, _ in TUNE_PRESETS]
+    for estimate, (name, settings) in zip(estimates, TUNE_PRESETS):
+        assert estimate["seconds_per_frame"] == pytest.approx(projected_seconds(settings))
+    noise = [estimate["noise"] for estimate in estimates]
+    assert noise == sorted(noise, reverse=True)
+    assert noise[0] == pytest.approx(NOISE)
+
+
+def test_fit_needs_both_presets_on_one_frame():
+    draft, final = TUNE_PRESETS[0], TUNE_PRESETS[-1]
+    with pytest.raises(ValueError):
+        fit_presets([probe(1001, draft[0], draft[1]), probe(1100, final[0], final[1])], FULL_PIXELS)
+
+
+def test_best_preset_within_budget():
+    estimates = fit_presets(probes(), FULL_PIXELS)
+    target = (projected_seconds(TUNE_PRESETS[2][1]) + projected_seconds(TUNE_PRESETS[3][1])) / 2.0
+    chosen = choose_preset(estimates, target)
+    assert chosen["preset"] == TUNE_PRESETS[2][0]
+    assert chosen["within_budget"]
+
+
+def test_cheapest_preset_when_none_fits():
+    estimates = fit_presets(probes(), FULL_PIXELS)
+    chosen = choose_preset(estimates, projected_seconds(TUNE_PRESETS[0][1]) * 0.5)
+    assert chosen["preset"] == TUNE_PRESETS[0][0]
+    assert not chosen["within_budget"]
+    #even when a noise limit is given
+    chosen = choose_preset(estimates, projected_seconds(TUNE_PRESETS[0][1]) * 0.5, max_noise=0.0)
+    assert chosen["preset"] == TUNE_PRESETS[0][0]
+    assert not chosen["within_budget"]
+
+
+def test_cheapest_preset_under_the_noise_limit():
+    estimates = fit_presets(probes(), FULL_PIXELS)
+    chosen = choose_preset(estimates, 1e9, max_noise=estimates[1]["noise"] * 1.01)
+    assert chosen["preset"] == TUNE_PRESETS[1][0]
+    assert chosen["within_budget"]
+
+
+def test_best_fitting_preset_when_none_is_quiet_enough():
+    estimates = fit_presets(probes(), FULL_PIXELS)
+    target = projected_seconds(TUNE_PRESETS[1][1]) * 1.001
+    chosen = choose_preset(estimates, target, max_noise=0.0)
+    assert chosen["preset"] == TUNE_PRESETS[1][0]
+    assert chosen["within_budget"]
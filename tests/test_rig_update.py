@@ -0,0 +1,107 @@
+"""
+In place rig update: only what changed is touched, and the nodes (with their manual tweaks) are kept
+"""
+
+import pytest
+
+import fake_hou
+from rig_benchmark import make_points, write_exr
+
+from lookdev_orbit import turntable_range
+from lookdev_turntable_rig import build_lookdev_rig, build_or_update_lookdev_rig
+
+
+RIG_NODES = ("/obj/lookdev_rig", "/obj/lookdev_rig_control", "/obj/lookdev_rig/lookdev_cam",
+             "/obj/lookdev_rig/lookdev_envlight", "/obj/lookdev_rig/lookdev_sweep", "/obj/lookdev_rig/lookdev_refs",
+             "/obj/lookdev_ropnet/lookdev_mantra")
+
+
+@pytest.fixture
+def rig(rig_settings):
+    model = fake_hou.create_model("/obj", "asset", make_points(1000))
+    build_lookdev_rig(rig_settings, model)
+    return model, dict((path, fake_hou.node(path)) for path in RIG_NODES)
+
+
+### update the rig with changed settings, returns {operation: count} and the parm paths that were set
+def update(settings, model, **changes):
+    fake_hou.calls.clear()
+    del fake_hou.events[:]
+    build_or_update_lookdev_rig(dict(settings, **changes), model)
+    calls = dict((name, count) for name, count in fake_hou.calls.items() if count)
+    return calls, sorted(path for operation, path, detail in fake_hou.events if operation in ("parm.set", "parmTuple.set"))
+
+
+def assert_same_nodes(nodes):
+    for path, node in nodes.items():
+        assert fake_hou.node(path) is node
+
+
+def test_unchanged_settings_touch_nothing(rig, rig_settings):
+    model, nodes = rig
+    calls, parms = update(rig_settings, model)
+    for operation in ("createNode", "destroy", "setKeyframes", "setExpression", "parm.set", "parmTuple.set"):
+        assert operation not in calls
+    assert_same_nodes(nodes)
+
+
+def test_new_hdri_only_sets_the_map(rig, rig_settings, tmp_path):
+    model, nodes = rig
+    hdri_path = str(tmp_path / "sunset.exr")
+    write_exr(hdri_path)
+    calls, parms = update(rig_settings, model, hdri_path=hdri_path)
+    assert parms == ["/obj/lookdev_rig/lookdev_envlight/env_map"]
+    assert "createNode" not in calls and "setKeyframes" not in calls
+    assert_same_nodes(nodes)
+
+
+def test_rotation_rewrites_only_the_orbit_keys(rig, rig_settings):
+    model, nodes = rig
+    mantra = nodes["/obj/lookdev_ropnet/lookdev_mantra"]
+    mantra.parm("vm_picture").set("/renders/by_hand.$F4.exr")
+    calls, parms = update(rig_settings, model, rotation_offset=45.0)
+    assert calls.get("setKeyframes") == 7
+    assert "createNode" not in calls and not parms
+    #a manual tweak on a rig node survives the update
+    assert mantra.parm("vm_picture").eval() == "/renders/by_hand.$F4.exr"
+    assert_same_nodes(nodes)
+
+
+def test_frame_count_rekeys_and_sets_the_range(rig, rig_settings):
+    model, nodes = rig
+    calls, parms = update(rig_settings, model, frame_count=60)
+    assert calls.get("setKeyframes") == 7
+    mantra = nodes["/obj/lookdev_ropnet/lookdev_mantra"]
+    assert (mantra.parm("f1").eval(), mantra.parm("f2").eval()) == turntable_range(rig_settings["start_frame"], 60)
+    assert len(nodes["/obj/lookdev_rig/lookdev_cam"].parm("tx").keyframes()) == 61
+
+
+def test_sweep_and_refkit_toggles(rig, rig_settings):
+    model, nodes = rig
+    sweep = nodes["/obj/lookdev_rig/lookdev_sweep"]
+    refs = nodes["/obj/lookdev_rig/lookdev_refs"]
+    assert sweep.children() and refs.children()
+
+    calls, parms = update(rig_settings, model, sweep_enabled=False, add_refkit=False)
+    assert not sweep.children() and not refs.children()
+    assert "setKeyframes" not in calls
+
+    calls, parms = update(rig_settings, model)
+    assert sweep.children() and refs.children()
+    assert_same_nodes(nodes)
+
+
+def test_switching_to_procedural_and_back(rig, rig_settings):
+    model, nodes = rig
+    cam = nodes["/obj/lookdev_rig/lookdev_cam"]
+    control = nodes["/obj/lookdev_rig_control"]
+
+    update(rig_settings, model, procedural_orbit=True)
+    assert not cam.parm("tx").keyframes() and cam.parm("tx").expression()
+    assert control.parmTemplateGroup().find("orbit_phase") is not None
+
+    calls, parms = update(rig_settings, model, procedural_orbit=False)
+    assert calls.get("setKeyframes") == 7
+    assert cam.parm("tx").expression() is None and cam.parm("tx").keyframes()
+    assert control.parmTemplateGroup().find("orbit_phase") is None
+    assert_same_nodes(nodes)
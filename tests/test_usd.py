@@ -0,0 +1,55 @@
+"""
+Composed USD stage of the ref kit: the scale of the payload survives the animated transform
+"""
+
+import pytest
+
+pxr = pytest.importorskip("pxr")
+
+import hou
+from pxr import Gf, Sdf, Usd, UsdGeom
+
+import lookdev_usd
+from lookdev_turntable_rig import REFKIT_CHART_SIZE, REFKIT_SCALE, REFKIT_SPACING
+
+
+REFS_PRIM = "/lookdev/geometry/" + lookdev_usd.REFS_NAME
+
+
+### the ref kit object, moving along x one unit per frame
+class MovingNode(object):
+    def worldTransformAtTime(self, time):
+        frame = time * hou.fps() + 1
+        return hou.Matrix4(((1, 0, 0, 0), (0, 1, 0, 0), (0, 0, 1, 0), (frame, 2, 0, 1)))
+
+
+### root layer over an animation layer and a scene layer payloading the ref kit, like export_usd
+def write_stage(tmp_path, frames):
+    refkit_path = lookdev_usd.write_refkit_layer(str(tmp_path / "asset_refkit.usda"))
+    scene = lookdev_usd.create_stage(str(tmp_path / "asset_scene.usda"))
+    prim = UsdGeom.Xform.Define(scene, REFS_PRIM).GetPrim()
+    prim.GetPayloads().AddPayload(Sdf.Payload("./asset_refkit.usda"))
+    scene.GetRootLayer().Save()
+    lookdev_usd.write_animation_layer(str(tmp_path / "asset_animation.usda"), {REFS_PRIM: MovingNode()}, frames)
+
+    root = lookdev_usd.create_stage(str(tmp_path / "asset.usda"))
+    root.GetRootLayer().subLayerPaths = ["./asset_animation.usda", "./asset_scene.usda"]
+    root.GetRootLayer().Save()
+    return refkit_path, str(tmp_path / "asset.usda")
+
+
+def test_refkit_world_extent_keeps_its_scale(tmp_path):
+    frames = [1, 2, 3]
+    refkit_path, root_path = write_stage(tmp_path, frames)
+    stage = Usd.Stage.Open(root_path)
+    prim = stage.GetPrimAtPath(REFS_PRIM)
+    assert prim.GetChild("kit").IsValid()
+
+    #balls of radius 1 at +-REFKIT_SPACING, the chart within them, all scaled by REFKIT_SCALE
+    half_x = (REFKIT_SPACING + 1) * REFKIT_SCALE
+    half_y = max(1, REFKIT_CHART_SIZE[1] / 2.0) * REFKIT_SCALE
+    for frame in frames:
+        cache = UsdGeom.BBoxCache(Usd.TimeCode(frame), [UsdGeom.Tokens.default_])
+        box = cache.ComputeWorldBound(prim).ComputeAlignedRange()
+        assert Gf.IsClose(box.GetMin(), Gf.Vec3d(frame - half_x, 2 - half_y, -REFKIT_SCALE), 1e-6)
+        assert Gf.IsClose(box.GetMax(), Gf.Vec3d(frame + half_x, 2 + half_y, REFKIT_SCALE), 1e-6)